@@ -1,51 +1,54 @@
+import argparse
 import pandas as pd
-import re
-from datetime import datetime
-from paths import PATHS
+from paths import PATHS, DATABASE, BULK_EXPORT
+from sql_writer import format_sql_column, sql_frame, build_values, write_values, StreamingValuesWriter, RelatorioRejeitos
+from compressed_io import abrir
+from db_loader import carregar_se_configurado
+from bulk_export import exportar_se_configurado
+from load_envelope import envelopar_se_configurado
+from id_maps import carregar_mapa, ids_como_texto
+from staging import ler_entrada, ler_entrada_em_chunks
+from shards import gerar_em_shards
 
-def extract_ids_from_sql(file_path):
-    """Extrai IDs de arquivos SQL no formato específico"""
-    ids = []
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.strip().startswith('('):
-                    # Extrai o primeiro valor entre parênteses (o ID)
-                    match = re.match(r'\((\d+)', line.strip())
-                    if match:
-                        ids.append(match.group(1))
-        return ids
-    except Exception as e:
-        print(f"Erro ao ler {file_path}: {str(e)}")
-        return []
+# ================= CONFIGURAÇÕES =================
+TAMANHO_BLOCO = 500         # Linhas por bloco de VALUES no arquivo SQL
+TAMANHO_CHUNK = 100_000     # Linhas lidas do CSV por vez no modo streaming
 
-def extract_ids_from_csv(file_path):
-    """Extrai IDs de arquivos CSV no formato específico"""
-    try:
-        df = pd.read_csv(file_path)
-        if 'Road_Feature_ID' in df.columns:
-            return df['Road_Feature_ID'].astype(str).tolist()
-        return []
-    except Exception as e:
-        print(f"Erro ao ler {file_path}: {str(e)}")
-        return []
+# Renomear colunas para nomes mais limpos
+COLUNAS = {
+    'Accident_ID*': 'Accident_ID',
+    'Distance(mi)': 'Distance',
+    'Location_ID**': 'Location_ID',
+    'Feature_ID*': 'Feature_ID',
+    'Weather_ID**': 'Weather_ID'
+}
 
+# ================= LEITURA DE IDS =================
+# Mapas posição -> ID gravados por locations_insert.py, weather_inserts.py e road_features_inserts.py
+MAPAS_IDS = {
+    'Location_ID': 'locations_ids',
+    'Weather_ID': 'weather_ids',
+    'Feature_ID': 'road_features_event_ids'
+}
+
+def carregar_ids_relacionados():
+    """Abre os mapas de IDs relacionados (mmap); um mapa ausente equivale a nenhum ID"""
+    mapas = {}
+    for coluna, chave in MAPAS_IDS.items():
+        try:
+            mapas[coluna] = carregar_mapa(chave)
+        except Exception as e:
+            print(f"Erro ao ler {PATHS[chave]}: {str(e)}")
+            mapas[coluna] = []
+    return mapas
+
+# ================= LIMPEZA =================
 def clean_id(value):
     """Limpa IDs removendo aspas e espaços"""
     if pd.isna(value) or value in ['', 'NULL']:
         return None
     return str(value).strip().replace("'", "").replace('"', '')
 
-def format_timestamp(value):
-    """Converte string de data para formato TIMESTAMP do MySQL, removendo timezone"""
-    try:
-        # Remove a parte do timezone (-05:00)
-        dt_str = re.sub(r'[+-]\d{2}:\d{2}$', '', str(value)).strip()
-        return f"'{datetime.strptime(dt_str, '%Y-%m-%d %H:%M:%S').strftime('%Y-%m-%d %H:%M:%S')}'"
-    except Exception as e:
-        print(f"Erro ao formatar timestamp {value}: {str(e)}")
-        return 'NULL'
-
 def clean_distance(value):
     """Limpa e converte valores de distância"""
     if pd.isna(value) or str(value).upper() == 'NULL':
@@ -57,110 +60,221 @@ def clean_distance(value):
     except:
         return None
 
-def format_sql_value(value, field_type):
-    """Formata valores para o SQL conforme o tipo de campo"""
-    if pd.isna(value) or str(value).upper() == 'NULL' or value == '':
-        return 'NULL'
-    
-    if field_type == 'string':
-        return f"'{str(value).replace("'", "''")}'"
-    elif field_type == 'timestamp':
-        return format_timestamp(value)
-    elif field_type == 'year':
-        return str(int(value)) if str(value).isdigit() else 'NULL'
-    else:  # number
-        return str(value)
-
-# Carregar IDs das tabelas relacionada
-location_ids = extract_ids_from_sql(PATHS['locations_insert']) 
-feature_ids = extract_ids_from_csv(PATHS['road_features_events'])
-weather_ids = extract_ids_from_sql(PATHS['weather_insert'])
-
-print(f"IDs coletados - Locations: {len(location_ids)}, Weather: {len(weather_ids)}, Features: {len(feature_ids)}")
-
-# Carregar e preparar dados do arquivo de acidentes
-try:
-    # Carregar CSV de acidentes
-    df = pd.read_csv(PATHS['accidents_input'], dtype={
-        'Accident_ID*': 'str',
-        'Severity': 'Int64',
-        'Start_Time': 'str',
-        'End_Time': 'str',
-        'Distance(mi)': 'str',  # Mudamos para str para fazer a limpeza manual
-        'Description': 'str',
-        'Location_ID**': 'str',
-        'Feature_ID*': 'str',
-        'Weather_ID**': 'str',
-        'Year': 'Int64'
-    })
-    
-    # Renomear colunas para nomes mais limpos
-    df = df.rename(columns={
-        'Accident_ID*': 'Accident_ID',
-        'Distance(mi)': 'Distance',
-        'Location_ID**': 'Location_ID',
-        'Feature_ID*': 'Feature_ID',
-        'Weather_ID**': 'Weather_ID'
-    })
-    
-    # Verificar consistência dos IDs
-    min_length = min(len(df), len(location_ids), len(weather_ids), len(feature_ids))
-    if min_length < len(df):
-        print(f"Aviso: Ajustando para {min_length} registros devido a IDs relacionados insuficientes")
-        df = df.head(min_length)
-        location_ids = location_ids[:min_length]
-        weather_ids = weather_ids[:min_length]
-        feature_ids = feature_ids[:min_length]
-    
-    # Atribuir IDs - numéricos simples começando em 1
-    df['id'] = range(1, len(df) + 1)
-    
+# ================= GERAÇÃO DO SQL =================
+def preparar_acidentes(df, mapas, primeiro_id=1):
+    """Renomeia colunas, atribui IDs (próprio e relacionados) e converte a distância
+
+    mapas: {coluna: IDs relacionados}, indexados pela posição da linha no chunk
+    """
+    df = df.rename(columns=COLUNAS)
+
+    # Atribuir IDs - numéricos simples começando em primeiro_id
+    df['id'] = range(primeiro_id, primeiro_id + len(df))
+
     # Preencher IDs relacionados
-    df['Location_ID'] = [location_ids[i] if i < len(location_ids) else None for i in range(len(df))]
-    df['Weather_ID'] = [weather_ids[i] if i < len(weather_ids) else None for i in range(len(df))]
-    df['Feature_ID'] = [feature_ids[i] if i < len(feature_ids) else None for i in range(len(df))]
-    
+    for coluna, ids in mapas.items():
+        df[coluna] = ids_como_texto(ids, len(df))
+
     # Limpar e converter distância
     df['Distance'] = df['Distance'].apply(clean_distance)
-    
+
     # Converter distância para metros (se necessário)
     df['Distance'] = df['Distance'].apply(lambda x: round(float(x) * 1609.34, 2) if pd.notna(x) else None)
-    
-    # Gerar SQL
-    with open(PATHS['accidents_output'], "w", encoding="utf-8") as f:
-        f.write("-- INSERT statements for ACCIDENTS table\n")
-        f.write("-- Generated from filtered accidents data\n\n")
-        f.write("INSERT INTO ACCIDENTS (\n")
-        f.write("    id, Severity, Start_Time, End_Time, Distance, \n")
-        f.write("    Description, Year, Weather_ID, Location_ID, Feature_ID\n) VALUES\n")
-        
-        values = []
-        for _, row in df.iterrows():
-            values.append(
-                f"({format_sql_value(row['id'], 'number')}, "
-                f"{format_sql_value(row['Severity'], 'number')}, "
-                f"{format_sql_value(row['Start_Time'], 'timestamp')}, "
-                f"{format_sql_value(row['End_Time'], 'timestamp')}, "
-                f"{format_sql_value(row['Distance'], 'number')}, "
-                f"{format_sql_value(row['Description'], 'string')}, "
-                f"{format_sql_value(row['Year'], 'year')}, "
-                f"{format_sql_value(row['Weather_ID'], 'string')}, "
-                f"{format_sql_value(row['Location_ID'], 'string')}, "
-                f"{format_sql_value(row['Feature_ID'], 'string')})"
-            )
-        
-        # Escrever em blocos de 500 para evitar linhas muito longas
-        for i in range(0, len(values), 500):
-            block = values[i:i+500]
-            f.write(",\n".join(block))
-            f.write(";\n" if i+500 >= len(values) else ",\n")
-            
+    return df
+
+# Colunas da tabela ACCIDENTS e o tipo usado na formatação
+TIPOS = {
+    'id': 'number',
+    'Severity': 'number',
+    'Start_Time': 'timestamp',
+    'End_Time': 'timestamp',
+    'Distance': 'number',
+    'Description': 'string',
+    'Year': 'year',
+    'Weather_ID': 'string',
+    'Location_ID': 'string',
+    'Feature_ID': 'string'
+}
+
+def formatar_literais(df, rejeitos=None):
+    """Formata coluna a coluna os literais SQL da tabela ACCIDENTS
+
+    Timestamps inválidos vão para rejeitos, identificados pelo id do acidente.
+    """
+    df = df.set_axis(df['id'].to_numpy())
+    return sql_frame({col: format_sql_column(df[col], tipo, rejeitos) for col, tipo in TIPOS.items()})
+
+def formatar_fatia(fatia, inicio, rejeitos):
+    """Prepara e formata uma faixa de linhas num processo filho (modo --workers)
+
+    Cada processo abre os mapas de IDs (mmap) e usa só a faixa correspondente, com os
+    IDs próprios começando em inicio + 1.
+    """
+    mapas = {coluna: ids[inicio:inicio + len(fatia)] for coluna, ids in carregar_ids_relacionados().items()}
+    return formatar_literais(preparar_acidentes(fatia, mapas, primeiro_id=inicio + 1), rejeitos)
+
+def escrever_cabecalho(f):
+    f.write("-- INSERT statements for ACCIDENTS table\n")
+    f.write("-- Generated from filtered accidents data\n\n")
+    f.write("INSERT INTO ACCIDENTS (\n")
+    f.write("    id, Severity, Start_Time, End_Time, Distance, \n")
+    f.write("    Description, Year, Weather_ID, Location_ID, Feature_ID\n) VALUES\n")
+
+def imprimir_resumo(total, validos, exemplos):
     print(f"\nArquivo SQL gerado com sucesso: {PATHS['accidents_output']}")
-    print(f"Total de registros: {len(df)}")
+    print(f"Total de registros: {total}")
     print("\nResumo de IDs relacionados:")
-    print(f"- Locations: {df['Location_ID'].notnull().sum()} válidos (ex: {df['Location_ID'].iloc[0]})")
-    print(f"- Weather: {df['Weather_ID'].notnull().sum()} válidos (ex: {df['Weather_ID'].iloc[0]})")
-    print(f"- Road Features: {df['Feature_ID'].notnull().sum()} válidos (ex: {df['Feature_ID'].iloc[0]})")
+    print(f"- Locations: {validos['Location_ID']} válidos (ex: {exemplos['Location_ID']})")
+    print(f"- Weather: {validos['Weather_ID']} válidos (ex: {exemplos['Weather_ID']})")
+    print(f"- Road Features: {validos['Feature_ID']} válidos (ex: {exemplos['Feature_ID']})")
+
+def gerar_sql(workers=None):
+    """Modo em lote: carrega o CSV e os IDs inteiros em memória"""
+    # Carregar IDs das tabelas relacionada
+    mapas = carregar_ids_relacionados()
+
+    print(f"IDs coletados - Locations: {len(mapas['Location_ID'])}, "
+          f"Weather: {len(mapas['Weather_ID'])}, Features: {len(mapas['Feature_ID'])}")
+
+    # Carregar CSV de acidentes
+    gerar_acidentes(ler_entrada('accidents_input'), mapas, workers)
 
-except Exception as e:
-    print(f"Erro durante o processamento: {str(e)}")
\ No newline at end of file
+def gerar_acidentes(df, mapas, workers=None, estado=None):
+    """Gera os INSERTs de ACCIDENTS a partir do DataFrame de entrada e dos IDs relacionados
+
+    mapas: {coluna: IDs relacionados} (ver MAPAS_IDS), indexados pela posição do evento.
+    Com workers, a preparação e a formatação são divididas em faixas de linhas entre
+    processos (gerar_em_shards), que leem os mapas do disco; o arquivo gerado é o mesmo.
+    Com estado (EstadoIncremental), os IDs seguem os dos acidentes já carregados.
+    """
+    if workers and estado:
+        raise ValueError("--workers não é suportado na carga incremental")
+
+    # Verificar consistência dos IDs
+    min_length = min(len(df), *(len(ids) for ids in mapas.values()))
+    if min_length < len(df):
+        print(f"Aviso: Ajustando para {min_length} registros devido a IDs relacionados insuficientes")
+        df = df.head(min_length)
+
+    if workers:
+        gerar_sql_em_shards(df, mapas, workers)
+        return
+
+    primeiro_id = estado.reservar('ACCIDENTS', len(df)) if estado else 1
+    df = preparar_acidentes(df, mapas, primeiro_id)
+
+    # Gerar SQL
+    rejeitos = RelatorioRejeitos('ACCIDENTS', PATHS['accidents_rejeitos'])
+    with abrir(PATHS['accidents_output'], "w") as f:
+        escrever_cabecalho(f)
+        literais = formatar_literais(df, rejeitos)
+
+        # Escrever em blocos de 500 para evitar linhas muito longas
+        write_values(f, build_values(literais), block_size=TAMANHO_BLOCO)
+
+    rejeitos.salvar()
+    envelopar_se_configurado('ACCIDENTS', PATHS['accidents_output'])
+    exportar_se_configurado('ACCIDENTS', literais)
+    carregar_se_configurado('ACCIDENTS', literais, substituir=estado is None)
+
+    colunas = ['Location_ID', 'Weather_ID', 'Feature_ID']
+    imprimir_resumo(
+        len(df),
+        {col: df[col].notnull().sum() for col in colunas},
+        {col: df[col].iloc[0] for col in colunas}
+    )
+
+def gerar_sql_em_shards(df, mapas, workers):
+    """Parte do modo em lote com --workers: formata as faixas de df em paralelo e junta na ordem"""
+    rejeitos = RelatorioRejeitos('ACCIDENTS', PATHS['accidents_rejeitos'])
+    with abrir(PATHS['accidents_output'], "w") as f:
+        escrever_cabecalho(f)
+        frames = gerar_em_shards(f, df, formatar_fatia, workers, rejeitos,
+                                 devolver_literais=bool(BULK_EXPORT or DATABASE['url']),
+                                 terminar_vazio=False)
+
+    rejeitos.salvar()
+    envelopar_se_configurado('ACCIDENTS', PATHS['accidents_output'])
+    for i, literais in enumerate(frames or []):
+        exportar_se_configurado('ACCIDENTS', literais, anexar=(i > 0))
+        carregar_se_configurado('ACCIDENTS', literais, substituir=(i == 0))
+
+    # Após o ajuste ao menor mapa, todas as linhas têm os três IDs relacionados
+    colunas = ['Location_ID', 'Weather_ID', 'Feature_ID']
+    imprimir_resumo(
+        len(df),
+        {col: len(df) for col in colunas},
+        {col: str(mapas[col][0]) if len(df) else None for col in colunas}
+    )
+
+def gerar_sql_streaming(chunksize=TAMANHO_CHUNK):
+    """Modo streaming: lê o CSV em chunks e escreve cada bloco de 500 assim que fica pronto
+
+    Os IDs relacionados vêm dos mapas mapeados em memória, fatiados pela posição
+    das linhas do chunk, então a memória usada depende apenas do tamanho do chunk.
+    A saída é idêntica à do modo em lote.
+    """
+    mapas = carregar_ids_relacionados()
+
+    colunas = ['Location_ID', 'Weather_ID', 'Feature_ID']
+    validos = dict.fromkeys(colunas, 0)
+    exemplos = dict.fromkeys(colunas)
+    total = 0
+    truncado = False
+    rejeitos = RelatorioRejeitos('ACCIDENTS', PATHS['accidents_rejeitos'])
+
+    with abrir(PATHS['accidents_output'], "w") as f:
+        escrever_cabecalho(f)
+        writer = StreamingValuesWriter(f, block_size=TAMANHO_BLOCO)
+
+        for chunk in ler_entrada_em_chunks('accidents_input', chunksize):
+            fatias = {coluna: ids[total:total + len(chunk)] for coluna, ids in mapas.items()}
+
+            # Interrompe quando algum mapa de IDs relacionados acaba
+            n = min(len(chunk), *(len(ids) for ids in fatias.values()))
+            if n < len(chunk):
+                truncado = True
+                chunk = chunk.iloc[:n]
+            if n == 0:
+                break
+
+            chunk = preparar_acidentes(chunk, fatias, primeiro_id=total + 1)
+            for col in colunas:
+                validos[col] += int(chunk[col].notnull().sum())
+                if exemplos[col] is None:
+                    exemplos[col] = chunk[col].iloc[0]
+            total += n
+
+            literais = formatar_literais(chunk, rejeitos)
+            writer.write(build_values(literais))
+            exportar_se_configurado('ACCIDENTS', literais, anexar=(total > n))
+            carregar_se_configurado('ACCIDENTS', literais, substituir=(total == n))
+            if truncado:
+                break
+
+        writer.close()
+
+    rejeitos.salvar()
+    envelopar_se_configurado('ACCIDENTS', PATHS['accidents_output'])
+    if truncado:
+        print(f"Aviso: Ajustado para {total} registros devido a IDs relacionados insuficientes")
+    imprimir_resumo(total, validos, exemplos)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera os INSERTs da tabela ACCIDENTS")
+    parser.add_argument('--streaming', action='store_true',
+                        help="lê o CSV em chunks e escreve os blocos à medida que ficam prontos")
+    parser.add_argument('--chunksize', type=int, default=TAMANHO_CHUNK)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="formata o arquivo em N processos, cada um com uma faixa de linhas")
+    args = parser.parse_args()
+    if args.streaming and args.workers:
+        parser.error("--streaming e --workers não podem ser usados juntos")
+
+    try:
+        if args.streaming:
+            gerar_sql_streaming(args.chunksize)
+        else:
+            gerar_sql(args.workers)
+    except Exception as e:
+        print(f"Erro durante o processamento: {str(e)}")
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+from paths import PATHS
+from stage_metrics import registrar_leitura
+
+# Índice persistente código -> nome de aeroporto, montado a partir do airports_database.csv (OurAirports).
+# Fica em disco como arrays ordenados pelo código (.npz) e só é reconstruído quando o database
+# (ou o mapeamento manual) muda; a resolução de uma coluna inteira é uma busca binária vetorizada.
+
+# Mapeamento manual para códigos específicos (tem prioridade sobre o database)
+MAPEAMENTO_MANUAL = {
+    'K3A6': 'Pacific City State Airport',
+    'KATT': 'Central City Municipal - Larry Reineke Field',
+    'KCQT': 'Pacific Valley Aviation Airport',
+    'KMCJ': 'Salina Municipal Airport'
+}
+
+# Fontes na ordem de prioridade: o código é resolvido pela primeira fonte que o contém
+FONTES = ['manual', 'ident', 'gps_code', 'iata_code']
+
+VERSAO = 1  # Muda quando o formato do índice muda
+
+def _assinatura(caminho_database):
+    """Identifica o que gerou o índice: versão, caminho, tamanho e mtime do database e mapeamento manual"""
+    estado = os.stat(caminho_database)
+    conteudo = json.dumps([VERSAO, os.path.abspath(caminho_database), estado.st_size, estado.st_mtime_ns,
+                           sorted(MAPEAMENTO_MANUAL.items())])
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+def construir_indice(caminho_database):
+    """Monta (codigos, nomes, fontes) ordenados pelo código
+
+    Dentro de uma coluna vale a última ocorrência do código (como dict(zip(...))); entre
+    colunas, a fonte de maior prioridade. Nomes ausentes no database ficam como ''.
+    """
+    database = pd.read_csv(caminho_database, usecols=lambda c: c in FONTES + ['name'], dtype=str)
+    registrar_leitura(len(database))
+    partes = [pd.DataFrame({'codigo': list(MAPEAMENTO_MANUAL), 'nome': list(MAPEAMENTO_MANUAL.values()),
+                            'fonte': 0})]
+    for fonte, coluna in enumerate(FONTES[1:], start=1):
+        if coluna not in database:
+            continue
+        parte = pd.DataFrame({'codigo': database[coluna], 'nome': database['name'], 'fonte': fonte})
+        partes.append(parte.dropna(subset=['codigo']).drop_duplicates('codigo', keep='last'))
+
+    indice = pd.concat(partes, ignore_index=True).drop_duplicates('codigo', keep='first')
+    indice = indice.sort_values('codigo', kind='stable')
+    return (indice['codigo'].to_numpy(dtype=str), indice['nome'].fillna('').to_numpy(dtype=str),
+            indice['fonte'].to_numpy(dtype=np.uint8))
+
+class IndiceAeroportos:
+    """Índice de nomes de aeroportos carregado sob demanda (na primeira resolução)"""
+
+    def __init__(self, caminho_database=None, caminho_indice=None):
+        self.caminho_database = caminho_database or PATHS['airports_database']
+        self.caminho_indice = caminho_indice or PATHS['airports_index']
+        self._dados = None
+
+    def _atualizar(self):
+        """Carrega o índice do disco, reconstruindo-o se o database mudou desde a última vez"""
+        assinatura = _assinatura(self.caminho_database)
+        if os.path.exists(self.caminho_indice):
+            with np.load(self.caminho_indice, allow_pickle=False) as arquivo:
+                if str(arquivo['assinatura']) == assinatura:
+                    return arquivo['codigos'], arquivo['nomes'], arquivo['fontes']
+
+        codigos, nomes, fontes = construir_indice(self.caminho_database)
+        os.makedirs(os.path.dirname(self.caminho_indice), exist_ok=True)
+        temporario = f"{self.caminho_indice}.tmp"
+        with open(temporario, 'wb') as f:
+            np.savez(f, codigos=codigos, nomes=nomes, fontes=fontes, assinatura=np.array(assinatura))
+        os.replace(temporario, self.caminho_indice)
+        print(f"Índice de aeroportos reconstruído em: {self.caminho_indice} ({len(codigos)} códigos)")
+        return codigos, nomes, fontes
+
+    @property
+    def dados(self):
+        if self._dados is None:
+            self._dados = self._atualizar()
+        return self._dados
+
+    def resolver(self, codigos):
+        """Resolve uma coluna de códigos de uma vez: retorna (nomes, fontes) como arrays object,
+        com None onde o código não tem nome"""
+        chaves, nomes, fontes = self.dados
+        codigos = pd.Series(codigos, dtype=object)
+        validos = codigos.notna().to_numpy()
+        procurados = codigos.fillna('').astype(str).to_numpy(dtype=str)
+
+        posicoes = np.searchsorted(chaves, procurados)
+        dentro = posicoes < len(chaves)
+        encontrados = np.zeros(len(procurados), dtype=bool)
+        encontrados[dentro] = chaves[posicoes[dentro]] == procurados[dentro]
+        encontrados &= validos
+
+        nome_por_codigo = np.full(len(procurados), None, dtype=object)
+        fonte_por_codigo = np.full(len(procurados), None, dtype=object)
+        # Códigos presentes com nome vazio no database contam como sem nome
+        linhas = np.flatnonzero(encontrados)
+        posicoes = posicoes[linhas]
+        com_nome = nomes[posicoes] != ''
+        linhas, posicoes = linhas[com_nome], posicoes[com_nome]
+        nome_por_codigo[linhas] = nomes[posicoes].astype(object)
+        fonte_por_codigo[linhas] = np.array(FONTES, dtype=object)[fontes[posicoes]]
+        return nome_por_codigo, fonte_por_codigo
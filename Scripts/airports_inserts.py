@@ -1,53 +1,84 @@
+import numpy as np
 import pandas as pd
 from paths import PATHS 
+from sql_writer import escape_string, sql_frame, write_insert
+from compressed_io import abrir, escrita_atomica
+from db_loader import carregar_se_configurado
+from bulk_export import exportar_se_configurado
+from load_envelope import envelopar_se_configurado
+from staging import ler_csv
+from airport_index import IndiceAeroportos
 
 def main():
     # 1. Processar aeroportos
     processar_aeroportos(PATHS['airports_output'])
 
-def processar_aeroportos(caminho_aeroportos):
-    # Ler e limpar dados
-    df = pd.read_csv(caminho_aeroportos, dtype={
-        'Airport_Code': 'str',
-        'Timezone': 'str',
-        'Airport_Name': 'str'
-    })
-    
+def ler_aeroportos(caminho_aeroportos):
+    """Lê o airports_output.csv gerado pelo pre_processamento"""
+    return ler_csv('airports_output', caminho=caminho_aeroportos)
+
+def aeroportos_por_evento(caminho_aeroportos=None):
+    """AIRPORTS.csv com o nome de cada código resolvido pelo índice do airports_database.csv
+
+    Usado na carga incremental no lugar do airports_output.csv: lá só recebem nome os códigos
+    repetidos dentro do lote e as linhas sem nome são removidas, então o código de cada evento
+    dependeria de como os eventos foram divididos em lotes. Aqui cada evento mantém a sua linha;
+    códigos sem nome ficam com Airport_Name vazio.
+    """
+    df = ler_csv('airports_input', colunas=['Airport_Code', 'Timezone'], caminho=caminho_aeroportos)
+    nomes, _ = IndiceAeroportos().resolver(df['Airport_Code'].str.strip())
+    df['Airport_Name'] = nomes
+    return df
+
+def gerar_aeroportos(df, estado=None):
+    """Gera os INSERTs de AIRPORTS e retorna o código do aeroporto de cada evento (ordem do arquivo)
+
+    Com estado (EstadoIncremental), só os aeroportos de códigos ainda não carregados são gerados,
+    e eventos de aeroportos sem nome ficam sem código (NULL em LOCATIONS).
+    """
     # Limpeza
+    df = df.copy()
     df['Airport_Code'] = df['Airport_Code'].str.strip()
     df['Timezone'] = df['Timezone'].str.strip()
     df['Airport_Name'] = df['Airport_Name'].fillna('').str.strip()
     
     # Aeroportos únicos 
     df_unico = df.drop_duplicates(subset=["Airport_Code", "Timezone", "Airport_Name"])
+    if estado:
+        com_nome = df['Airport_Name'].ne('').to_numpy()
+        df_unico = df_unico[df_unico['Airport_Name'].ne('')]
+        df_unico = df_unico[estado.filtrar_novos('AIRPORTS', df_unico, ['Airport_Code'])]
     
     # =====================
     # 1. INSERTs para AIRPORTS (apenas aeroportos únicos e filtrados)
     # =====================
-    with open(PATHS['airports_insert'], "w", encoding="utf-8") as f:
-        f.write("INSERT INTO AIRPORTS (Airport_Code, Name, Timezone) VALUES\n")
-        
-        values = []
-        for _, row in df_unico.iterrows():
-            code = row["Airport_Code"].replace("'", "''")
-            name = row["Airport_Name"].replace("'", "''")
-            timezone = row["Timezone"].replace("'", "''")
-            values.append(f"('{code}', '{name}', '{timezone}')")
-        
-        f.write(",\n".join(values))
-        f.write(";\n")
-    
-    # =====================
-    # 2. Gera airport_events (ordem dos aeroportos)
-    # =====================
-    event_df = df[['Airport_Code']].copy()
-    event_df['Event_ID'] = event_df.index + 1  # Ordem no arquivo 
-    
-    # Salva como CSV
-    event_df[['Event_ID', 'Airport_Code']].to_csv(PATHS['airport_events'], index=False)
+    literais = sql_frame({
+        'Airport_Code': escape_string(df_unico["Airport_Code"]),
+        'Name': escape_string(df_unico["Airport_Name"]),
+        'Timezone': escape_string(df_unico["Timezone"])
+    })
+    with abrir(PATHS['airports_insert'], "w") as f:
+        write_insert(f, "INSERT INTO AIRPORTS (Airport_Code, Name, Timezone) VALUES\n", literais)
     
     print(f"Aeroportos únicos: {len(df_unico)}")
     print(f"Eventos gerados: {len(df)}")
+    
+    envelopar_se_configurado('AIRPORTS', PATHS['airports_insert'])
+    exportar_se_configurado('AIRPORTS', literais)
+    carregar_se_configurado('AIRPORTS', literais, substituir=estado is None)
+    if estado:
+        return np.where(com_nome, df['Airport_Code'].to_numpy(dtype=object), None)
+    return df['Airport_Code'].to_numpy()
+
+def processar_aeroportos(caminho_aeroportos):
+    codigos = gerar_aeroportos(ler_aeroportos(caminho_aeroportos))
+
+    # =====================
+    # 2. Gera airport_events (ordem dos aeroportos), lido pelo locations_insert.py
+    # =====================
+    event_df = pd.DataFrame({'Event_ID': range(1, len(codigos) + 1), 'Airport_Code': codigos})
+    with escrita_atomica(PATHS['airport_events']) as temporario:
+        event_df.to_csv(temporario, index=False)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
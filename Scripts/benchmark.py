@@ -0,0 +1,785 @@
+import argparse
+import contextlib
+import csv
+import io
+import filecmp
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from sql_writer import format_sql_column, format_sql_auto, format_timestamp, build_values, write_values, sql_frame
+from shards import gerar_em_shards
+from paths import PATHS, BASE_PATH
+from compressed_io import abrir
+from synthetic_data import gerar_entradas, ler_escala
+from airport_index import IndiceAeroportos, MAPEAMENTO_MANUAL
+from staging import ler_csv, compactar_road_features, BOOL_COLS_ROAD_FEATURES
+from dimension_builder import construir_dimensao
+from road_features_inserts import combinacoes, literais_road_features
+from bulk_export import ARQUIVOS_SQL, ler_insert_sql
+from db_loader import ddl_sqlite, ler_esquema
+import synthetic_data
+import pre_processamento
+
+# ================= DADOS SINTÉTICOS =================
+def gerar_acidentes(n, seed=42):
+    """Gera um DataFrame no formato do accidents_inserts.py já preparado para o SQL"""
+    rng = np.random.default_rng(seed)
+    descricoes = np.array(['Right lane blocked', "Driver's fault on I-70", 'Accident on Main St', None], dtype=object)
+    horarios = np.array(['2016-02-08 05:46:00', '2019-12-31 23:59:59-05:00', None], dtype=object)
+    return pd.DataFrame({
+        'id': np.arange(1, n + 1),
+        'Severity': pd.array(rng.integers(1, 5, n), dtype='Int64'),
+        'Start_Time': rng.choice(horarios, n),
+        'End_Time': rng.choice(horarios, n),
+        'Distance': np.round(rng.uniform(0, 10, n) * 1609.34, 2),
+        'Description': rng.choice(descricoes, n),
+        'Year': pd.array(rng.integers(2016, 2024, n), dtype='Int64'),
+        'Weather_ID': np.arange(1, n + 1).astype(str),
+        'Location_ID': np.arange(1, n + 1).astype(str),
+        'Feature_ID': rng.integers(1, 200, n).astype(str)
+    })
+
+def gerar_clima(n, seed=42):
+    """Gera um DataFrame no formato do weather_inserts.py (todas as colunas como texto)"""
+    rng = np.random.default_rng(seed)
+    numeros = np.round(rng.uniform(-20, 100, n), 1).astype(str)
+    numeros[rng.random(n) < 0.1] = 'NULL'
+    return pd.DataFrame({
+        'Weather_ID': np.arange(1, n + 1),
+        'Weather_Timestamp': rng.choice(['2016-02-08 05:45:00', 'NULL'], n),
+        'Temperature': numeros,
+        'Wind_Direction': rng.choice(['Calm', 'N', "W'S", 'NULL'], n),
+        'Precipitation': rng.choice(['0.02', 'NULL'], n)
+    })
+
+def gerar_localizacoes(n, seed=42):
+    """Gera as colunas de texto do locations_insert.py que parecem números (CEPs com zero à esquerda, ruas)"""
+    rng = np.random.default_rng(seed)
+    ceps = pd.Series(rng.integers(1000, 99999, n).astype(str), dtype=object).str.zfill(5)
+    return pd.DataFrame({
+        'Street': rng.choice(['Main St', 'I-95 N', '1200', "O'Hare Dr", 'NULL'], n),
+        'Zipcode': ceps.where(rng.random(n) > 0.05, 'NULL')
+    })
+
+def gerar_timestamps(n, seed=42):
+    """Gera uma coluna de timestamps como a dos CSVs: com e sem fuso, nulos e alguns inválidos"""
+    rng = np.random.default_rng(seed)
+    segundos = rng.integers(1_451_606_400, 1_703_980_800, n)  # 2016 a 2023
+    texto = pd.Series(pd.to_datetime(segundos, unit='s').strftime('%Y-%m-%d %H:%M:%S'), dtype=object)
+    fusos = rng.choice(['', '', '-05:00', '-06:00'], n)
+    texto = texto + fusos
+    sorteio = rng.random(n)
+    texto[sorteio < 0.02] = None
+    texto[(sorteio >= 0.02) & (sorteio < 0.03)] = '2016-02-08 05:46:00.000000000'
+    texto[(sorteio >= 0.03) & (sorteio < 0.035)] = '2016-02-30 05:46:00'
+    return texto
+
+def gerar_aeroportos(n, diretorio, seed=42):
+    """Gera um AIRPORTS.csv sintético e o repetidos_com_nomes.csv correspondente
+
+    Os códigos seguem o formato dos dados reais; cerca de 10% dos códigos ficam sem nome.
+    Retorna (caminho_aeroportos, caminho_nomes).
+    """
+    rng = np.random.default_rng(seed)
+    codigos = np.array([f"K{i:03X}" for i in range(4000)], dtype=object)
+    fusos = np.array(['US/Eastern', 'US/Central', 'US/Mountain', 'US/Pacific'], dtype=object)
+
+    caminho_aeroportos = Path(diretorio) / 'AIRPORTS.csv'
+    pd.DataFrame({
+        'Airport_Code': rng.choice(codigos, n),
+        'Timezone': rng.choice(fusos, n)
+    }).to_csv(caminho_aeroportos, index=False)
+
+    caminho_nomes = Path(diretorio) / 'repetidos_com_nomes.csv'
+    sem_nome = rng.random(len(codigos)) < 0.1
+    pd.DataFrame({
+        'Airport_Code': codigos,
+        'Timezone': fusos[0],
+        'Ocorrencias': 2,
+        'Airport_Name': np.where(sem_nome, '', [f"{codigo} Regional Airport" for codigo in codigos])
+    }).to_csv(caminho_nomes, index=False)
+    return caminho_aeroportos, caminho_nomes
+
+def gerar_road_features(n, seed=42):
+    """Gera as colunas booleanas do ROAD_FEATURES como texto, em caixas variadas e com nulos"""
+    rng = np.random.default_rng(seed)
+    valores = np.array(['True', 'False', 'TRUE', 'false', None], dtype=object)
+    return pd.DataFrame({
+        col: valores[np.where(rng.random(n) < 0.1, rng.integers(0, 5, n), rng.integers(0, 2, n))]
+        for col in BOOL_COLS_ROAD_FEATURES
+    })
+
+def gerar_tabela_tipos(n, seed=42):
+    """Gera uma tabela cujos tipos só se definem em blocos tardios: inteiros que ganham nulos, booleanos
+    com nulos só no fim, números que viram texto, colunas só com nulos e textos com aspas e quebras de linha"""
+    rng = np.random.default_rng(seed)
+    tarde = np.arange(n) >= n - n // 10  # Último décimo do arquivo
+    inteiros = rng.integers(0, 100, n).astype(object)
+    booleanos = rng.choice(np.array(['True', 'true', 'False'], dtype=object), n)
+    return pd.DataFrame({
+        'int': inteiros,
+        'int_na': np.where(rng.random(n) < 0.2, '', inteiros),
+        'float': rng.choice(np.array(['0.1', '1e20', '-3.5', '2'], dtype=object), n),
+        'bool': booleanos,
+        'bool_na': np.where(rng.random(n) < 0.5, '', booleanos),
+        'bool_na_late': np.where(tarde & (rng.random(n) < 0.5), '', booleanos),
+        'mixed_late': np.where(tarde & (rng.random(n) < 0.5), 'x', inteiros),
+        'allna': '',
+        'str': rng.choice(np.array(['None', 'x"y', 'line\nbreak', "O'Hare"], dtype=object), n),
+        'int_na_late': np.where(tarde & (rng.random(n) < 0.5), '', inteiros)
+    })
+
+# ================= IMPLEMENTAÇÕES ANTERIORES (REFERÊNCIA) =================
+def filtrar_tabela_legado(caminho_tabela, mascara):
+    """Filtragem original: lê a tabela inteira, remove as posições da máscara e grava de novo"""
+    df = pd.read_csv(caminho_tabela, low_memory=False)
+    nome_saida = caminho_tabela.with_name(caminho_tabela.stem + "_legado.csv")
+    df.drop(index=np.flatnonzero(mascara[:len(df)])).to_csv(nome_saida, index=False)
+    return nome_saida
+
+def _format_sql_value_legado(value, field_type):
+    """format_sql_value original do accidents_inserts.py (célula a célula)"""
+    if pd.isna(value) or str(value).upper() == 'NULL' or value == '':
+        return 'NULL'
+    if field_type == 'string':
+        return "'" + str(value).replace("'", "''") + "'"
+    elif field_type == 'timestamp':
+        return format_timestamp(value)
+    elif field_type == 'year':
+        return str(int(value)) if str(value).isdigit() else 'NULL'
+    else:
+        return str(value)
+
+def _sql_val_legado(x, isPrecipitation=False):
+    """sql_val original do weather_inserts.py (try/float por célula)"""
+    if x == "NULL":
+        if isPrecipitation:
+            return float(0.0)
+        return "NULL"
+    try:
+        return str(float(x))
+    except ValueError:
+        return "'" + x.replace("'", "''") + "'"
+
+def _sql_val_localizacoes_legado(x):
+    """sql_val original do locations_insert.py (try/float por célula, sem normalizar)"""
+    if x == "NULL":
+        return "NULL"
+    try:
+        float(x)
+        return x
+    except ValueError:
+        return "'" + x.replace("'", "''") + "'"
+
+def road_features_legado(df):
+    """Conversão original (uma coluna int64 por feature) e deduplicação pelas 13 colunas"""
+    df = df.copy()
+    for col in BOOL_COLS_ROAD_FEATURES:
+        df[col] = df[col].str.upper().map({'TRUE': 1, 'FALSE': 0}).fillna(0).astype(int)
+    dimensao, ids = construir_dimensao(df, BOOL_COLS_ROAD_FEATURES)
+    literais = sql_frame({col: dimensao[col].astype(str) for col in ['id'] + BOOL_COLS_ROAD_FEATURES})
+    return build_values(literais), ids, df
+
+def road_features_mascara(df):
+    """Máscara uint16 por evento, deduplicação pela máscara e literais decodificados dos bits"""
+    compacto = compactar_road_features(df)
+    mascaras, ids_unicos, ids = combinacoes(compacto['Mascara'].to_numpy())
+    return build_values(literais_road_features(mascaras, ids_unicos)), ids, compacto
+
+TIPOS_ACIDENTES = [
+    ('id', 'number'), ('Severity', 'number'), ('Start_Time', 'timestamp'),
+    ('End_Time', 'timestamp'), ('Distance', 'number'), ('Description', 'string'),
+    ('Year', 'year'), ('Weather_ID', 'string'), ('Location_ID', 'string'), ('Feature_ID', 'string')
+]
+
+def acidentes_legado(df):
+    return [
+        "(" + ", ".join(_format_sql_value_legado(row[col], tipo) for col, tipo in TIPOS_ACIDENTES) + ")"
+        for _, row in df.iterrows()
+    ]
+
+def acidentes_vetorizado(df):
+    return build_values([format_sql_column(df[col], tipo) for col, tipo in TIPOS_ACIDENTES])
+
+def clima_legado(df):
+    return [
+        f"({row['Weather_ID']}, {_sql_val_legado(row['Weather_Timestamp'])}, {_sql_val_legado(row['Temperature'])}, "
+        f"{_sql_val_legado(row['Wind_Direction'])}, {_sql_val_legado(row['Precipitation'], isPrecipitation=True)})"
+        for _, row in df.iterrows()
+    ]
+
+def clima_vetorizado(df):
+    return build_values([
+        format_sql_column(df['Weather_ID'], 'number'),
+        format_sql_auto(df['Weather_Timestamp'], normalize_numbers=True),
+        format_sql_auto(df['Temperature'], normalize_numbers=True),
+        format_sql_auto(df['Wind_Direction'], normalize_numbers=True),
+        format_sql_auto(df['Precipitation'], normalize_numbers=True, null_literal='0.0')
+    ])
+
+def timestamps_legado(serie):
+    """format_timestamp célula a célula (o stdout com os erros é descartado)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return ['NULL' if pd.isna(valor) else format_timestamp(valor) for valor in serie]
+
+def timestamps_vetorizado(serie):
+    return format_sql_column(serie, 'timestamp').tolist()
+
+def formatar_fatia_acidentes(fatia, inicio, rejeitos):
+    """Formatação de uma faixa no processo filho, como em accidents_inserts.formatar_literais"""
+    return sql_frame({col: format_sql_column(fatia[col], tipo, rejeitos) for col, tipo in TIPOS_ACIDENTES})
+
+def aeroportos_legado(caminho_entrada, caminho_nomes, diretorio):
+    """analisar_combinacoes_repetidas + processar_arquivo_principal originais (listas de dicts)"""
+    contador = defaultdict(int)
+    with open(caminho_entrada, mode='r', encoding='utf-8') as arquivo:
+        for linha in csv.DictReader(arquivo):
+            contador[(linha['Airport_Code'], linha['Timezone'])] += 1
+    repetidos = {k: v for k, v in contador.items() if v > 1}
+    with open(Path(diretorio) / 'repetidos_legado.csv', 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(['Airport_Code', 'Timezone', 'Ocorrencias'])
+        for combo, quantidade in sorted(repetidos.items()):
+            escritor.writerow([combo[0], combo[1], quantidade])
+
+    nomes_por_codigo = {}
+    with open(caminho_nomes, newline='', encoding='utf-8') as f:
+        for linha in csv.DictReader(f):
+            if linha['Airport_Name'].strip():
+                nomes_por_codigo[linha['Airport_Code']] = linha['Airport_Name'].strip()
+
+    linhas_filtradas, indices_removidos = [], []
+    with open(caminho_entrada, newline='', encoding='utf-8') as f:
+        leitor = list(csv.DictReader(f))
+        cabecalho = leitor[0].keys() if leitor else []
+        for i, linha in enumerate(leitor):
+            if linha['Airport_Code'] in nomes_por_codigo:
+                linha['Airport_Name'] = nomes_por_codigo[linha['Airport_Code']]
+                linhas_filtradas.append(linha)
+            elif 'Airport_Name' in linha and linha['Airport_Name'].strip():
+                linhas_filtradas.append(linha)
+            else:
+                indices_removidos.append(i)
+    with open(Path(diretorio) / 'airports_output_legado.csv', 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.DictWriter(f, fieldnames=cabecalho)
+        escritor.writeheader()
+        escritor.writerows(linhas_filtradas)
+    return indices_removidos
+
+def aeroportos_compacto(caminho_entrada, caminho_nomes, diretorio):
+    """Leitura única compacta do pre_processamento.py"""
+    aeroportos = pre_processamento.ler_aeroportos(caminho_entrada)
+    pre_processamento.analisar_combinacoes_repetidas(aeroportos, Path(diretorio) / 'repetidos.csv')
+    return pre_processamento.processar_arquivo_principal(
+        aeroportos, caminho_nomes, Path(diretorio) / 'airports_output.csv'
+    )
+
+def nomes_legado(caminho_database, codigos):
+    """adicionar_nomes_aeroportos original: lê o database inteiro, monta dois dicts e aplica linha a linha"""
+    airports_df = pd.read_csv(caminho_database)
+    iata_to_name = dict(zip(airports_df['ident'], airports_df['name']))
+    gps_to_name = dict(zip(airports_df['gps_code'], airports_df['name']))
+
+    def get_airport_name(code):
+        if code in MAPEAMENTO_MANUAL:
+            return MAPEAMENTO_MANUAL[code]
+        if code in iata_to_name:
+            return iata_to_name[code]
+        elif code in gps_to_name:
+            return gps_to_name[code]
+        return None
+    nomes = codigos.apply(get_airport_name)
+    return [None if pd.isna(nome) else nome for nome in nomes]
+
+# ================= MEDIÇÃO =================
+def medir(funcao, *args):
+    """Executa a função e retorna (resultado, segundos)"""
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    return resultado, time.perf_counter() - inicio
+
+def comparar(nome, df, antes, depois):
+    """Compara duas implementações: confere saída idêntica e imprime linhas/s"""
+    ref, t_antes = medir(antes, df)
+    novo, t_depois = medir(depois, df)
+    if ref != novo:
+        raise AssertionError(f"{nome}: saída vetorizada difere da implementação anterior")
+    n = len(df)
+    print(f"{nome:<12} {n:>10} linhas | antes: {n / t_antes:>12,.0f} linhas/s | "
+          f"depois: {n / t_depois:>12,.0f} linhas/s | ganho: {t_antes / t_depois:.1f}x")
+
+def medir_memoria(funcao, *args):
+    """Executa a função e retorna o pico de memória alocada pelo Python, em MB"""
+    tracemalloc.start()
+    try:
+        funcao(*args)
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+def benchmark_sql_writer(linhas=100_000):
+    """Mede o gerador de VALUES vetorizado contra o iterrows original"""
+    comparar('ACCIDENTS', gerar_acidentes(linhas), acidentes_legado, acidentes_vetorizado)
+    comparar('WEATHER', gerar_clima(linhas), clima_legado, clima_vetorizado)
+
+def benchmark_tipagem(linhas=1_000_000):
+    """Tipagem dos literais de WEATHER e LOCATIONS: try/float por célula, detecção pelo conteúdo
+    (format_sql_auto) e tipo declarado por coluna (format_sql_column)"""
+    clima, locais = gerar_clima(linhas), gerar_localizacoes(linhas)
+    colunas = [
+        (clima['Temperature'], 'float', _sql_val_legado, dict(normalize_numbers=True)),
+        (clima['Wind_Direction'], 'string', _sql_val_legado, dict(normalize_numbers=True)),
+        (locais['Street'], 'string', _sql_val_localizacoes_legado, {}),
+        (locais['Zipcode'], 'string', _sql_val_localizacoes_legado, {})
+    ]
+
+    def legado():
+        return [[legado(x) for x in serie] for serie, _, legado, _ in colunas]
+
+    def conteudo():
+        return [format_sql_auto(serie, **opcoes).tolist() for serie, _, _, opcoes in colunas]
+
+    def declarado():
+        return [format_sql_column(serie, tipo).tolist() for serie, tipo, _, _ in colunas]
+
+    ref, t_legado = medir(legado)
+    auto, t_conteudo = medir(conteudo)
+    novo, t_declarado = medir(declarado)
+    if ref != auto:
+        raise AssertionError("TIPAGEM: format_sql_auto difere do sql_val original")
+    corrigidos = sum(a != b for antes, depois in zip(ref, novo) for a, b in zip(antes, depois))
+
+    celulas = linhas * len(colunas)
+    print(f"{'TIPAGEM':<12} {celulas:>10} células | try/float: {t_legado / celulas * 1e9:>6.0f} ns | "
+          f"conteúdo: {t_conteudo / celulas * 1e9:>6.0f} ns | declarado: {t_declarado / celulas * 1e9:>6.0f} ns | "
+          f"ganho: {t_legado / t_declarado:.1f}x")
+    print(f"{'':<12} {corrigidos:>10} literais mudam de tipo (ex.: CEP 02110 -> '02110')")
+
+def benchmark_timestamps(linhas=1_000_000):
+    """Mede a conversão vetorizada de timestamps contra o strptime por célula"""
+    comparar('TIMESTAMPS', gerar_timestamps(linhas), timestamps_legado, timestamps_vetorizado)
+
+def benchmark_aeroportos(linhas=1_600_000):
+    """Pico de memória e tempo do pré-processamento de aeroportos (padrão: 10x o AIRPORTS.csv atual)"""
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho_aeroportos, caminho_nomes = gerar_aeroportos(linhas, diretorio)
+        args = (caminho_aeroportos, caminho_nomes, diretorio)
+
+        ref, t_antes = medir(aeroportos_legado, *args)
+        novo, t_depois = medir(aeroportos_compacto, *args)
+        base = Path(diretorio)
+        if (list(ref) != novo.tolist()
+                or not filecmp.cmp(base / 'repetidos_legado.csv', base / 'repetidos.csv', shallow=False)
+                or not filecmp.cmp(base / 'airports_output_legado.csv', base / 'airports_output.csv', shallow=False)):
+            raise AssertionError("AIRPORTS: saída compacta difere da implementação anterior")
+
+        mem_antes = medir_memoria(aeroportos_legado, *args)
+        mem_depois = medir_memoria(aeroportos_compacto, *args)
+
+    print(f"{'AIRPORTS':<12} {linhas:>10} linhas | antes: {mem_antes:>8,.0f} MB em {t_antes:.1f}s | "
+          f"depois: {mem_depois:>8,.0f} MB em {t_depois:.1f}s | memória: {mem_antes / mem_depois:.1f}x menor")
+
+def benchmark_nomes_aeroportos(linhas=40_000, codigos=1_500):
+    """Nomes dos aeroportos repetidos: database lido a cada execução contra o índice persistente
+
+    linhas é o número de aeroportos no airports_database.csv sintético.
+    """
+    with tempfile.TemporaryDirectory() as diretorio:
+        base = Path(diretorio)
+        rng = np.random.default_rng(42)
+        synthetic_data.gerar_aeroportos(rng, 0, base / 'AIRPORTS.csv', base / 'airports_database.csv',
+                                        quantidade_codigos=linhas)
+        database = pd.read_csv(base / 'airports_database.csv', dtype=str)
+        procurados = pd.Series(rng.choice(database['gps_code'].fillna('XXXX').to_numpy(), codigos), dtype=object)
+
+        def indice():
+            return IndiceAeroportos(base / 'airports_database.csv', base / 'indice.npz').resolver(procurados)[0].tolist()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            ref, t_antes = medir(nomes_legado, base / 'airports_database.csv', procurados)
+            _, t_construcao = medir(indice)
+            novo, t_depois = medir(indice)
+        if ref != novo:
+            raise AssertionError("AIRPORTS: nomes do índice diferem da implementação anterior")
+
+    print(f"{'NOMES':<12} {codigos:>10} códigos | antes: {t_antes * 1000:>8.1f} ms | "
+          f"índice: {t_depois * 1000:>8.1f} ms (construção: {t_construcao * 1000:.1f} ms) | "
+          f"ganho: {t_antes / t_depois:.1f}x")
+
+def benchmark_compressao(linhas=1_000_000):
+    """Escrita e leitura do INSERT de ACCIDENTS sem compressão, com gzip e com zstd"""
+    df = gerar_acidentes(linhas)
+    valores = build_values(sql_frame({col: format_sql_column(df[col], tipo) for col, tipo in TIPOS_ACIDENTES}))
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        referencia = None
+        for extensao, nome in {'': 'texto', '.gz': 'gzip', '.zst': 'zstd'}.items():
+            caminho = Path(diretorio) / f'ACCIDENTS_insert.sql{extensao}'
+
+            def escrever():
+                with abrir(caminho, 'w') as f:
+                    write_values(f, valores, block_size=500)
+
+            def ler():
+                with abrir(caminho) as f:
+                    return f.read()
+
+            try:
+                _, t_escrita = medir(escrever)
+            except RuntimeError as e:  # zstandard não instalado
+                print(f"{'ACCIDENTS':<12} {linhas:>10} linhas | {nome:<5} | ignorado: {e}")
+                continue
+            conteudo, t_leitura = medir(ler)
+            referencia = referencia or conteudo
+            if conteudo != referencia:
+                raise AssertionError(f"ACCIDENTS: conteúdo lido do arquivo {nome} difere do original")
+            tamanho = caminho.stat().st_size / 2**20
+            print(f"{'ACCIDENTS':<12} {linhas:>10} linhas | {nome:<5} | escrita: {t_escrita:>5.2f}s | "
+                  f"leitura: {t_leitura:>5.2f}s | {tamanho:>8.1f} MB")
+
+def benchmark_shards(linhas=1_000_000, workers=(1, 2, 4, 8)):
+    """Escalabilidade da geração do INSERT de ACCIDENTS em N processos contra o processo único"""
+    df = gerar_acidentes(linhas)
+    with tempfile.TemporaryDirectory() as diretorio:
+        referencia = Path(diretorio) / 'unico.sql'
+
+        def unico():
+            with open(referencia, 'w', encoding='utf-8') as f:
+                write_values(f, build_values(sql_frame({col: format_sql_column(df[col], tipo)
+                                                        for col, tipo in TIPOS_ACIDENTES})))
+        _, t_unico = medir(unico)
+        print(f"{'ACCIDENTS':<12} {linhas:>10} linhas | 1 processo (sem shards): {t_unico:>6.1f}s")
+
+        for n in workers:
+            caminho = Path(diretorio) / f'shards_{n}.sql'
+
+            def em_shards():
+                with open(caminho, 'w', encoding='utf-8') as f:
+                    gerar_em_shards(f, df, formatar_fatia_acidentes, n)
+            _, t = medir(em_shards)
+            if not filecmp.cmp(referencia, caminho, shallow=False):
+                raise AssertionError(f"ACCIDENTS: saída com {n} workers difere do processo único")
+            print(f"{'':<12} {'':>10}        | {n} workers: {t:>6.1f}s | ganho: {t_unico / t:.1f}x")
+
+def benchmark_leitura_csv(linhas=1_000_000):
+    """Leitura das maiores entradas (ACCIDENTS, WEATHER, LOCATIONS) pelo leitor C do pandas e pelo pyarrow
+
+    Confere que os DataFrames têm os mesmos valores e compara o tempo e a memória ocupada por eles
+    (memory_usage com deep=True: os textos do leitor C são um objeto Python por célula).
+    """
+    with tempfile.TemporaryDirectory() as diretorio:
+        entrada = gerar_entradas(diretorio, linhas)
+        for chave, arquivo in [('accidents_input', 'ACCIDENTS_filtrado.csv'), ('weather_input', 'WEATHER_filtrado.csv'),
+                               ('locations_input', 'LOCATIONS_filtrado.csv')]:
+            caminho = entrada / arquivo
+            ref, t_c = medir(lambda: ler_csv(chave, caminho=caminho, motor='c'))
+            try:
+                novo, t_arrow = medir(lambda: ler_csv(chave, caminho=caminho, motor='pyarrow'))
+            except RuntimeError as e:  # pyarrow não instalado
+                print(f"{arquivo.split('_')[0]:<12} {linhas:>10} linhas | ignorado: {e}")
+                continue
+            pd.testing.assert_frame_equal(ref.astype(object), novo.astype(object))
+            mem_c, mem_arrow = (df.memory_usage(deep=True).sum() / 2**20 for df in (ref, novo))
+            print(f"{arquivo.split('_')[0]:<12} {linhas:>10} linhas | c: {t_c:>5.2f}s {mem_c:>7,.0f} MB | "
+                  f"pyarrow: {t_arrow:>5.2f}s {mem_arrow:>7,.0f} MB | ganho: {t_c / t_arrow:.1f}x, "
+                  f"memória {mem_c / mem_arrow:.1f}x menor")
+
+def benchmark_road_features(linhas=7_000_000):
+    """ROAD_FEATURES: 13 colunas int64 por evento contra a máscara uint16 (conversão, deduplicação e SQL)"""
+    df = gerar_road_features(linhas)
+    (ref, ids_ref, convertido), t_antes = medir(road_features_legado, df)
+    (novo, ids_novos, compacto), t_depois = medir(road_features_mascara, df)
+    if ref != novo or not np.array_equal(ids_ref, ids_novos):
+        raise AssertionError("ROAD_FEATURES: saída da máscara difere da implementação anterior")
+
+    # Memória da representação das features depois da leitura (o que fica para a etapa inteira)
+    mem_antes = convertido[BOOL_COLS_ROAD_FEATURES].memory_usage(index=False).sum() / 2**20
+    mem_depois = compacto.memory_usage(index=False).sum() / 2**20
+    print(f"{'ROAD_FEAT.':<12} {linhas:>10} linhas | antes: {mem_antes:>7,.1f} MB em {t_antes:.2f}s | "
+          f"máscara: {mem_depois:>7,.1f} MB em {t_depois:.2f}s | memória: {mem_antes / mem_depois:.0f}x menor | "
+          f"ganho: {t_antes / t_depois:.1f}x")
+
+def benchmark_filtro_tabelas(linhas=1_000_000, chunksize=100_000):
+    """Filtragem em blocos com os dtypes inferidos (inferir_dtypes) contra a leitura da tabela inteira
+
+    A tabela tem colunas cujo tipo só muda em blocos tardios; as duas saídas têm de ser idênticas byte a byte.
+    """
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = Path(diretorio) / 'TABELA.csv'
+        gerar_tabela_tipos(linhas).to_csv(caminho, index=False)
+        mascara = np.random.default_rng(42).random(linhas - linhas // 100) < 0.3  # Menor que a tabela
+        caminho_mascara = Path(diretorio) / 'mascara.npy'
+        np.save(caminho_mascara, mascara)
+
+        referencia, t_antes = medir(filtrar_tabela_legado, caminho, mascara)
+        _, t_depois = medir(pre_processamento.filtrar_tabela, caminho, caminho_mascara, chunksize)
+        if not filecmp.cmp(referencia, caminho.with_name('TABELA_filtrado.csv'), shallow=False):
+            raise AssertionError("FILTRO: saída em blocos difere da leitura da tabela inteira")
+        mem_antes = medir_memoria(filtrar_tabela_legado, caminho, mascara)
+        mem_depois = medir_memoria(pre_processamento.filtrar_tabela, caminho, caminho_mascara, chunksize)
+
+    print(f"{'FILTRO':<12} {linhas:>10} linhas | tabela inteira: {mem_antes:>7,.0f} MB em {t_antes:.2f}s | "
+          f"em blocos: {mem_depois:>7,.0f} MB em {t_depois:.2f}s | saída idêntica")
+
+# ================= SUÍTE COMPLETA =================
+RAIZ_PROJETO = Path(__file__).resolve().parent.parent
+
+def commit_atual():
+    """Hash curto do commit do repositório (None fora de um repositório git)"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ_PROJETO, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def executar_suite(raiz, *argumentos):
+    """Roda o run_suite.py da árvore em raiz e retorna (segundos, métricas das etapas dessa execução)"""
+    ambiente = dict(os.environ, US_ACCIDENTS_BASE=str(raiz))
+    # O run_suite chama 'python': garante que seja o mesmo interpretador deste processo
+    ambiente['PATH'] = os.pathsep.join([str(Path(sys.executable).parent), ambiente.get('PATH', '')])
+    metricas = Path(raiz) / 'Logs' / 'test_suite_metrics.jsonl'
+    antes = metricas.stat().st_size if metricas.exists() else 0
+
+    inicio = time.perf_counter()
+    subprocess.run([sys.executable, str(Path(raiz) / 'Scripts' / 'run_suite.py'), *argumentos],
+                   cwd=raiz, env=ambiente, check=True, capture_output=True)
+    segundos = time.perf_counter() - inicio
+
+    with open(metricas, encoding='utf-8') as f:
+        f.seek(antes)
+        return segundos, [json.loads(linha) for linha in f if linha.strip()]
+
+def preparar_arvore(raiz):
+    """Copia os scripts e o create-table.sql para uma árvore de trabalho isolada em raiz"""
+    shutil.copytree(Path(__file__).resolve().parent, raiz / 'Scripts', dirs_exist_ok=True,
+                    ignore=shutil.ignore_patterns('__pycache__'))
+    shutil.copy2(RAIZ_PROJETO / 'create-table.sql', raiz / 'create-table.sql')
+    for pasta in ('Logs', 'data/output'):
+        (raiz / pasta).mkdir(parents=True, exist_ok=True)
+
+def resultado_anterior(linhas, seed):
+    """Última execução salva com a mesma escala e semente (None se não houver)"""
+    anterior = None
+    if PATHS['benchmark_results'].exists():
+        with open(PATHS['benchmark_results'], encoding='utf-8') as f:
+            for linha in f:
+                registro = json.loads(linha)
+                if registro['linhas'] == linhas and registro['seed'] == seed:
+                    anterior = registro
+    return anterior
+
+def variacao(atual, anterior):
+    return f"{(atual / anterior - 1) * 100:>+6.1f}%" if anterior else f"{'-':>7}"
+
+def benchmark_pipeline(linhas=10_000, seed=42, diretorio=None):
+    """Suíte completa sobre dados sintéticos: cada etapa isolada (serial) e de ponta a ponta
+
+    Gera as entradas com synthetic_data numa cópia dos scripts, roda o run_suite.py com
+    --workers 1 (tempo de cada etapa sem concorrência) e depois com o paralelismo padrão
+    (tempo total). O resultado é anexado a PATHS['benchmark_results'] com o commit atual e
+    comparado com a última execução de mesma escala e semente.
+    """
+    with tempfile.TemporaryDirectory() as temporario:
+        raiz = Path(diretorio or temporario)
+        preparar_arvore(raiz)
+
+        _, t_entradas = medir(gerar_entradas, raiz, linhas, seed)
+        _, etapas = executar_suite(raiz, '--force', '--workers', '1')
+        t_total, completa = executar_suite(raiz, '--force')
+
+    falhas = [m['etapa'] for m in etapas + completa if m['status'] != 'ok']
+    if falhas:
+        raise RuntimeError(f"Etapas com falha no benchmark da suíte: {', '.join(sorted(set(falhas)))}")
+
+    registro = {
+        'commit': commit_atual(),
+        'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'linhas': linhas,
+        'seed': seed,
+        'geracao_entradas_s': round(t_entradas, 3),
+        'etapas': {m['etapa']: {campo: m.get(campo) for campo in ('wall_s', 'cpu_s', 'pico_rss_mb', 'linhas_por_s')}
+                   for m in etapas},
+        'serial_s': round(sum(m['wall_s'] for m in etapas), 3),
+        'total_s': round(t_total, 3)
+    }
+    anterior = resultado_anterior(linhas, seed)
+
+    PATHS['benchmark_results'].parent.mkdir(parents=True, exist_ok=True)
+    with open(PATHS['benchmark_results'], 'a', encoding='utf-8') as f:
+        f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+    base = anterior['etapas'] if anterior else {}
+    print(f"SUÍTE {linhas:,} linhas (seed {seed}, commit {registro['commit']}) | "
+          f"comparado com: {anterior['commit'] if anterior else '-'}")
+    print(f"{'etapa':<32} {'wall (s)':>9} {'variação':>8} {'RSS (MB)':>9} {'linhas/s':>12}")
+    for etapa, m in registro['etapas'].items():
+        anterior_s = base.get(etapa, {}).get('wall_s')
+        print(f"{etapa:<32} {m['wall_s']:>9.2f} {variacao(m['wall_s'], anterior_s):>8} "
+              f"{m['pico_rss_mb'] or 0:>9.0f} {m['linhas_por_s'] or 0:>12,.0f}")
+    print(f"{'soma das etapas (serial)':<32} {registro['serial_s']:>9.2f} "
+          f"{variacao(registro['serial_s'], anterior and anterior['serial_s']):>8}")
+    print(f"{'ponta a ponta (paralelo)':<32} {registro['total_s']:>9.2f} "
+          f"{variacao(registro['total_s'], anterior and anterior['total_s']):>8}")
+    print(f"Resultado salvo em: {PATHS['benchmark_results']}")
+
+def benchmark_carga_sqlite(linhas=10_000, seed=42, diretorio=None):
+    """Carga direta no SQLite (substituto offline do MySQL) conferida contra os INSERTs gerados
+
+    Roda a suíte sobre dados sintéticos com DATABASE['url'] apontando para um arquivo SQLite
+    e compara, tabela a tabela, o conteúdo do banco com o .sql (bulk_export.py --banco).
+    """
+    with tempfile.TemporaryDirectory() as temporario:
+        raiz = Path(diretorio or temporario)
+        preparar_arvore(raiz)
+        banco = raiz / 'data' / 'output' / 'us_accidents.db'
+        banco.unlink(missing_ok=True)
+        config = raiz / 'Scripts' / 'paths.py'
+        config.write_text(config.read_text(encoding='utf-8').replace(
+            "'url': None,", f"'url': {f'sqlite:///{banco.as_posix()}'!r},", 1), encoding='utf-8')
+
+        gerar_entradas(raiz, linhas, seed)
+        t_total, metricas = executar_suite(raiz, '--force')
+        falhas = [m['etapa'] for m in metricas if m['status'] != 'ok']
+        if falhas:
+            raise RuntimeError(f"Etapas com falha na carga SQLite: {', '.join(sorted(set(falhas)))}")
+
+        ambiente = dict(os.environ, US_ACCIDENTS_BASE=str(raiz))
+        verificacao = subprocess.run(
+            [sys.executable, str(raiz / 'Scripts' / 'bulk_export.py'), '--banco', f'sqlite:///{banco.as_posix()}'],
+            cwd=raiz, env=ambiente, capture_output=True, text=True)
+        print(f"CARGA SQLITE {linhas:,} linhas: suíte em {t_total:.2f}s")
+        print(verificacao.stdout.strip())
+        if verificacao.returncode != 0:
+            raise RuntimeError("Conteúdo do SQLite diverge dos INSERTs gerados")
+
+def executar_pipeline_incremental(raiz):
+    """Roda o pipeline.py --incremental da árvore em raiz e retorna {tabela: tuplas do INSERT gerado}"""
+    ambiente = dict(os.environ, US_ACCIDENTS_BASE=str(raiz))
+    subprocess.run([sys.executable, str(raiz / 'Scripts' / 'pipeline.py'), '--incremental'],
+                   cwd=raiz, env=ambiente, check=True, capture_output=True)
+    return {tabela: ler_insert_sql(raiz / caminho.relative_to(BASE_PATH)) for tabela, caminho in ARQUIVOS_SQL.items()}
+
+def copiar_lote(origem, destino, inicio, fim):
+    """Copia para destino/data/input os eventos [inicio, fim) de cada entrada, com os cabeçalhos
+
+    Os dados sintéticos não têm quebras de linha dentro dos campos: cada linha é um evento.
+    """
+    cabecalhos = {nome: 1 if titulo is None else 2 for nome, (titulo, _) in synthetic_data.TABELAS.items()}
+    cabecalhos['AIRPORTS.csv'] = 1
+    entrada = destino / 'data' / 'input'
+    for nome, linhas_cabecalho in cabecalhos.items():
+        with open(origem / 'data' / 'input' / nome, encoding='utf-8') as f:
+            linhas = f.readlines()
+        with open(entrada / nome, 'w', encoding='utf-8') as f:
+            f.writelines(linhas[:linhas_cabecalho] + linhas[linhas_cabecalho + inicio:linhas_cabecalho + fim])
+    shutil.copy2(origem / 'data' / 'input' / 'airports_database.csv', entrada / 'airports_database.csv')
+
+def executar_scripts_sqlite(raiz, banco):
+    """Executa os INSERTs gerados na árvore em raiz num SQLite com as chaves estrangeiras ativas
+
+    O esquema é criado se preciso e os scripts rodam na ordem das FKs; um script inválido (como um
+    INSERT sem tuplas) interrompe a verificação com sqlite3.OperationalError. Não vale com
+    ENVELOPE_CARGA, cujos comandos são do MySQL.
+    """
+    con = sqlite3.connect(banco)
+    con.execute("PRAGMA foreign_keys = ON")
+    for comando in ddl_sqlite(raiz / 'create-table.sql'):
+        con.execute(comando)
+    for tabela in ler_esquema(raiz / 'create-table.sql'):
+        with abrir(raiz / ARQUIVOS_SQL[tabela].relative_to(BASE_PATH)) as f:
+            con.executescript(f.read())
+    con.commit()
+    con.close()
+
+def benchmark_incremental(linhas=10_000, seed=42, diretorio=None):
+    """Carga incremental em dois lotes (60% + 40% dos eventos) contra um lote único com todos os eventos
+
+    Concatenados, os INSERTs dos dois lotes têm de ser iguais, tupla a tupla e com os mesmos IDs,
+    aos da carga de uma vez só: o resultado não pode depender de como os eventos foram divididos.
+    Os scripts de cada lote também são executados, em sequência, num SQLite, que no fim é comparado
+    com os INSERTs do lote único (bulk_export.py --banco).
+    """
+    corte = linhas * 6 // 10
+    with tempfile.TemporaryDirectory() as temporario:
+        raiz = Path(diretorio or temporario)
+        completa, lotes = raiz / 'completa', raiz / 'lotes'
+        for arvore in (completa, lotes):
+            preparar_arvore(arvore)
+        gerar_entradas(completa, linhas, seed)
+        (lotes / 'data' / 'input').mkdir(parents=True, exist_ok=True)
+        banco = lotes / 'data' / 'output' / 'lotes.db'
+        banco.unlink(missing_ok=True)
+
+        esperado, t_completa = medir(executar_pipeline_incremental, completa)
+        obtido, t_lotes = defaultdict(list), 0.0
+        for inicio, fim in ((0, corte), (corte, linhas)):
+            copiar_lote(completa, lotes, inicio, fim)
+            tuplas, segundos = medir(executar_pipeline_incremental, lotes)
+            t_lotes += segundos
+            for tabela, linhas_tabela in tuplas.items():
+                obtido[tabela].extend(linhas_tabela)
+            executar_scripts_sqlite(lotes, banco)
+
+        ambiente = dict(os.environ, US_ACCIDENTS_BASE=str(completa))
+        verificacao = subprocess.run(
+            [sys.executable, str(completa / 'Scripts' / 'bulk_export.py'), '--banco', f'sqlite:///{banco.as_posix()}'],
+            cwd=completa, env=ambiente, capture_output=True, text=True)
+
+    print(f"INCREMENTAL {linhas:,} linhas | lote único: {t_completa:.2f}s | "
+          f"lotes de {corte:,} + {linhas - corte:,}: {t_lotes:.2f}s")
+    divergentes = []
+    for tabela, tuplas in esperado.items():
+        diferentes = [i for i, (a, b) in enumerate(zip(tuplas, obtido[tabela])) if a != b]
+        if len(tuplas) != len(obtido[tabela]) or diferentes:
+            divergentes.append(tabela)
+            print(f"{tabela}: DIVERGENTE - {len(tuplas)} linhas no lote único, {len(obtido[tabela])} nos lotes, "
+                  f"{len(diferentes)} diferentes (primeira: {diferentes[0] + 1 if diferentes else '-'})")
+        else:
+            print(f"{tabela}: OK - {len(tuplas)} linhas idênticas")
+    print("Scripts dos lotes executados no SQLite:")
+    print(verificacao.stdout.strip())
+    if verificacao.returncode != 0:
+        divergentes.append('SQLite')
+    if divergentes:
+        raise RuntimeError(f"Carga em lotes diverge do lote único: {', '.join(divergentes)}")
+
+BENCHMARKS = {
+    'sql_writer': benchmark_sql_writer,
+    'aeroportos': benchmark_aeroportos,
+    'timestamps': benchmark_timestamps,
+    'tipagem': benchmark_tipagem,
+    'shards': benchmark_shards,
+    'nomes_aeroportos': benchmark_nomes_aeroportos,
+    'compressao': benchmark_compressao,
+    'leitura_csv': benchmark_leitura_csv,
+    'road_features': benchmark_road_features,
+    'filtro_tabelas': benchmark_filtro_tabelas,
+    'pipeline': benchmark_pipeline,
+    'carga_sqlite': benchmark_carga_sqlite,
+    'incremental': benchmark_incremental,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks dos scripts de geração de SQL")
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+    parser.add_argument('--linhas', type=ler_escala, default=None,
+                        help="tamanho dos dados sintéticos, ex.: 10k, 1M, 10M (padrão: o de cada benchmark)")
+    parser.add_argument('--seed', type=int, default=42, help="semente dos dados sintéticos (pipeline, carga_sqlite e incremental)")
+    parser.add_argument('--diretorio', default=None,
+                        help="árvore de trabalho do pipeline, carga_sqlite e incremental, mantida após a execução (padrão: temporária)")
+    args = parser.parse_args()
+
+    opcoes = {'linhas': args.linhas} if args.linhas else {}
+    if args.benchmark in ('pipeline', 'carga_sqlite', 'incremental'):
+        opcoes.update(seed=args.seed, diretorio=args.diretorio)
+    BENCHMARKS[args.benchmark](**opcoes)
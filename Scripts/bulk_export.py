@@ -0,0 +1,178 @@
+import argparse
+import re
+from collections import Counter
+from paths import PATHS, BULK_EXPORT
+from sql_writer import NULL, TAMANHO_ESCRITA, parse_literal
+from db_loader import ler_esquema, criar_pool
+from compressed_io import abrir
+
+# Arquivos INSERT gerados para cada tabela (usados na verificação de ida e volta)
+ARQUIVOS_SQL = {
+    'WEATHER_CONDITIONS': PATHS['weather_conditions_insert'],
+    'DAY_PERIODS': PATHS['day_periods_insert'],
+    'WEATHER': PATHS['weather_insert'],
+    'AIRPORTS': PATHS['airports_insert'],
+    'LOCATIONS': PATHS['locations_insert'],
+    'ROAD_FEATURES': PATHS['road_features_insert'],
+    'ACCIDENTS': PATHS['accidents_output']
+}
+
+# Formato padrão do LOAD DATA: campos separados por TAB, escape com '\' e NULL como \N
+NULL_TSV = r'\N'
+_ESCAPES = [('\\', '\\\\'), ('\t', '\\t'), ('\n', '\\n'), ('\r', '\\r'), ('\0', '\\0')]
+_DESESCAPES = {'\\': '\\', 't': '\t', 'n': '\n', 'r': '\r', '0': '\0'}
+
+def caminho_tsv(tabela):
+    return PATHS['bulk_dir'] / f"{tabela}.tsv"
+
+# ================= ESCRITA =================
+def escape_tsv(serie):
+    """Escapa uma coluna de valores Python (None ou texto) para o formato do LOAD DATA"""
+    texto = serie.astype(str)
+    for original, escapado in _ESCAPES:
+        texto = texto.str.replace(original, escapado, regex=False)
+    texto[serie.isna().to_numpy()] = NULL_TSV
+    return texto
+
+def escrever_tsv(tabela, literais, anexar=False):
+    """Escreve (ou acrescenta) as linhas de um sql_frame no .tsv da tabela, na ordem do create-table.sql"""
+    colunas = ler_esquema()[tabela]
+    campos = [escape_tsv(parse_literal(literais[coluna])).to_numpy(dtype=object) for coluna in colunas]
+    linhas = campos[0]
+    for campo in campos[1:]:
+        linhas = linhas + '\t' + campo
+
+    PATHS['bulk_dir'].mkdir(parents=True, exist_ok=True)
+    with open(caminho_tsv(tabela), 'a' if anexar else 'w', encoding='utf-8', newline='') as f:
+        for i in range(0, len(linhas), TAMANHO_ESCRITA):
+            f.write("".join(linha + '\n' for linha in linhas[i:i+TAMANHO_ESCRITA]))
+
+def escrever_script_load_data():
+    """Gera o load_data.sql com um LOAD DATA por tabela, na ordem das chaves estrangeiras"""
+    PATHS['bulk_dir'].mkdir(parents=True, exist_ok=True)
+    with open(PATHS['bulk_load_script'], 'w', encoding='utf-8') as f:
+        f.write("-- LOAD DATA statements for US_ACCIDENTS tables\n")
+        f.write("-- Campos separados por TAB, escape com '\\' e NULL representado por \\N\n\n")
+        for tabela, colunas in ler_esquema().items():
+            f.write(f"LOAD DATA LOCAL INFILE '{caminho_tsv(tabela).as_posix()}'\n")
+            f.write(f"INTO TABLE {tabela}\n")
+            f.write("CHARACTER SET utf8mb4\n")
+            f.write("FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'\n")
+            f.write("LINES TERMINATED BY '\\n'\n")
+            f.write(f"({', '.join(colunas)});\n\n")
+
+def exportar_se_configurado(tabela, literais, anexar=False):
+    """Usado pelos geradores: exporta o .tsv da tabela quando BULK_EXPORT está ativo"""
+    if not BULK_EXPORT:
+        return
+    escrever_tsv(tabela, literais, anexar)
+    escrever_script_load_data()
+    if not anexar:
+        print(f"Arquivo para LOAD DATA gerado: {caminho_tsv(tabela)}")
+
+# ================= LEITURA E VERIFICAÇÃO =================
+def _desescapar(campo):
+    if campo == NULL_TSV:
+        return None
+    return re.sub(r'\\(.)', lambda m: _DESESCAPES.get(m.group(1), m.group(1)), campo)
+
+def ler_tsv(tabela):
+    """Lê o .tsv da tabela de volta como lista de tuplas (None ou texto)"""
+    with open(caminho_tsv(tabela), encoding='utf-8', newline='') as f:
+        return [tuple(_desescapar(campo) for campo in linha.rstrip('\n').split('\t')) for linha in f]
+
+_TOKEN_RE = re.compile(r"'(?:[^']|'')*'|[(),;]|[^\s(),;']+")
+
+def ler_insert_sql(caminho):
+    """Lê as tuplas de um arquivo INSERT ... VALUES gerado pelos scripts (None ou texto), comprimido ou não
+
+    Só são lidas as tuplas entre um VALUES e o ';' seguinte, então scripts com vários INSERTs e
+    outros comandos (como o envelope de carga) também são aceitos.
+    """
+    with abrir(caminho) as f:
+        texto = f.read()
+    if ' VALUES' not in texto:
+        return []  # Script sem linhas (só comentários)
+    linhas, atual, em_values = [], None, True
+    for token in _TOKEN_RE.findall(texto[texto.index(' VALUES') + len(' VALUES'):]):
+        if atual is None and token in ('VALUES', ';'):
+            em_values = token == 'VALUES'
+        elif token == '(' and em_values:
+            atual = []
+        elif token == ')' and atual is not None:
+            linhas.append(tuple(atual))
+            atual = None
+        elif atual is not None and token != ',':
+            if token == NULL:
+                atual.append(None)
+            elif token.startswith("'"):
+                atual.append(token[1:-1].replace("''", "'"))
+            else:
+                atual.append(token)
+    return linhas
+
+def verificar_round_trip(tabela):
+    """Confere, linha a linha, se o .tsv tem o mesmo conteúdo do INSERT gerado para a tabela"""
+    esperado = ler_insert_sql(ARQUIVOS_SQL[tabela])
+    obtido = ler_tsv(tabela)
+    diferentes = [i for i, (a, b) in enumerate(zip(esperado, obtido)) if a != b]
+    if len(esperado) != len(obtido) or diferentes:
+        print(f"{tabela}: DIVERGENTE - {len(esperado)} linhas no SQL, {len(obtido)} no TSV, "
+              f"{len(diferentes)} diferentes (primeira: {diferentes[0] + 1 if diferentes else '-'})")
+        return False
+    print(f"{tabela}: OK - {len(obtido)} linhas idênticas")
+    return True
+
+def _normalizar(valor):
+    """Valor do banco ou do .sql -> forma comparável (números como float, demais como texto)"""
+    if valor is None:
+        return None
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return str(valor)
+
+def verificar_banco(pool, tabela):
+    """Confere se a tabela carregada no banco tem as mesmas linhas do INSERT gerado (em qualquer ordem)"""
+    colunas = ler_esquema()[tabela]
+    esperado = Counter(tuple(map(_normalizar, linha)) for linha in ler_insert_sql(ARQUIVOS_SQL[tabela]))
+    with pool.conexao() as con:
+        cur = con.cursor()
+        cur.execute(f"SELECT {', '.join(colunas)} FROM {tabela}")
+        obtido = Counter(tuple(map(_normalizar, linha)) for linha in cur.fetchall())
+        cur.close()
+    total = sum(obtido.values())
+    if esperado != obtido:
+        faltando = sum((esperado - obtido).values())
+        sobrando = sum((obtido - esperado).values())
+        print(f"{tabela}: DIVERGENTE - {sum(esperado.values())} linhas no SQL, {total} no banco, "
+              f"{faltando} ausentes e {sobrando} a mais no banco")
+        return False
+    print(f"{tabela}: OK - {total} linhas idênticas no banco")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arquivos para LOAD DATA INFILE das tabelas US_ACCIDENTS")
+    parser.add_argument('--verificar', action='store_true',
+                        help="compara cada .tsv com o INSERT .sql correspondente")
+    parser.add_argument('--banco', metavar='URL',
+                        help="compara cada tabela do banco (sqlite:///arquivo ou mysql://...) com o INSERT .sql")
+    args = parser.parse_args()
+
+    escrever_script_load_data()
+    print(f"Script LOAD DATA gerado: {PATHS['bulk_load_script']}")
+    if args.verificar:
+        resultados = [
+            verificar_round_trip(tabela) for tabela in ler_esquema()
+            if caminho_tsv(tabela).exists() and ARQUIVOS_SQL[tabela].exists()
+        ]
+        if not all(resultados):
+            raise SystemExit(1)
+    if args.banco:
+        pool = criar_pool(args.banco, tamanho=1)
+        resultados = [
+            verificar_banco(pool, tabela) for tabela in ler_esquema() if ARQUIVOS_SQL[tabela].exists()
+        ]
+        pool.close()
+        if not all(resultados):
+            raise SystemExit(1)
@@ -0,0 +1,128 @@
+import gzip
+import io
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from paths import EXTENSOES_COMPRESSAO
+
+# Abertura dos arquivos gerados, com compressão opcional. A escrita escolhe o formato pela extensão
+# (.gz ou .zst) e a leitura pelo conteúdo (assinatura do gzip ou do zstd), então quem lê um arquivo
+# não precisa saber como ele foi gravado. A escrita vai para um arquivo temporário, renomeado para o
+# nome final só quando termina: uma falha no meio nunca deixa um arquivo pela metade com o nome final.
+
+TAMANHO_BUFFER = 1 << 20    # Buffer de escrita (1 MiB): poucas chamadas grandes ao sistema
+NIVEL_GZIP = 6              # O padrão do gzip (9) comprime pouco mais e é bem mais lento
+NIVEL_ZSTD = 3
+
+_ASSINATURAS = {b'\x1f\x8b': 'gzip', b'\x28\xb5\x2f\xfd': 'zstd'}
+_FORMATOS = {extensao: formato for formato, extensao in EXTENSOES_COMPRESSAO.items()}
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("Arquivos .zst requerem o pacote zstandard (pip install zstandard)")
+    return zstandard
+
+def formato_compressao(caminho, modo='r'):
+    """'gzip', 'zstd' ou None: pelo conteúdo na leitura, pela extensão na escrita"""
+    if 'r' in modo:
+        with open(caminho, 'rb') as f:
+            inicio = f.read(4)
+        return next((formato for assinatura, formato in _ASSINATURAS.items() if inicio.startswith(assinatura)), None)
+    return _FORMATOS.get(Path(caminho).suffix.lower())
+
+def sufixo_sem_compressao(caminho):
+    """Extensão do conteúdo: '.sql' tanto para X.sql quanto para X.sql.gz"""
+    sufixos = [s.lower() for s in Path(caminho).suffixes]
+    if sufixos and sufixos[-1] in _FORMATOS:
+        sufixos.pop()
+    return sufixos[-1] if sufixos else ''
+
+def caminho_sem_compressao(caminho):
+    """O mesmo caminho sem a extensão de compressão: X.sql para X.sql.gz (X.sql fica igual)"""
+    caminho = Path(caminho)
+    return caminho.with_suffix('') if caminho.suffix.lower() in _FORMATOS else caminho
+
+def caminho_temporario(caminho):
+    """Arquivo ao lado de caminho, com a mesma extensão, usado enquanto a escrita não termina"""
+    caminho = Path(caminho)
+    return caminho.with_name(f"{caminho.stem}.tmp{caminho.suffix}")
+
+@contextmanager
+def escrita_atomica(caminho):
+    """Entrega um caminho temporário para a escrita e o renomeia para caminho (os.replace) se o
+    bloco terminar sem erro; se falhar, o temporário é apagado e caminho fica como estava"""
+    temporario = caminho_temporario(caminho)
+    try:
+        yield temporario
+        os.replace(temporario, caminho)
+    finally:
+        if temporario.exists():
+            temporario.unlink()
+
+class _EscritaAtomica:
+    """Arquivo aberto para escrita num temporário, renomeado para o destino no close()
+
+    Usado como context manager, uma exceção dentro do bloco descarta o temporário.
+    """
+
+    def __init__(self, caminho, abrir_temporario):
+        self._caminho = caminho
+        self._temporario = caminho_temporario(caminho)
+        self._arquivo = abrir_temporario(self._temporario)
+
+    def __getattr__(self, nome):
+        return getattr(self._arquivo, nome)
+
+    def close(self):
+        if not self._arquivo.closed:
+            self._arquivo.close()
+            os.replace(self._temporario, self._caminho)
+
+    def descartar(self):
+        self._arquivo.close()
+        self._temporario.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, rastro):
+        if tipo is None:
+            self.close()
+        else:
+            self.descartar()
+
+def abrir(caminho, modo='r', encoding='utf-8', newline=None):
+    """Abre um arquivo de texto ('r', 'w', 'a') ou binário ('rb', 'wb', 'ab'), comprimido ou não
+
+    Nos modos 'w' e 'wb' a escrita é atômica: o arquivo só aparece com o nome final no close().
+    """
+    if modo.startswith('w'):
+        return _EscritaAtomica(Path(caminho), lambda temporario: _abrir(temporario, modo, encoding, newline,
+                                                                        nome=Path(caminho).name))
+    return _abrir(caminho, modo, encoding, newline)
+
+def _abrir(caminho, modo, encoding, newline, nome=None):
+    """nome: nome do arquivo final, gravado no cabeçalho do gzip no lugar do temporário"""
+    compressao = formato_compressao(caminho, modo)
+    if compressao is None:
+        if 'b' in modo:
+            return open(caminho, modo, buffering=TAMANHO_BUFFER)
+        return open(caminho, modo, buffering=TAMANHO_BUFFER, encoding=encoding, newline=newline)
+
+    modo_binario = modo.replace('b', '') + 'b'
+    if compressao == 'gzip':
+        # mtime=0: o mesmo conteúdo gera sempre o mesmo arquivo (e o mesmo hash no cache da suíte)
+        bruto = open(caminho, modo_binario)
+        arquivo = gzip.GzipFile(nome or Path(caminho).name, modo_binario, compresslevel=NIVEL_GZIP,
+                                fileobj=bruto, mtime=0)
+        arquivo.myfileobj = bruto  # Fechado junto com o GzipFile
+    else:
+        zstandard = _zstandard()
+        compressor = zstandard.ZstdCompressor(level=NIVEL_ZSTD) if 'r' not in modo else None
+        arquivo = zstandard.open(caminho, modo_binario, cctx=compressor)
+
+    if 'b' in modo:
+        return arquivo
+    return io.TextIOWrapper(arquivo, encoding=encoding, newline=newline)
@@ -1,77 +1,92 @@
 import pandas as pd
 import os
-from paths import PATHS  
+from paths import PATHS, EVENTOS_SQL, LINHAS_POR_INSERT_EVENTOS
+from sql_writer import escape_string, format_sql_column, sql_frame, build_values, write_insert, write_events
+from compressed_io import abrir
+from db_loader import carregar_se_configurado
+from bulk_export import exportar_se_configurado
+from load_envelope import envelopar_se_configurado
+from id_maps import salvar_mapa
+from dimension_builder import construir_dimensao
+from staging import ler_entrada
 
 # 1. Configuração de caminhos via config_paths
-input_path = PATHS['day_periods_input']
 output_path_main = PATHS['day_periods_insert']
 output_path_events = PATHS['day_periods_events']
 
-# 1. Leitura e preparação dos dados
-try:
-    # Lê o CSV pulando as 2 primeiras linhas
-    df_raw = pd.read_csv(input_path, skiprows=2, header=None, names=[
-        'Sunrise_Sunset', 'Civil_Twilight', 'Nautical_Twilight', 'Astronomical_Twilight'
-    ])
-    
-    # Limpeza dos dados
+def preparar_periodos(df_raw, conhecidas=None):
+    """Limpa a entrada e retorna (períodos únicos, ID do período de cada evento)"""
     df_raw = df_raw.apply(lambda x: x.astype(str).str.strip())
-    unique_periods = df_raw.drop_duplicates().reset_index(drop=True)
-    unique_periods.insert(0, 'id', range(1, len(unique_periods) + 1))
+    return construir_dimensao(df_raw, list(df_raw.columns), conhecidas)
 
-    # Mapeamento para os IDs
-    period_map = {
-        tuple(row[1:]): row[0] for row in unique_periods.itertuples(index=False)
-    }
-    df_raw['id'] = df_raw.apply(lambda x: period_map.get(tuple(x[['Sunrise_Sunset', 'Civil_Twilight', 'Nautical_Twilight', 'Astronomical_Twilight']])), axis=1)
+def gerar_periodos(df_raw, estado=None):
+    """Gera os INSERTs de DAY_PERIODS (e o .sql opcional de PERIOD_EVENTS) a partir da entrada
 
-except Exception as e:
-    print(f"Erro no processamento inicial: {e}")
-    exit()
+    Retorna o ID do período de cada evento, na ordem das linhas de df_raw. Com estado
+    (EstadoIncremental), só os períodos novos são gerados e os conhecidos mantêm o ID.
+    """
+    unique_periods, period_ids = preparar_periodos(df_raw, estado.chaves('DAY_PERIODS') if estado else None)
 
-# 2. Geração do SQL para day_periods
-try:
-    with open(output_path_main, "w", encoding="utf-8") as f:
-        f.write("INSERT INTO DAY_PERIODS (id, Sunrise_Sunset, Civil_Twilight, Nautical_Twilight, Astronomical_Twilight) VALUES\n")
-        
-        values = []
-        for _, row in unique_periods.iterrows():
-            vals = [
-                str(row['id']),
-                f"'{row['Sunrise_Sunset'].replace("'", "''")}'",
-                f"'{row['Civil_Twilight'].replace("'", "''")}'",
-                f"'{row['Nautical_Twilight'].replace("'", "''")}'",
-                f"'{row['Astronomical_Twilight'].replace("'", "''")}'"
-            ]
-            values.append(f"({', '.join(vals)})")
-        
-        f.write(",\n".join(values))
-        f.write(";\n")
-    
-    print(f"Main SQL gerado: {os.path.abspath(output_path_main)}")
+    # 2. Geração do SQL para day_periods
+    try:
+        literais = sql_frame({
+            'id': format_sql_column(unique_periods['id'], 'number'),
+            'Sunrise_Sunset': escape_string(unique_periods['Sunrise_Sunset']),
+            'Civil_Twilight': escape_string(unique_periods['Civil_Twilight']),
+            'Nautical_Twilight': escape_string(unique_periods['Nautical_Twilight']),
+            'Astronomical_Twilight': escape_string(unique_periods['Astronomical_Twilight'])
+        })
+        with abrir(output_path_main, "w") as f:
+            write_insert(f, "INSERT INTO DAY_PERIODS (id, Sunrise_Sunset, Civil_Twilight, "
+                            "Nautical_Twilight, Astronomical_Twilight) VALUES\n", literais)
 
-except Exception as e:
-    print(f"Erro ao gerar main SQL: {e}")
+        print(f"Main SQL gerado: {os.path.abspath(output_path_main)}")
+        envelopar_se_configurado('DAY_PERIODS', output_path_main)
+        exportar_se_configurado('DAY_PERIODS', literais)
+        carregar_se_configurado('DAY_PERIODS', literais, substituir=estado is None)
 
-# 3. Geração do SQL para PERIOD_EVENTS (se existirem IDs mapeados)
-if 'id' in df_raw.columns and not df_raw['id'].isnull().all():
-    try:
-        with open(output_path_events, "w", encoding="utf-8") as f:
-            # Cabeçalho para múltiplos INSERTs (opcional)
-            f.write("-- Inserções para tabela PERIOD_EVENTS\n")
-            f.write("-- Referenciando IDs de day_periods\n\n")
-            
-            for idx, row in df_raw.iterrows():
-                f.write(
-                    f"INSERT INTO PERIOD_EVENTS (Event_ID, day_period_id) VALUES ({idx + 1}, {row['id']});\n"
+    except Exception as e:
+        print(f"Erro ao gerar main SQL: {e}")
+
+    # 3. Versão SQL opcional do mapeamento PERIOD_EVENTS (se existirem IDs mapeados)
+    if not len(period_ids):
+        print("Aviso: Não foi possível gerar PERIOD_EVENTS - IDs não encontrados ou inválidos")
+    elif EVENTOS_SQL:
+        try:
+            with abrir(output_path_events, "w") as f:
+                # Cabeçalho para múltiplos INSERTs (opcional)
+                f.write("-- Inserções para tabela PERIOD_EVENTS\n")
+                f.write("-- Referenciando IDs de day_periods\n\n")
+
+                # Os eventos são numerados como as linhas de WEATHER (continuando as já carregadas)
+                primeiro_evento = estado.proximo_id('WEATHER') if estado else 1
+                event_ids = pd.Series(range(primeiro_evento, primeiro_evento + len(period_ids)))
+                write_events(
+                    f, "INSERT INTO PERIOD_EVENTS (Event_ID, day_period_id)",
+                    build_values([event_ids.astype(str), pd.Series(period_ids).astype(str)]),
+                    EVENTOS_SQL, LINHAS_POR_INSERT_EVENTOS
                 )
-        
-        print(f"Events SQL gerado: {os.path.abspath(output_path_events)}")
-        print(f"Total de eventos: {len(df_raw)}")
-    
+            print(f"Events SQL gerado: {os.path.abspath(output_path_events)}")
+
+        except Exception as e:
+            print(f"Erro ao gerar events SQL: {e}")
+
+    return period_ids
+
+if __name__ == "__main__":
+    # 1. Leitura da entrada (CSV pulando as 2 primeiras linhas, ou o Parquet de staging)
+    try:
+        df_raw = ler_entrada('day_periods_input')
     except Exception as e:
-        print(f"Erro ao gerar events SQL: {e}")
-else:
-    print("Aviso: Não foi possível gerar PERIOD_EVENTS - IDs não encontrados ou inválidos")
+        print(f"Erro no processamento inicial: {e}")
+        exit()
+
+    period_ids = gerar_periodos(df_raw)
+
+    if len(period_ids):
+        # Mapa binário evento -> período (posição no CSV -> ID), lido pelo weather_inserts.py
+        salvar_mapa('day_periods_event_ids', period_ids)
+        print(f"Mapa de eventos gerado: {os.path.abspath(PATHS['day_periods_event_ids'])}")
+        print(f"Total de eventos: {len(period_ids)}")
 
-print("Processo concluído.")
\ No newline at end of file
+    print("Processo concluído.")
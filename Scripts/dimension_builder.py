@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+# Acima disso a chave combinada é recompactada para não estourar o int64
+_LIMITE_CHAVE = 2**31
+
+def chave_combinada(df, colunas):
+    """Codifica cada combinação de valores das colunas num único inteiro por linha
+
+    Cada coluna é fatorada (nulos contam como um valor) e os códigos são empacotados
+    em base mista, como um bitmask quando as colunas são booleanas.
+    """
+    chave = np.zeros(len(df), dtype=np.int64)
+    cardinalidade = 1
+    for coluna in colunas:
+        codigos, valores = pd.factorize(df[coluna], use_na_sentinel=False)
+        if cardinalidade * max(len(valores), 1) > _LIMITE_CHAVE:
+            chave, unicos = pd.factorize(chave)
+            cardinalidade = max(len(unicos), 1)
+        chave = chave * max(len(valores), 1) + codigos
+        cardinalidade *= max(len(valores), 1)
+    return chave
+
+def chaves_texto(df, colunas):
+    """A combinação de valores (como texto) de cada linha, em tuplas: a chave guardada no
+    estado da carga incremental"""
+    return list(zip(*(df[coluna].astype(str) for coluna in colunas)))
+
+def construir_dimensao(df, colunas, conhecidas=None):
+    """Deduplica as colunas de uma dimensão e mapeia cada evento para o ID da sua combinação
+
+    Retorna (dimensao, ids): a tabela das combinações únicas na ordem da primeira
+    ocorrência (a mesma do drop_duplicates), com 'id' de 1 a n na primeira coluna, e o
+    array com o ID de cada linha de df, na ordem original.
+
+    Com conhecidas ({chave: id} das combinações já carregadas, ver chaves_texto), os IDs
+    existentes são reaproveitados: a tabela traz só as combinações novas, com IDs seguindo
+    os conhecidos, e conhecidas é atualizado com elas.
+    """
+    ids, _ = pd.factorize(chave_combinada(df, colunas))
+    _, primeiras = np.unique(ids, return_index=True)
+
+    dimensao = df[colunas].iloc[primeiras].reset_index(drop=True)
+    if conhecidas is None:
+        dimensao.insert(0, 'id', range(1, len(dimensao) + 1))
+        return dimensao, ids + 1
+
+    # Só as combinações únicas passam pelo dicionário; os eventos são mapeados pelo array
+    globais = np.empty(len(dimensao), dtype=np.int64)
+    novas = np.zeros(len(dimensao), dtype=bool)
+    for i, chave in enumerate(chaves_texto(dimensao, colunas)):
+        if chave not in conhecidas:
+            conhecidas[chave] = len(conhecidas) + 1
+            novas[i] = True
+        globais[i] = conhecidas[chave]
+    dimensao.insert(0, 'id', globais)
+    return dimensao[novas].reset_index(drop=True), globais[ids]
@@ -0,0 +1,28 @@
+import numpy as np
+from paths import PATHS
+from compressed_io import escrita_atomica
+from stage_metrics import registrar_leitura
+
+# Mapas de IDs: um array uint32 (.npy) por tabela, indexado pela posição da linha
+# no CSV de origem. Os scripts seguintes carregam o mapa com mmap, sem reler os .sql.
+TIPO_ID = np.uint32
+
+def salvar_mapa(chave, ids):
+    """Grava o mapa posição -> ID no arquivo .npy de PATHS[chave]"""
+    caminho = PATHS[chave]
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    with escrita_atomica(caminho) as temporario, open(temporario, 'wb') as f:
+        np.save(f, np.asarray(ids, dtype=TIPO_ID))
+
+def carregar_mapa(chave):
+    """Abre o mapa de PATHS[chave] mapeado em memória (somente leitura, sem cópia)"""
+    ids = np.load(PATHS[chave], mmap_mode='r')
+    registrar_leitura(len(ids))
+    return ids
+
+def ids_como_texto(ids, n):
+    """Os n primeiros IDs como texto; posições além do fim do mapa ficam None"""
+    valores = np.full(n, None, dtype=object)
+    k = min(n, len(ids))
+    valores[:k] = np.asarray(ids[:k]).astype(str)
+    return valores
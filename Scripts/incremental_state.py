@@ -0,0 +1,78 @@
+import json
+import os
+from paths import PATHS
+from dimension_builder import chaves_texto
+
+# Estado da carga incremental: as chaves das dimensões e o último ID de cada tabela de fatos já
+# gerados em execuções anteriores. Com ele, um lote novo de eventos gera só os membros novos das
+# dimensões (reaproveitando os IDs existentes) e as linhas novas das tabelas de fatos, com IDs
+# seguindo os já carregados.
+
+VERSAO = 1  # Muda quando o formato do arquivo muda
+
+# Dimensões: chaves guardadas na ordem dos IDs (a chave da posição i tem o ID i + 1).
+# AIRPORTS é identificada pelo próprio Airport_Code.
+DIMENSOES = ['WEATHER_CONDITIONS', 'DAY_PERIODS', 'ROAD_FEATURES', 'AIRPORTS']
+
+# Tabelas de fatos: uma linha por evento, com IDs sequenciais
+FATOS = ['WEATHER', 'LOCATIONS', 'ACCIDENTS']
+
+class EstadoIncremental:
+    """Estado persistido em PATHS['incremental_state'] (JSON); sem o arquivo, tudo é novo"""
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho or PATHS['incremental_state']
+        self.dimensoes = {tabela: {} for tabela in DIMENSOES}
+        self.ultimos_ids = dict.fromkeys(FATOS, 0)
+
+        if os.path.exists(self.caminho):
+            with open(self.caminho, encoding='utf-8') as f:
+                dados = json.load(f)
+            if dados.get('versao') != VERSAO:
+                raise ValueError(f"Estado incremental em formato desconhecido: {self.caminho}")
+            for tabela, chaves in dados['dimensoes'].items():
+                self.dimensoes[tabela] = {tuple(chave): i for i, chave in enumerate(chaves, start=1)}
+            self.ultimos_ids.update(dados['ultimos_ids'])
+
+        self._inicial = {**{t: len(c) for t, c in self.dimensoes.items()}, **self.ultimos_ids}
+
+    def chaves(self, tabela):
+        """{chave: id} da dimensão, atualizado em memória por construir_dimensao(..., conhecidas=)"""
+        return self.dimensoes[tabela]
+
+    def proximo_id(self, tabela):
+        """Primeiro ID livre da tabela de fatos, sem reservá-lo"""
+        return self.ultimos_ids[tabela] + 1
+
+    def reservar(self, tabela, n):
+        """Reserva n IDs da tabela de fatos e retorna o primeiro"""
+        primeiro = self.proximo_id(tabela)
+        self.ultimos_ids[tabela] += n
+        return primeiro
+
+    def filtrar_novos(self, tabela, df, colunas):
+        """Máscara das linhas de df cuja chave ainda não está na dimensão; registra as novas"""
+        conhecidas = self.dimensoes[tabela]
+        chaves = chaves_texto(df, colunas)
+        novas = [chave not in conhecidas for chave in chaves]
+        for chave in chaves:
+            conhecidas.setdefault(chave, len(conhecidas) + 1)
+        return novas
+
+    def resumo(self):
+        """Quantidade de membros de dimensão e de linhas de fatos acrescentados nesta execução"""
+        atual = {**{t: len(c) for t, c in self.dimensoes.items()}, **self.ultimos_ids}
+        return {tabela: atual[tabela] - self._inicial[tabela] for tabela in atual}
+
+    def salvar(self):
+        """Grava o estado num arquivo temporário e o renomeia (nunca fica um estado pela metade)"""
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        dados = {
+            'versao': VERSAO,
+            'dimensoes': {tabela: [list(chave) for chave in chaves] for tabela, chaves in self.dimensoes.items()},
+            'ultimos_ids': self.ultimos_ids
+        }
+        temporario = f"{self.caminho}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False)
+        os.replace(temporario, self.caminho)
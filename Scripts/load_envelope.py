@@ -0,0 +1,151 @@
+import os
+import re
+from paths import PATHS, ENVELOPE_CARGA, LINHAS_POR_COMMIT, COMPRESSAO_SQL
+from db_loader import ler_esquema, ler_chaves_primarias
+from bulk_export import ARQUIVOS_SQL
+from compressed_io import abrir, caminho_sem_compressao
+
+# Envelope de carga em lote para os scripts INSERT gerados (MySQL): desliga as verificações de chave
+# estrangeira e de unicidade e o autocommit, faz COMMIT a cada LINHAS_POR_COMMIT linhas e só no fim cria
+# os índices secundários (o UNIQUE INDEX duplicado da chave primária) e as chaves estrangeiras. Cada INSERT
+# termina com ON DUPLICATE KEY UPDATE <chave> = <chave>: se a carga for interrompida, executar o mesmo script
+# de novo pula as linhas já confirmadas e continua de onde parou. Só a chave duplicada é tolerada: ao
+# contrário do INSERT IGNORE, NULL em coluna NOT NULL, truncamento e datas inválidas continuam sendo erros
+# (no modo estrito, o padrão do MySQL) em vez de virar 0 ou '0000-00-00 00:00:00' com um aviso.
+#
+# As chaves estrangeiras são criadas depois que FOREIGN_KEY_CHECKS volta ao valor anterior: assim o MySQL
+# valida as linhas carregadas e recusa a restrição se houver órfãos. O custo é que o ALTER TABLE passa a
+# copiar a tabela (sem as verificações ele só altera os metadados).
+
+_TABELA_RE = re.compile(r"CREATE TABLE IF NOT EXISTS `\w+`\.`(\w+)` \((.*?)\n\) ENGINE", re.S)
+_INDICE_RE = re.compile(r",\n\s*(UNIQUE INDEX `(\w+)` \([^)]*\))")
+_RESTRICAO_RE = re.compile(r",\n\s*(CONSTRAINT `(\w+)`.*?)(?=,\n|\Z)", re.S)
+
+# Como verificar se o índice ou a restrição já existe (a criação é pulada ao retomar uma carga)
+_EXISTE = {
+    'indice': ("information_schema.statistics", "index_name"),
+    'restricao': ("information_schema.table_constraints", "constraint_name")
+}
+
+def _definicoes_pos_carga(corpo):
+    """[(tipo, nome, definição)] dos índices secundários e chaves estrangeiras do corpo de um CREATE TABLE"""
+    indices = [('indice', nome, definicao) for definicao, nome in _INDICE_RE.findall(corpo)]
+    restricoes = [('restricao', nome, ' '.join(definicao.split())) for definicao, nome in _RESTRICAO_RE.findall(corpo)]
+    return indices + restricoes
+
+def ddl_carga(caminho=PATHS['create_tables']):
+    """O create-table.sql sem os índices secundários e as chaves estrangeiras, criados depois da carga"""
+    with open(caminho, encoding='utf-8') as f:
+        texto = f.read()
+    return _TABELA_RE.sub(
+        lambda m: m.group(0).replace(m.group(2), _RESTRICAO_RE.sub('', _INDICE_RE.sub('', m.group(2)))),
+        texto
+    )
+
+def comandos_pos_carga(tabela, caminho=PATHS['create_tables']):
+    """Comandos que criam os índices secundários e as chaves estrangeiras da tabela, se ainda não existirem"""
+    with open(caminho, encoding='utf-8') as f:
+        corpos = dict(_TABELA_RE.findall(f.read()))
+    comandos = []
+    for tipo, nome, definicao in _definicoes_pos_carga(corpos[tabela]):
+        catalogo, coluna = _EXISTE[tipo]
+        comandos.append(
+            f"SET @comando = IF((SELECT COUNT(*) FROM {catalogo}\n"
+            f"    WHERE table_schema = DATABASE() AND table_name = '{tabela}' AND {coluna} = '{nome}') = 0,\n"
+            f"    'ALTER TABLE `{tabela}` ADD {definicao}', 'DO 0');\n"
+            "PREPARE comando FROM @comando;\n"
+            "EXECUTE comando;\n"
+            "DEALLOCATE PREPARE comando;\n"
+        )
+    return comandos
+
+def _prologo():
+    return (
+        "-- Bulk load envelope: checks disabled, COMMIT after each block, indexes created at the end\n"
+        "SET @OLD_FOREIGN_KEY_CHECKS = @@FOREIGN_KEY_CHECKS, FOREIGN_KEY_CHECKS = 0;\n"
+        "SET @OLD_UNIQUE_CHECKS = @@UNIQUE_CHECKS, UNIQUE_CHECKS = 0;\n"
+        "SET @OLD_AUTOCOMMIT = @@AUTOCOMMIT, AUTOCOMMIT = 0;\n\n"
+    )
+
+def _epilogo(tabela):
+    return (
+        "COMMIT;\n"
+        "SET FOREIGN_KEY_CHECKS = @OLD_FOREIGN_KEY_CHECKS;\n"
+        "SET UNIQUE_CHECKS = @OLD_UNIQUE_CHECKS;\n\n"
+        "-- Secondary indexes and foreign keys, created after the data is loaded (the loaded rows are validated)\n"
+        + "".join(comandos_pos_carga(tabela)) +
+        "\nSET AUTOCOMMIT = @OLD_AUTOCOMMIT;\n"
+    )
+
+def envelopar(tabela, caminho, linhas_por_commit=LINHAS_POR_COMMIT):
+    """Reescreve o script INSERT de caminho dentro do envelope de carga, em uma passada
+
+    O INSERT único é dividido em um INSERT a cada linhas_por_commit tuplas, cada um terminado
+    com ON DUPLICATE KEY UPDATE na chave primária e seguido de COMMIT. Tuplas com quebras de
+    linha dentro de textos são reconhecidas pela paridade das aspas. Retorna o número de tuplas.
+    """
+    chave = ler_chaves_primarias()[tabela]
+    duplicada = f"\nON DUPLICATE KEY UPDATE {chave} = {chave};\n"
+    temporario = caminho.parent / f"~{caminho.name}"
+    tuplas, em_texto, cabecalho = 0, False, None
+    with abrir(caminho) as entrada, abrir(temporario, 'w') as saida:
+        saida.write(_prologo())
+        linhas = iter(entrada)
+
+        # Comentários e o cabeçalho do INSERT (que pode ocupar várias linhas) até o VALUES
+        for linha in linhas:
+            if cabecalho is None and linha.startswith('INSERT INTO'):
+                cabecalho = []
+            if cabecalho is None:
+                saida.write(linha)
+                continue
+            cabecalho.append(linha)
+            if linha.rstrip().endswith('VALUES'):
+                break
+        cabecalho = ''.join(cabecalho or [])
+        saida.write(cabecalho)
+
+        for linha in linhas:
+            if linha.count("'") % 2:
+                em_texto = not em_texto
+            fim = linha.rstrip('\n')
+            if em_texto or not fim.endswith((',', ';')):
+                saida.write(linha)
+                continue
+            tuplas += 1
+            if fim.endswith(';'):
+                saida.write(fim[:-1] + duplicada)
+            elif tuplas % linhas_por_commit == 0:
+                saida.write(f"{fim[:-1]}{duplicada}COMMIT;\n{cabecalho}")
+            else:
+                saida.write(linha)
+
+        saida.write(_epilogo(tabela))
+    os.replace(temporario, caminho)
+    return tuplas
+
+def escrever_script_carga():
+    """Gera o esquema sem índices secundários e o carga.sql, que executa tudo na ordem das chaves estrangeiras
+
+    O SOURCE do cliente mysql só lê texto: com COMPRESSAO_SQL, o carga.sql aponta para os scripts já
+    descomprimidos (X.sql para X.sql.gz), que precisam ser extraídos antes.
+    """
+    with open(PATHS['create_tables_carga'], 'w', encoding='utf-8') as f:
+        f.write(ddl_carga())
+    with open(PATHS['carga_script'], 'w', encoding='utf-8') as f:
+        f.write("-- Full load: schema without secondary indexes, then each table script in foreign key order.\n")
+        f.write("-- Safe to run again after an interruption: rows already committed are skipped.\n")
+        if COMPRESSAO_SQL:
+            f.write(f"-- The table scripts are {COMPRESSAO_SQL}-compressed: decompress them (keeping the same\n")
+            f.write("-- names without the extension) before running this file.\n")
+        f.write(f"SOURCE {PATHS['create_tables_carga'].as_posix()};\n")
+        for tabela in ler_esquema():
+            f.write(f"SOURCE {caminho_sem_compressao(ARQUIVOS_SQL[tabela]).as_posix()};\n")
+
+def envelopar_se_configurado(tabela, caminho):
+    """Usado pelos geradores: aplica o envelope ao script da tabela quando ENVELOPE_CARGA está ativo"""
+    if not ENVELOPE_CARGA:
+        return
+    tuplas = envelopar(tabela, caminho)
+    escrever_script_carga()
+    print(f"Envelope de carga aplicado: {caminho} ({tuplas} linhas, COMMIT a cada {LINHAS_POR_COMMIT})")
@@ -1,72 +1,90 @@
-import pandas as pd
+import numpy as np
 from paths import PATHS 
+from sql_writer import format_sql_column, sql_frame, build_values, write_values
+from compressed_io import abrir
+from db_loader import carregar_se_configurado
+from bulk_export import exportar_se_configurado
+from load_envelope import envelopar_se_configurado
+from id_maps import salvar_mapa
+from staging import ler_entrada, ler_csv
 
-# 1. Função para carregar códigos de aeroporto
+# 1. Função para carregar códigos de aeroporto (um por evento, na ordem do arquivo)
 def load_airport_codes(path):
     try:
-        df_airports = pd.read_csv(path)
-        return dict(enumerate(df_airports['Airport_Code'].tolist(), start=1))
+        return ler_csv('airport_events', colunas=['Airport_Code'], caminho=path)['Airport_Code'].tolist()
     except FileNotFoundError:
         print(f"Aviso: Arquivo {path} não encontrado. Airport_Code será NULL.")
-        return {}
+        return []
+
+# Colunas da tabela LOCATIONS e o tipo usado na formatação (conforme o create-table.sql):
+# Zipcode e Street são VARCHAR mesmo quando parecem números
+TIPOS = {
+    'id': 'number',
+    'Street': 'string',
+    'City': 'string',
+    'County': 'string',
+    'State': 'string',
+    'Zipcode': 'string',
+    'Country': 'string',
+    'Airport_Code': 'string'
+}
 
 # Configuração de caminhos via config_paths
-input_path = PATHS['locations_input']
 output_path = PATHS['locations_insert']
 airport_codes_path = PATHS['airport_events']
 
-try:
-    # 2. Carregar e preparar dados
-    df_locations = pd.read_csv(input_path, skiprows=2, header=None, names=[
-        "Original_ID", "Street", "City", "County", "State", 
-        "Zipcode", "Country", "Airport_Code"
-    ]).fillna("NULL").apply(lambda x: x.astype(str).str.strip())
+def carregar_localizacoes():
+    """Carrega a tabela LOCATIONS (CSV ou o Parquet de staging), só com as colunas usadas"""
+    return ler_entrada('locations_input', colunas=[
+        "Street", "City", "County", "State", "Zipcode", "Country", "Airport_Code"
+    ])
+
+def gerar_localizacoes(df_locations, airport_codes, estado=None):
+    """Gera os INSERTs de LOCATIONS e retorna o ID da localização de cada evento
+
+    airport_codes traz o código do aeroporto de cada evento; eventos além do fim da lista ficam NULL.
+    Com estado (EstadoIncremental), os IDs seguem os das linhas já carregadas.
+    """
+    # 2. Preparar dados
+    df_locations = df_locations.fillna("NULL").apply(lambda x: x.astype(str).str.strip())
 
     # 3. Adicionar ID sequencial
-    df_locations["id"] = range(1, len(df_locations) + 1)
+    primeiro_id = estado.reservar('LOCATIONS', len(df_locations)) if estado else 1
+    df_locations["id"] = range(primeiro_id, primeiro_id + len(df_locations))
 
-    # 4. Mapear Airport_Codes
-    airport_map = load_airport_codes(airport_codes_path)
-    df_locations['Airport_Code'] = df_locations['id'].map(
-        lambda x: airport_map.get(x, "NULL")
-    )
+    # 4. Mapear Airport_Codes pela posição do evento
+    codigos = np.full(len(df_locations), "NULL", dtype=object)
+    k = min(len(df_locations), len(airport_codes))
+    codigos[:k] = np.asarray(airport_codes, dtype=object)[:k]
+    df_locations['Airport_Code'] = codigos
 
     # 5. Formatar Zipcodes
     df_locations['Zipcode'] = df_locations['Zipcode'].str.replace(r'-\d+$', '', regex=True)
 
     # 6. Gerar SQL no formato especificado
-    with open(output_path, "w", encoding="utf-8") as f:
+    with abrir(output_path, "w") as f:
         f.write("-- INSERT statements for LOCATIONS table\n")
         f.write(f"-- Total records: {len(df_locations)}\n\n")
         f.write("INSERT INTO LOCATIONS (id, Street, City, County, State, Zipcode, Country, Airport_Code) VALUES\n")
         
-        # Função para formatar valores SQL
-        def sql_val(x):
-            if x == "NULL":
-                return "NULL"
-            try:
-                float(x)  # Testa se é número
-                return x
-            except ValueError:
-                return f"'{x.replace("'", "''")}'"
+        # Gerar todos os valores, coluna a coluna pelo tipo declarado
+        literais = sql_frame({col: format_sql_column(df_locations[col], tipo) for col, tipo in TIPOS.items()})
         
-        # Gerar todos os valores
-        values = []
-        for _, row in df_locations.iterrows():
-            values.append(
-                f"({row['id']}, {sql_val(row['Street'])}, {sql_val(row['City'])}, "
-                f"{sql_val(row['County'])}, {sql_val(row['State'])}, "
-                f"{sql_val(row['Zipcode'])}, {sql_val(row['Country'])}, "
-                f"{sql_val(row['Airport_Code'])})"
-            )
-        
-        f.write(",\n".join(values))
-        f.write(";\n")
+        write_values(f, build_values(literais))
+
+    envelopar_se_configurado('LOCATIONS', output_path)
+    exportar_se_configurado('LOCATIONS', literais)
+    carregar_se_configurado('LOCATIONS', literais, substituir=estado is None)
 
     # Relatório final
     print(f"Arquivo gerado: {output_path}")
     print(f"Total de registros: {len(df_locations)}")
     print(f"Airport_Codes atribuídos: {sum(df_locations['Airport_Code'] != 'NULL')}")
+    return df_locations['id'].to_numpy()
 
-except Exception as e:
-    print(f"Erro: {e}")
\ No newline at end of file
+if __name__ == "__main__":
+    try:
+        location_ids = gerar_localizacoes(carregar_localizacoes(), load_airport_codes(airport_codes_path))
+        salvar_mapa('locations_ids', location_ids)
+    except Exception as e:
+        print(f"Erro: {e}")
@@ -0,0 +1,86 @@
+import argparse
+import time
+import pre_processamento
+from paths import PATHS
+from id_maps import salvar_mapa
+from staging import ler_entrada
+from weather_conditions_inserts import gerar_condicoes
+from day_periods_inserts import gerar_periodos
+from weather_inserts import gerar_clima
+from airports_inserts import ler_aeroportos, aeroportos_por_evento, gerar_aeroportos
+from locations_insert import carregar_localizacoes, gerar_localizacoes
+from road_features_inserts import gerar_road_features
+from accidents_inserts import gerar_acidentes
+from incremental_state import EstadoIncremental
+
+# Execução da suíte inteira num único processo: cada etapa é uma função que recebe DataFrames e
+# devolve os IDs por evento, que passam direto para as etapas seguintes em memória. Só as saídas
+# finais (scripts SQL, relatórios de rejeitos, exportação/carga) vão para o disco; os mapas .npy
+# e os CSVs de eventos, que na suíte ligam um script ao outro, não são gravados (ver --salvar-mapas).
+#
+# Com --incremental, as entradas são tratadas como um lote novo de eventos: o estado salvo na execução
+# anterior (incremental_state.py) faz os scripts conterem só os membros novos das dimensões e as linhas
+# novas das tabelas de fatos, com os IDs continuando os já carregados.
+
+def executar_pipeline(preprocessar=True, salvar_mapas=False, incremental=False):
+    """Executa as etapas em ordem e retorna {etapa: duração em segundos}"""
+    duracoes = {}
+    estado = EstadoIncremental() if incremental else None
+
+    def etapa(nome, funcao):
+        inicio = time.perf_counter()
+        print(f"\n================= {nome} =================")
+        resultado = funcao()
+        duracoes[nome] = time.perf_counter() - inicio
+        return resultado
+
+    # O pré-processamento filtra as tabelas de entrada no disco (e grava o airports_output.csv)
+    if preprocessar:
+        etapa('pre_processamento', pre_processamento.main)
+
+    # A leitura da entrada conta no tempo de cada etapa
+    condicoes = etapa('weather_conditions',
+                      lambda: gerar_condicoes(ler_entrada('weather_conditions_input'), estado=estado))
+    periodos = etapa('day_periods', lambda: gerar_periodos(ler_entrada('day_periods_input'), estado=estado))
+    clima = etapa('weather', lambda: gerar_clima(ler_entrada('weather_input'), condicoes, periodos, estado=estado))
+    # Na carga incremental o código de cada evento vem do AIRPORTS.csv, sem depender do lote (ver aeroportos_por_evento)
+    ler_eventos = aeroportos_por_evento if incremental else lambda: ler_aeroportos(PATHS['airports_output'])
+    aeroportos = etapa('airports', lambda: gerar_aeroportos(ler_eventos(), estado=estado))
+    localizacoes = etapa('locations',
+                         lambda: gerar_localizacoes(carregar_localizacoes(), aeroportos, estado=estado))
+    features = etapa('road_features',
+                     lambda: gerar_road_features(ler_entrada('road_features_input'), estado=estado))
+    mapas = {'Location_ID': localizacoes, 'Weather_ID': clima, 'Feature_ID': features}
+    etapa('accidents', lambda: gerar_acidentes(ler_entrada('accidents_input'), mapas, estado=estado))
+
+    # O estado só é gravado depois que todas as etapas terminaram
+    if estado:
+        estado.salvar()
+        print("\n================= CARGA INCREMENTAL =================")
+        for tabela, novos in estado.resumo().items():
+            print(f"{tabela:<20} {novos:>8} novos")
+
+    if salvar_mapas:
+        # Os mesmos mapas da suíte, para rodar depois um script isolado (por exemplo accidents_inserts.py)
+        for chave, ids in [('weather_conditions_event_ids', condicoes), ('day_periods_event_ids', periodos),
+                           ('weather_ids', clima), ('locations_ids', localizacoes),
+                           ('road_features_event_ids', features)]:
+            salvar_mapa(chave, ids)
+
+    print("\n================= TEMPOS =================")
+    for nome, duracao in duracoes.items():
+        print(f"{nome:<20} {duracao:>8.2f}s")
+    print(f"{'total':<20} {sum(duracoes.values()):>8.2f}s")
+    return duracoes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Executa todas as etapas num único processo, passando os IDs em memória")
+    parser.add_argument('--sem-preprocessamento', action='store_true',
+                        help="pula o pre_processamento.py (entradas já filtradas)")
+    parser.add_argument('--salvar-mapas', action='store_true',
+                        help="grava também os mapas de IDs (.npy) usados pelos scripts isolados")
+    parser.add_argument('--incremental', action='store_true',
+                        help="trata as entradas como um lote novo e gera só o que ainda não foi carregado")
+    args = parser.parse_args()
+    executar_pipeline(preprocessar=not args.sem_preprocessamento, salvar_mapas=args.salvar_mapas,
+                      incremental=args.incremental)
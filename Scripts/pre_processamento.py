@@ -1,7 +1,14 @@
 import pandas as pd
+import numpy as np
 import csv
-from collections import defaultdict
-from paths import PATHS
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from paths import PATHS, STAGING
+from staging import LEITURAS, gravar_staging
+from airport_index import IndiceAeroportos, FONTES
+from compressed_io import escrita_atomica
+from stage_metrics import registrar_leitura
 
 # ================= CONFIGURAÇÕES =================
 ARQUIVO_AEROPORTOS = PATHS['airports_input']
@@ -10,6 +17,7 @@ ARQUIVO_REPETIDOS = PATHS['airports_repetidos']
 ARQUIVO_COM_NOMES = PATHS['repetidos_com_nomes']
 ARQUIVO_FINAL = PATHS['airports_output']
 ARQUIVO_INDICES = PATHS['indices_output']
+ARQUIVO_MASCARA = PATHS['indices_mask']
 
 OUTRAS_TABELAS = [
     PATHS['weather_conditions_input'],
@@ -20,88 +28,109 @@ OUTRAS_TABELAS = [
     PATHS['accidents_input']
 ]
 
+TAMANHO_CHUNK = 200_000     # Linhas por bloco ao filtrar as outras tabelas
+
+# Tipo que o pandas infere para a coluna inteira -> dtype usado na leitura em blocos
+DTYPES_LEITURA = {'object': 'str', 'float': 'float64', 'int': 'int64', 'bool': 'bool', 'boolean': 'boolean'}
+
+TAMANHO_ESCRITA = 100_000   # Linhas de aeroportos montadas por vez ao gravar o arquivo final
+
 # ================= FUNÇÃO PRINCIPAL =================
 def main():
-    # 1. Análise de combinações repetidas
-    analisar_combinacoes_repetidas(ARQUIVO_AEROPORTOS)
+    # 1. Leitura única do arquivo de aeroportos e análise de combinações repetidas
+    aeroportos = ler_aeroportos(ARQUIVO_AEROPORTOS)
+    analisar_combinacoes_repetidas(aeroportos)
     
     # 2. Adicionar nomes aos aeroportos repetidos
     adicionar_nomes_aeroportos(ARQUIVO_REPETIDOS, DATABASE)
     
     # 3. Processar arquivo principal e filtrar linhas sem nome
-    indices_para_remover = processar_arquivo_principal(ARQUIVO_AEROPORTOS, ARQUIVO_COM_NOMES)
+    indices_para_remover = processar_arquivo_principal(aeroportos, ARQUIVO_COM_NOMES)
     
     # 4. Salvar índices para remover
     salvar_indices(indices_para_remover, ARQUIVO_INDICES)
     
-    # 5. Filtrar outras tabelas
-    for tabela_path in OUTRAS_TABELAS:
-        filtrar_tabela(tabela_path, indices_para_remover)
+    # 5. Filtrar outras tabelas (em paralelo, uma por processo)
+    salvar_mascara(indices_para_remover, ARQUIVO_MASCARA)
+    filtrar_tabelas(OUTRAS_TABELAS, ARQUIVO_MASCARA)
+
+    # 6. Grava as entradas dos scripts geradores como Parquet tipado (staging colunar)
+    if STAGING:
+        gravar_tabelas_staging(list(LEITURAS))
 
 # ================= FUNÇÕES DE PRÉ-PROCESSAMENTO =================
-def analisar_combinacoes_repetidas(caminho_entrada):
-    """Analisa combinações repetidas de Airport_Code e Timezone"""
-    contador = defaultdict(int)
-    
-    with open(caminho_entrada, mode='r', encoding='utf-8') as arquivo:
-        leitor = csv.DictReader(arquivo)
+def ler_aeroportos(caminho_entrada):
+    """Lê o arquivo de aeroportos uma única vez, em formato compacto
+
+    Cada coluna vira um array uint32 de índices para a lista dos seus valores distintos,
+    em vez de um dicionário por linha. Retorna {'colunas', 'valores', 'indices'}.
+    """
+    with open(caminho_entrada, newline='', encoding='utf-8') as f:
+        leitor = csv.DictReader(f)
+        colunas = list(dict.fromkeys(leitor.fieldnames or []))
+        distintos = [{} for _ in colunas]
+        indices = [array('I') for _ in colunas]
         for linha in leitor:
-            combinacao = (linha['Airport_Code'], linha['Timezone'])
-            contador[combinacao] += 1
+            for coluna, valores, posicoes in zip(colunas, distintos, indices):
+                posicoes.append(valores.setdefault(linha[coluna], len(valores)))
+
+    registrar_leitura(len(indices[0]) if indices else 0)
+    return {
+        'colunas': colunas,
+        'valores': {coluna: list(valores) for coluna, valores in zip(colunas, distintos)},
+        'indices': {coluna: np.frombuffer(posicoes, dtype=np.uint32) for coluna, posicoes in zip(colunas, indices)}
+    }
+
+def analisar_combinacoes_repetidas(aeroportos, caminho_saida=ARQUIVO_REPETIDOS):
+    """Analisa combinações repetidas de Airport_Code e Timezone"""
+    codigos = aeroportos['indices']['Airport_Code'].astype(np.int64)
+    fusos = aeroportos['indices']['Timezone'].astype(np.int64)
+    chaves, contagens = np.unique(codigos * len(aeroportos['valores']['Timezone']) + fusos, return_counts=True)
 
-    repetidos = {k: v for k, v in contador.items() if v > 1}
+    repetidos = {}
+    for chave, quantidade in zip(chaves[contagens > 1], contagens[contagens > 1]):
+        codigo, fuso = divmod(int(chave), len(aeroportos['valores']['Timezone']))
+        repetidos[(aeroportos['valores']['Airport_Code'][codigo], aeroportos['valores']['Timezone'][fuso])] = int(quantidade)
 
-    with open(ARQUIVO_REPETIDOS, mode='w', newline='', encoding='utf-8') as arquivo_saida:
+    with escrita_atomica(caminho_saida) as temporario, \
+            open(temporario, mode='w', newline='', encoding='utf-8') as arquivo_saida:
         escritor = csv.writer(arquivo_saida)
         escritor.writerow(['Airport_Code', 'Timezone', 'Ocorrencias'])
         for combo, quantidade in sorted(repetidos.items()):
             escritor.writerow([combo[0], combo[1], quantidade])
 
-    print(f"\nRelatório de combinações repetidas gerado em: {ARQUIVO_REPETIDOS}")
+    print(f"\nRelatório de combinações repetidas gerado em: {caminho_saida}")
 
 def adicionar_nomes_aeroportos(caminho_repetidos, caminho_original):
-    """Adiciona nomes de aeroportos ao arquivo de repetidos"""
-    airports_df = pd.read_csv(caminho_original)
-    repetidos_df = pd.read_csv(caminho_repetidos)
+    """Adiciona nomes de aeroportos ao arquivo de repetidos
 
-    # Criar dicionários de mapeamento
-    iata_to_name = dict(zip(airports_df['ident'], airports_df['name']))
-    gps_to_name = dict(zip(airports_df['gps_code'], airports_df['name']))
-    
-    # Mapeamento manual para códigos específicos
-    mapeamento_manual = {
-        'K3A6': 'Pacific City State Airport',
-        'KATT': 'Central City Municipal - Larry Reineke Field',
-        'KCQT': 'Pacific Valley Aviation Airport',
-        'KMCJ': 'Salina Municipal Airport'
-    }
+    Os nomes vêm do índice persistente do airports_database.csv (mapeamento manual, ident,
+    gps_code e iata_code, nessa ordem), e a coluna Fonte_Nome diz qual fonte resolveu cada código.
+    """
+    repetidos_df = pd.read_csv(caminho_repetidos)
 
-    def get_airport_name(code):
-        # Primeiro verifica no mapeamento manual
-        if code in mapeamento_manual:
-            return mapeamento_manual[code]
-        # Depois nos dicionários automáticos
-        if code in iata_to_name:
-            return iata_to_name[code]
-        elif code in gps_to_name:
-            return gps_to_name[code]
-        return None
+    # Resolver a coluna inteira de códigos de uma vez
+    nomes, fontes = IndiceAeroportos(caminho_original).resolver(repetidos_df['Airport_Code'])
+    repetidos_df['Airport_Name'] = nomes
+    repetidos_df['Fonte_Nome'] = fontes
 
-    # Aplicar a função para obter os nomes
-    repetidos_df['Airport_Name'] = repetidos_df['Airport_Code'].apply(get_airport_name)
-    
     # Identificar códigos ainda sem nome para relatório
     missing = repetidos_df[repetidos_df['Airport_Name'].isna()]
     if not missing.empty:
         print("\nCódigos de aeroporto sem nome encontrado:")
         print(missing['Airport_Code'].unique())
-    
+
+    print("\nNomes resolvidos por fonte:")
+    for fonte, quantidade in repetidos_df['Fonte_Nome'].value_counts().reindex(FONTES, fill_value=0).items():
+        print(f"- {fonte}: {quantidade}")
+
     # Salvar o arquivo com nomes
-    repetidos_df.to_csv(ARQUIVO_COM_NOMES, index=False, encoding='utf-8')
+    with escrita_atomica(ARQUIVO_COM_NOMES) as temporario:
+        repetidos_df.to_csv(temporario, index=False, encoding='utf-8')
     print(f"\nNomes de aeroportos adicionados em: {ARQUIVO_COM_NOMES}")
 
-def processar_arquivo_principal(caminho_entrada, caminho_repetidos):
-    """Processa o arquivo principal e retorna índices sem nome"""
+def processar_arquivo_principal(aeroportos, caminho_repetidos, caminho_saida=ARQUIVO_FINAL):
+    """Processa o arquivo principal (já lido por ler_aeroportos) e retorna os índices sem nome"""
     # Criar dicionário com nomes dos aeroportos
     nomes_por_codigo = {}
     
@@ -113,49 +142,155 @@ def processar_arquivo_principal(caminho_entrada, caminho_repetidos):
             if nome:
                 nomes_por_codigo[codigo] = nome
 
-    # Processar arquivo principal
-    linhas_filtradas = []
-    indices_removidos = []
-    
-    with open(caminho_entrada, newline='', encoding='utf-8') as f:
-        leitor = list(csv.DictReader(f))
-        cabecalho = leitor[0].keys() if leitor else []
+    # Decidir por valor distinto (e não por linha) quem recebe nome e quem já tem nome
+    indices = aeroportos['indices']
+    nome_do_codigo = np.array(
+        [nomes_por_codigo.get(codigo) for codigo in aeroportos['valores']['Airport_Code']], dtype=object
+    )
+    codigo_com_nome = np.array([nome is not None for nome in nome_do_codigo], dtype=bool)
+    com_nome = codigo_com_nome[indices['Airport_Code']]
+    if 'Airport_Name' in aeroportos['valores']:
+        tem_nome = np.array(
+            [bool(nome and nome.strip()) for nome in aeroportos['valores']['Airport_Name']], dtype=bool
+        )
+        com_nome |= tem_nome[indices['Airport_Name']]
+    indices_removidos = np.flatnonzero(~com_nome)
 
-        for i, linha in enumerate(leitor):
-            codigo = linha['Airport_Code']
-            if codigo in nomes_por_codigo:
-                linha['Airport_Name'] = nomes_por_codigo[codigo]
-                linhas_filtradas.append(linha)
-            elif 'Airport_Name' in linha and linha['Airport_Name'].strip():
-                linhas_filtradas.append(linha)
-            else:
-                indices_removidos.append(i)
-
-    # Escrever novo CSV com nomes completos
-    with open(ARQUIVO_FINAL, 'w', newline='', encoding='utf-8') as f:
+    # Cabeçalho: colunas da primeira linha depois de receber o nome (se recebeu)
+    cabecalho = list(aeroportos['colunas'])
+    if len(com_nome) == 0:
+        cabecalho = []
+    elif codigo_com_nome[indices['Airport_Code'][0]] and 'Airport_Name' not in cabecalho:
+        cabecalho.append('Airport_Name')
+
+    # Escrever novo CSV com nomes completos, montando as linhas em blocos
+    with escrita_atomica(caminho_saida) as temporario, open(temporario, 'w', newline='', encoding='utf-8') as f:
         escritor = csv.DictWriter(f, fieldnames=cabecalho)
         escritor.writeheader()
-        escritor.writerows(linhas_filtradas)
+        escritor.writerows(_linhas_mantidas(aeroportos, np.flatnonzero(com_nome), nome_do_codigo))
 
-    print(f"\nArquivo principal processado em: {ARQUIVO_FINAL}")
+    print(f"\nArquivo principal processado em: {caminho_saida}")
     print(f"Total de aeroportos removidos por falta de nome: {len(indices_removidos)}")
     
     return indices_removidos
 
+def _linhas_mantidas(aeroportos, posicoes, nome_do_codigo):
+    """Gera, na ordem original, os dicionários das linhas mantidas com o nome preenchido"""
+    colunas = aeroportos['colunas']
+    valores = [np.array(aeroportos['valores'][coluna], dtype=object) for coluna in colunas]
+    for inicio in range(0, len(posicoes), TAMANHO_ESCRITA):
+        bloco = posicoes[inicio:inicio + TAMANHO_ESCRITA]
+        campos = [v[aeroportos['indices'][coluna][bloco]] for coluna, v in zip(colunas, valores)]
+        nomes = nome_do_codigo[aeroportos['indices']['Airport_Code'][bloco]]
+        for linha_valores, nome in zip(zip(*campos), nomes):
+            linha = dict(zip(colunas, linha_valores))
+            if nome is not None:
+                linha['Airport_Name'] = nome
+            yield linha
+
 def salvar_indices(indices, caminho_saida):
     """Salva os índices para remover em arquivo"""
-    with open(caminho_saida, 'w', encoding='utf-8') as f:
+    with escrita_atomica(caminho_saida) as temporario, open(temporario, 'w', encoding='utf-8') as f:
         for indice in indices:
             f.write(f"{indice}\n")
     print(f"Índices para remover salvos em: {caminho_saida}")
 
-def filtrar_tabela(caminho_tabela, indices_remover):
-    """Filtra outras tabelas removendo os índices especificados"""
-    df = pd.read_csv(caminho_tabela, low_memory=False)
+def salvar_mascara(indices, caminho_saida):
+    """Salva a máscara de remoção (posição da linha -> remover) usada pelos processos de filtragem"""
+    indices = np.asarray(indices, dtype=np.int64)
+    mascara = np.zeros(indices.max() + 1 if len(indices) else 0, dtype=bool)
+    mascara[indices] = True
+    with escrita_atomica(caminho_saida) as temporario, open(temporario, 'wb') as f:
+        np.save(f, mascara)
+
+# ================= FILTRAGEM DAS OUTRAS TABELAS =================
+def _tipo_bloco(serie):
+    """Tipo inferido pelo pandas para a coluna deste bloco (None se só houver nulos)"""
+    if serie.isna().all():
+        return None
+    if serie.dtype.kind in 'iu':
+        return 'int'
+    if serie.dtype.kind == 'f':
+        return 'float'
+    if serie.dtype.kind == 'b':
+        return 'bool'
+    if pd.api.types.infer_dtype(serie, skipna=True) == 'boolean':
+        return 'boolean'  # True/False com nulos
+    return 'object'
+
+def _combinar_tipos(tipos, tem_nulos):
+    """Tipo que a leitura do arquivo inteiro daria, a partir dos tipos de cada bloco"""
+    tipos = set(tipos) - {None}
+    if not tipos or 'object' in tipos:
+        return 'object'
+    if tipos <= {'int', 'float'}:
+        return 'float' if 'float' in tipos or tem_nulos else 'int'
+    if tipos <= {'bool', 'boolean'}:
+        return 'boolean' if 'boolean' in tipos or tem_nulos else 'bool'
+    return 'object'
+
+def inferir_dtypes(caminho_tabela, chunksize=TAMANHO_CHUNK):
+    """Dtypes que pd.read_csv(low_memory=False) daria a cada coluna, sem carregar o arquivo inteiro
+
+    Uma coluna cujo primeiro valor já é texto será texto no arquivo inteiro (o caso de
+    todas as colunas das tabelas com duas linhas de cabeçalho); só as demais são
+    percorridas, em blocos e lendo apenas essas colunas.
+    """
+    primeiro = pd.read_csv(caminho_tabela, nrows=1)
+    tipos = {i: [_tipo_bloco(primeiro.iloc[:, i])] for i in range(primeiro.shape[1])}
+    nulos = dict.fromkeys(tipos, False)
+
+    pendentes = [i for i in tipos if tipos[i][0] != 'object']
+    if pendentes:
+        leitor = pd.read_csv(caminho_tabela, usecols=pendentes, chunksize=chunksize, low_memory=False)
+        for bloco in leitor:
+            for j, i in enumerate(pendentes):
+                tipos[i].append(_tipo_bloco(bloco.iloc[:, j]))
+                nulos[i] = nulos[i] or bool(bloco.iloc[:, j].isna().any())
+
+    return {i: DTYPES_LEITURA[_combinar_tipos(tipos[i], nulos[i])] for i in tipos}
+
+def filtrar_tabela(caminho_tabela, caminho_mascara, chunksize=TAMANHO_CHUNK):
+    """Filtra uma tabela removendo as posições marcadas na máscara, bloco a bloco
+
+    Os dtypes são fixados para o arquivo inteiro antes da passagem, então a saída é a
+    mesma de ler a tabela toda com o pandas, remover os índices e gravar novamente.
+    Retorna (linhas lidas, mensagem).
+    """
+    mascara = np.load(caminho_mascara, mmap_mode='r')
     nome_saida = caminho_tabela.with_name(caminho_tabela.stem + "_filtrado.csv")
-    df_filtrado = df.drop(index=indices_remover, errors='ignore').reset_index(drop=True)
-    df_filtrado.to_csv(nome_saida, index=False)
-    print(f"Tabela '{caminho_tabela}' filtrada e salva como '{nome_saida}'")
+    dtypes = inferir_dtypes(caminho_tabela, chunksize)
+
+    inicio = 0
+    with escrita_atomica(nome_saida) as temporario, open(temporario, 'w', newline='', encoding='utf-8') as f:
+        leitor = pd.read_csv(caminho_tabela, dtype=dtypes, chunksize=chunksize)
+        for bloco in leitor:
+            posicoes = np.arange(inicio, inicio + len(bloco))
+            remover = np.zeros(len(bloco), dtype=bool)
+            dentro = posicoes < len(mascara)
+            remover[dentro] = mascara[posicoes[dentro]]
+            bloco[~remover].to_csv(f, index=False, header=(f.tell() == 0))
+            inicio += len(bloco)
+
+    return inicio, f"Tabela '{caminho_tabela}' filtrada e salva como '{nome_saida}'"
+
+def filtrar_tabelas(caminhos, caminho_mascara, workers=None):
+    """Filtra as tabelas em processos paralelos, cada processo lendo a máscara mapeada em memória"""
+    workers = workers or min(len(caminhos), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futuros = [executor.submit(filtrar_tabela, caminho, caminho_mascara) for caminho in caminhos]
+        for futuro in futuros:
+            # Os processos não compartilham o contador do stage_metrics: a soma é feita aqui
+            linhas, mensagem = futuro.result()
+            registrar_leitura(linhas)
+            print(mensagem)
+
+def gravar_tabelas_staging(chaves, workers=None):
+    """Converte os CSVs de entrada dos geradores para Parquet em processos paralelos"""
+    workers = workers or min(len(chaves), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for resultado in executor.map(gravar_staging, chaves):
+            print(resultado)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,114 +1,110 @@
+import numpy as np
 import pandas as pd
 from paths import PATHS
+from sql_writer import sql_frame, write_insert
+from compressed_io import abrir, escrita_atomica
+from db_loader import carregar_se_configurado
+from bulk_export import exportar_se_configurado
+from load_envelope import envelopar_se_configurado
+from id_maps import salvar_mapa
+from staging import ler_entrada, mascara_road_features, BOOL_COLS_ROAD_FEATURES
+
+def chaves_mascara(mascaras):
+    """A combinação de cada máscara como tupla de '0'/'1', a chave guardada no estado da carga incremental"""
+    return [tuple('1' if m >> bit & 1 else '0' for bit in range(len(BOOL_COLS_ROAD_FEATURES))) for m in mascaras]
+
+def combinacoes(mascara, conhecidas=None):
+    """Deduplica as máscaras dos eventos: retorna (máscaras únicas, ID de cada uma, ID de cada evento)
+
+    As combinações ficam na ordem da primeira ocorrência, com IDs de 1 a n. Com conhecidas
+    ({chave: id}, ver chaves_mascara), as combinações já carregadas mantêm o ID, as novas seguem
+    os conhecidos e só elas são retornadas; conhecidas é atualizado.
+    """
+    codigos, unicas = pd.factorize(mascara)
+    if conhecidas is None:
+        ids = np.arange(1, len(unicas) + 1)
+        return unicas, ids, ids[codigos]
+
+    # Só as combinações únicas (no máximo 2^13) passam pelo dicionário
+    globais = np.empty(len(unicas), dtype=np.int64)
+    novas = np.zeros(len(unicas), dtype=bool)
+    for i, chave in enumerate(chaves_mascara(unicas)):
+        if chave not in conhecidas:
+            conhecidas[chave] = len(conhecidas) + 1
+            novas[i] = True
+        globais[i] = conhecidas[chave]
+    return unicas[novas], globais[novas], globais[codigos]
+
+def literais_road_features(mascaras, ids):
+    """Literais SQL das combinações: o id e um 0/1 por feature, decodificados de cada bit"""
+    colunas = {'id': pd.Series(ids).astype(str)}
+    for bit, col in enumerate(BOOL_COLS_ROAD_FEATURES):
+        colunas[col] = pd.Series(np.where(mascaras >> bit & 1, '1', '0'))
+    return sql_frame(colunas)
+
+def gerar_road_features(df, estado=None):
+    """Gera os INSERTs de ROAD_FEATURES (combinações únicas das features) e retorna o ID
+    da combinação de cada evento, na ordem das linhas de df
+
+    df traz a máscara de features de cada evento ('Mascara', ver staging.compactar_road_features)
+    ou as colunas booleanas, que são empacotadas aqui. Com estado (EstadoIncremental), só as
+    combinações novas são geradas e as conhecidas mantêm o ID.
+    """
+    # Configurar pandas para evitar warnings de downcasting
+    pd.set_option('future.no_silent_downcasting', True)
+
+    # =============================================
+    # 1. Processar linhas únicas para ROAD_FEATURES
+    # =============================================
+    
+    # Encontrar as máscaras únicas (IDs numéricos simples começando em 1) e o ID da combinação
+    # de cada evento
+    mascara = df['Mascara'].to_numpy() if 'Mascara' in df else mascara_road_features(df)
+    conhecidas = estado.chaves('ROAD_FEATURES') if estado else None
+    mascaras_unicas, ids_unicos, feature_ids = combinacoes(mascara, conhecidas)
+    
+    # Gerar arquivo SQL para ROAD_FEATURES
+    with abrir(PATHS['road_features_insert'], "w") as f:
+        f.write("-- INSERT statements for ROAD_FEATURES table\n")
+        f.write("-- Generated from unique road features combinations\n\n")
+
+        # Gerar linhas de valores (ID numérico seguido das features 0/1)
+        literais = literais_road_features(mascaras_unicas, ids_unicos)
+
+        # Escrever em blocos de 500 para evitar linhas muito longas
+        write_insert(f, "INSERT INTO ROAD_FEATURES (\n"
+                        "    id, Amenity, Bump, Crossing, Give_Way, Junction,\n"
+                        "    No_Exit, Railway, Roundabout, Station, Stop,\n"
+                        "    Traffic_Calming, Traffic_Signal, Turning_Loop\n) VALUES\n", literais, block_size=500)
+
+    envelopar_se_configurado('ROAD_FEATURES', PATHS['road_features_insert'])
+    exportar_se_configurado('ROAD_FEATURES', literais)
+    carregar_se_configurado('ROAD_FEATURES', literais, substituir=estado is None)
+    print(f"- {PATHS['road_features_insert']}: {len(mascaras_unicas)} registros únicos")
+    return feature_ids
 
 def process_road_features():
     try:
-        # Configurar pandas para evitar warnings de downcasting
-        pd.set_option('future.no_silent_downcasting', True)
-        
-        # Carregar dados do CSV com os cabeçalhos corretos
-        df = pd.read_csv(
-            PATHS['road_features_input'],
-            skiprows=2,  # Pular linha de cabeçalho original
-            header=None,
-            names=[
-                "Feature_ID", "Amenity", "Bump", "Crossing", "Give_Way", 
-                "Junction", "No_Exit", "Railway", "Roundabout", "Station", 
-                "Stop", "Traffic_Calming", "Traffic_Signal", "Turning_Loop"
-            ],
-            dtype='str'
-        )
-        
-        # Converter colunas booleanas para 0/1 sem downcasting
-        bool_cols = ["Amenity", "Bump", "Crossing", "Give_Way", "Junction",
-                    "No_Exit", "Railway", "Roundabout", "Station", "Stop",
-                    "Traffic_Calming", "Traffic_Signal", "Turning_Loop"]
-        
-        for col in bool_cols:
-            # Converter para maiúsculas e mapear valores
-            df[col] = df[col].str.upper().map({
-                'TRUE': 1,
-                'FALSE': 0,
-            }).fillna(0).astype(int)
-        
-        # =============================================
-        # 1. Processar linhas únicas para ROAD_FEATURES
-        # =============================================
-        
-        # Encontrar linhas únicas baseadas nas features
-        df_unique = df[bool_cols].drop_duplicates().reset_index(drop=True)
-        
-        # Gerar IDs numéricos simples começando em 1
-        df_unique.insert(0, 'id', range(1, len(df_unique) + 1))
-        
-        # Gerar arquivo SQL para ROAD_FEATURES
-        with open(PATHS['road_features_insert'], "w", encoding="utf-8") as f:
-            f.write("-- INSERT statements for ROAD_FEATURES table\n")
-            f.write("-- Generated from unique road features combinations\n\n")
-            f.write("INSERT INTO ROAD_FEATURES (\n")
-            f.write("    id, Amenity, Bump, Crossing, Give_Way, Junction,\n")
-            f.write("    No_Exit, Railway, Roundabout, Station, Stop,\n")
-            f.write("    Traffic_Calming, Traffic_Signal, Turning_Loop\n) VALUES\n")
-            
-            # Gerar linhas de valores
-            rows = []
-            for _, row in df_unique.iterrows():
-                values = [
-                    str(row['id']),  # ID numérico
-                    str(row['Amenity']),
-                    str(row['Bump']),
-                    str(row['Crossing']),
-                    str(row['Give_Way']),
-                    str(row['Junction']),
-                    str(row['No_Exit']),
-                    str(row['Railway']),
-                    str(row['Roundabout']),
-                    str(row['Station']),
-                    str(row['Stop']),
-                    str(row['Traffic_Calming']),
-                    str(row['Traffic_Signal']),
-                    str(row['Turning_Loop'])
-                ]
-                rows.append(f"({', '.join(values)})")
-            
-            # Escrever em blocos de 500 para evitar linhas muito longas
-            for i in range(0, len(rows), 500):
-                block = rows[i:i+500]
-                f.write(",\n".join(block))
-                f.write(";\n" if i+500 >= len(rows) else ",\n")
+        # Carregar dados com as colunas booleanas já empacotadas na máscara de features
+        # (na leitura do CSV ou, com STAGING, uma única vez no pre_processamento)
+        df = ler_entrada('road_features_input')
+        feature_ids = gerar_road_features(df)
 
         # =============================================
         # 2. Gerar arquivo de eventos (mapeamento original)
         # =============================================
         
-        # Criar dicionário para mapear features -> ID único
-        feature_to_id = {}
-        for _, row in df_unique.iterrows():
-            # Criar chave única baseada nas features
-            key = tuple(row[bool_cols].values)
-            feature_to_id[key] = row['id']
-        
-        # Gerar mapeamento para o arquivo de eventos
-        event_data = []
-        for original_pos, original_row in df.iterrows():
-            # Criar chave para a linha atual
-            current_key = tuple(original_row[bool_cols].values)
-            
-            # Obter ID correspondente
-            feature_id = feature_to_id[current_key]
-            
-            event_data.append({
-                'Original_Position': original_pos + 1,  # Posição no arquivo original (1-based)
-                'Road_Feature_ID': feature_id  # ID da combinação única
-            })
-        
-        # Converter para DataFrame e salvar como CSV
-        event_df = pd.DataFrame(event_data)
-        event_df.to_csv(PATHS['road_features_events'], index=False)
+        # Posição no arquivo original (1-based) -> ID da combinação única
+        event_df = pd.DataFrame({
+            'Original_Position': range(1, len(df) + 1),
+            'Road_Feature_ID': feature_ids
+        })
+        with escrita_atomica(PATHS['road_features_events']) as temporario:
+            event_df.to_csv(temporario, index=False)
+        salvar_mapa('road_features_event_ids', event_df['Road_Feature_ID'])
         
-        print(f"Arquivos gerados com sucesso:")
-        print(f"- {PATHS['road_features_insert']}: {len(df_unique)} registros únicos")
         print(f"- {PATHS['road_features_events']}: {len(df)} eventos mapeados")
+        print(f"Arquivos gerados com sucesso.")
 
     except Exception as e:
         print(f"Erro durante o processamento: {str(e)}")
@@ -1,70 +1,334 @@
+import argparse
+import json
 import os
 import subprocess
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
-from paths import PATHS
+from pathlib import Path
+from paths import PATHS, EVENTOS_SQL, STAGING, DATABASE, BULK_EXPORT
+from stage_cache import StageCache, SuiteCheckpoint
+from stage_metrics import somar_linhas
+
+# Arquivos lidos e gerados por cada script (chaves de paths.PATHS), na ordem serial original.
+# As dependências entre etapas são derivadas daqui: uma etapa depende de quem gera suas entradas.
+# Os .sql de eventos só existem quando EVENTOS_SQL está ativo.
+ETAPAS = {
+    'pre_processamento.py': {
+        'entradas': ['airports_input', 'airports_database', 'weather_conditions_input', 'weather_input',
+                     'road_features_input', 'locations_input', 'day_periods_input', 'accidents_input'],
+        'saidas': ['airports_repetidos', 'repetidos_com_nomes', 'airports_output', 'indices_output', 'indices_mask']
+    },
+    'weather_conditions_inserts.py': {
+        'entradas': ['weather_conditions_input'],
+        'saidas': ['weather_conditions_insert', 'weather_conditions_event_ids']
+                  + (['weather_conditions_events'] if EVENTOS_SQL else [])
+    },
+    'day_periods_inserts.py': {
+        'entradas': ['day_periods_input'],
+        'saidas': ['day_periods_insert', 'day_periods_event_ids']
+                  + (['day_periods_events'] if EVENTOS_SQL else [])
+    },
+    'weather_inserts.py': {
+        'entradas': ['weather_input', 'weather_conditions_event_ids', 'day_periods_event_ids'],
+        'saidas': ['weather_insert', 'weather_ids', 'weather_rejeitos']
+    },
+    'airports_inserts.py': {
+        'entradas': ['airports_output'],
+        'saidas': ['airports_insert', 'airport_events']
+    },
+    'locations_insert.py': {
+        'entradas': ['locations_input', 'airport_events'],
+        'saidas': ['locations_insert', 'locations_ids']
+    },
+    'road_features_inserts.py': {
+        'entradas': ['road_features_input'],
+        'saidas': ['road_features_insert', 'road_features_events', 'road_features_event_ids']
+    },
+    'accidents_inserts.py': {
+        'entradas': ['accidents_input', 'locations_ids', 'road_features_event_ids', 'weather_ids'],
+        'saidas': ['accidents_output', 'accidents_rejeitos']
+    }
+}
+
+# Com STAGING os geradores leem o Parquet gravado pelo pre_processamento, que vira uma dependência deles
+if STAGING:
+    for nome, etapa in ETAPAS.items():
+        if nome == 'pre_processamento.py':
+            continue
+        for entrada in list(etapa['entradas']):
+            staging = entrada.replace('_input', '_staging')
+            if staging != entrada and staging in PATHS:
+                etapa['entradas'].append(staging)
+                ETAPAS['pre_processamento.py']['saidas'].append(staging)
 
 class TestSuiteRunner:
-    def __init__(self):
+    def __init__(self, workers=None, force=False, profile=False, resume=False):
         self.log_file = PATHS['logs_dir'] / 'test_suite.log'
-        self.scripts_order = [
-            PATHS['scripts_dir'] / 'pre_processamento.py',
-            PATHS['scripts_dir'] / 'weather_conditions_inserts.py',
-            PATHS['scripts_dir'] / 'day_periods_inserts.py',
-            PATHS['scripts_dir'] / 'weather_inserts.py',
-            PATHS['scripts_dir'] / 'airports_inserts.py',
-            PATHS['scripts_dir'] / 'locations_insert.py',
-            PATHS['scripts_dir'] / 'road_features_inserts.py',
-            PATHS['scripts_dir'] / 'accidents_inserts.py'
-        ]
+        self.metrics_file = PATHS['logs_dir'] / 'test_suite_metrics.jsonl'
+        self.profile_dir = PATHS['logs_dir'] / 'profiles'
+        self.scripts_order = list(ETAPAS)
+        self.workers = workers or os.cpu_count() or 1
+        self.force = force
+        self.profile = profile
+        self.cache = StageCache()
+        self.resume = resume
+        # Sem --resume, começa um checkpoint novo; com ele, continua o da execução interrompida
+        self.checkpoint = SuiteCheckpoint(continuar=resume)
+        self.executadas = set()  # Etapas que rodaram de fato nesta execução (invalidam o checkpoint das seguintes)
+        self.duracoes = {}
+        self.metricas = {}
+        self.execucao = datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
+        self._log_lock = threading.Lock()
         PATHS['logs_dir'].mkdir(exist_ok=True)
 
     def log_message(self, message):
         """Registra mensagens no log"""
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         log_entry = f"[{timestamp}] {message}\n"
-        print(log_entry.strip())
-        with open(self.log_file, 'a') as f:
-            f.write(log_entry)
+        with self._log_lock:
+            print(log_entry.strip())
+            with open(self.log_file, 'a') as f:
+                f.write(log_entry)
+
+    def dependencias(self):
+        """Mapeia cada etapa para as etapas que geram algum dos seus arquivos de entrada"""
+        produtor = {saida: nome for nome, etapa in ETAPAS.items() for saida in etapa['saidas']}
+        return {
+            nome: {produtor[entrada] for entrada in etapa['entradas'] if entrada in produtor}
+            for nome, etapa in ETAPAS.items()
+        }
 
     def run_script(self, script_name):
-        """Executa um script individual"""
+        """Executa um script individual, medindo CPU e memória (e o perfil, com --profile)"""
         script_path = os.path.join(PATHS['scripts_dir'], script_name)
         if not os.path.exists(script_path):
             self.log_message(f"ERRO: Script não encontrado - {script_path}")
             return False
 
         self.log_message(f"Iniciando execução de {script_name}...")
-        start_time = time.time()
+        pstats = self.profile_dir / f"{Path(script_name).stem}.pstats" if self.profile else None
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho_recursos = Path(diretorio) / 'recursos.json'
+            comando = ['python', os.path.join(PATHS['scripts_dir'], 'stage_metrics.py'),
+                       '--metricas', str(caminho_recursos)]
+            if pstats:
+                comando += ['--profile', str(pstats)]
+            start_time = time.time()
 
-        try:
-            result = subprocess.run(
-                ['python', script_path],
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
+            try:
+                result = subprocess.run(
+                    comando + [script_path],
+                    check=True,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True
+                )
+                sucesso = True
+            except subprocess.CalledProcessError as e:
+                result = e
+                sucesso = False
             elapsed = time.time() - start_time
+            recursos = self._ler_recursos(caminho_recursos)
+
+        self.duracoes[script_name] = elapsed
+        self.registrar_metricas(script_name, 'ok' if sucesso else 'erro', elapsed, recursos,
+                                pstats if pstats and pstats.exists() else None)
+        if sucesso:
             self.log_message(f"{script_name} concluído com sucesso em {elapsed:.2f}s")
             self.log_message(f"Saída:\n{result.stdout}")
             return True
-        except subprocess.CalledProcessError as e:
-            elapsed = time.time() - start_time
-            self.log_message(f"ERRO em {script_name} após {elapsed:.2f}s")
-            self.log_message(f"Saída de erro:\n{e.stderr}")
+        self.log_message(f"ERRO em {script_name} após {elapsed:.2f}s")
+        self.log_message(f"Saída de erro:\n{result.stderr}")
+        return False
+
+    @staticmethod
+    def _ler_recursos(caminho):
+        try:
+            with open(caminho, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {'cpu_s': None, 'pico_rss_mb': None, 'linhas_lidas': None}
+
+    # ================= MÉTRICAS =================
+    def registrar_metricas(self, script_name, status, elapsed, recursos=None, pstats=None):
+        """Grava uma linha JSON com as métricas da etapa em test_suite_metrics.jsonl"""
+        etapa = ETAPAS[script_name]
+        recursos = recursos or {'cpu_s': None, 'pico_rss_mb': None}
+        # Saídas só contam se a etapa terminou bem (após um erro podem ser de uma execução anterior)
+        executou, concluiu = status not in ('cache', 'checkpoint'), status == 'ok'
+        saidas = [PATHS[chave] for chave in etapa['saidas']]
+        linhas_escritas = somar_linhas(saidas) if concluiu else None
+        metricas = {
+            'execucao': self.execucao,
+            'etapa': script_name,
+            'status': status,
+            'wall_s': round(elapsed, 3),
+            'cpu_s': None if recursos['cpu_s'] is None else round(recursos['cpu_s'], 3),
+            'pico_rss_mb': None if recursos['pico_rss_mb'] is None else round(recursos['pico_rss_mb'], 1),
+            'linhas_lidas': recursos.get('linhas_lidas') if executou else None,
+            'linhas_escritas': linhas_escritas,
+            'bytes_escritos': sum(c.stat().st_size for c in saidas if c.is_file()) if concluiu else None,
+            'linhas_por_s': round(linhas_escritas / elapsed, 1) if linhas_escritas and elapsed > 0 else None,
+            'pstats': str(pstats) if pstats else None
+        }
+        with self._log_lock:
+            self.metricas[script_name] = metricas
+            with open(self.metrics_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(metricas, ensure_ascii=False) + "\n")
+
+    def log_tabela_metricas(self):
+        """Tabela das etapas executadas, da mais lenta para a mais rápida, com a fração do tempo total"""
+        executadas = [m for m in self.metricas.values() if m['status'] not in ('cache', 'checkpoint')]
+        if not executadas:
+            return
+        total = sum(m['wall_s'] for m in executadas) or 1.0
+
+        def celula(valor, largura, formato=''):
+            return format(valor, f">{largura}{formato}") if valor is not None else '-'.rjust(largura)
+
+        linhas = [f"{'Etapa':<30} {'Wall (s)':>9} {'%':>6} {'CPU (s)':>9} {'RSS (MB)':>9} "
+                  f"{'Lidas':>11} {'Escritas':>11} {'MB escritos':>11} {'Linhas/s':>11}"]
+        for m in sorted(executadas, key=lambda m: m['wall_s'], reverse=True):
+            mb = m['bytes_escritos'] / 2**20 if m['bytes_escritos'] is not None else None
+            linhas.append(
+                f"{m['etapa']:<30} {m['wall_s']:>9.2f} {100 * m['wall_s'] / total:>5.1f}% "
+                f"{celula(m['cpu_s'], 9, '.2f')} {celula(m['pico_rss_mb'], 9, '.1f')} "
+                f"{celula(m['linhas_lidas'], 11, ',')} {celula(m['linhas_escritas'], 11, ',')} "
+                f"{celula(mb, 11, '.1f')} {celula(m['linhas_por_s'], 11, ',.0f')}"
+            )
+        self.log_message("Métricas por etapa (detalhes em " + str(self.metrics_file) + "):\n" + "\n".join(linhas))
+
+    def motivo_sem_cache(self):
+        """Por que o cache não vale nesta execução (None se vale)
+
+        Com a carga no banco ou a exportação em lote configuradas, os scripts têm efeitos fora das
+        saídas registradas (o banco, os arquivos de data/output/bulk/) que um Cache HIT não refaria.
+        """
+        if self.force:
+            return '--force'
+        if self.profile:
+            return '--profile'
+        if DATABASE['url']:
+            return "DATABASE['url'] configurado"
+        if BULK_EXPORT:
+            return 'BULK_EXPORT ativo'
+        return None
+
+    def run_stage(self, script_name):
+        """Confere as entradas da etapa e executa o script, a menos que o checkpoint ou o cache esteja válido"""
+        saidas = {chave: PATHS[chave] for chave in ETAPAS[script_name]['saidas']}
+        if self.resume:
+            # Uma dependência executada de novo pode ter mudado as entradas: a etapa também roda
+            refeitas = self.dependencias()[script_name] & self.executadas
+            concluida, motivo = self.checkpoint.concluida(script_name, saidas)
+            if concluida and not refeitas:
+                self.log_message(f"Checkpoint: {script_name} já concluída - {motivo}")
+                self.duracoes[script_name] = 0.0
+                self.registrar_metricas(script_name, 'checkpoint', 0.0)
+                return True
+            if refeitas:
+                motivo = f"dependência executada novamente: {', '.join(sorted(refeitas))}"
+            self.log_message(f"Checkpoint: {script_name} será retomada - {motivo}")
+
+        ausentes = [chave for chave in ETAPAS[script_name]['entradas'] if not PATHS[chave].exists()]
+        if ausentes:
+            self.log_message(f"ERRO: Entradas ausentes para {script_name} - {', '.join(ausentes)}")
+            return False
+
+        script_path = PATHS['scripts_dir'] / script_name
+        entradas = {chave: PATHS[chave] for chave in ETAPAS[script_name]['entradas']}
+
+        ignorar = self.motivo_sem_cache()
+        if ignorar:
+            self.log_message(f"Cache ignorado para {script_name} ({ignorar})")
+        else:
+            reaproveitar, motivo = self.cache.verificar(script_name, script_path, entradas, saidas)
+            if reaproveitar:
+                self.log_message(f"Cache HIT: {script_name} não será executado - {motivo}")
+                self.duracoes[script_name] = 0.0
+                self.registrar_metricas(script_name, 'cache', 0.0)
+                self.checkpoint.concluir(script_name, saidas)
+                return True
+            self.log_message(f"Cache MISS: {script_name} - {motivo}")
+
+        self.checkpoint.marcar(script_name, 'executando')
+        with self._log_lock:
+            self.executadas.add(script_name)
+        if not self.run_script(script_name):
+            self.checkpoint.marcar(script_name, 'erro')
             return False
+        self.cache.registrar(script_name, script_path, entradas, saidas)
+        self.checkpoint.concluir(script_name, saidas)
+        return True
+
+    def caminho_critico(self, deps):
+        """Maior cadeia de dependências pelas durações medidas: [(etapa, segundos)]"""
+        fim, anterior = {}, {}
+        for nome in self.scripts_order:  # A ordem serial já é topológica
+            if nome not in self.duracoes:
+                continue
+            base = max((d for d in deps[nome] if d in fim), key=fim.get, default=None)
+            fim[nome] = (fim[base] if base else 0) + self.duracoes[nome]
+            anterior[nome] = base
+        if not fim:
+            return []
+
+        caminho, nome = [], max(fim, key=fim.get)
+        while nome:
+            caminho.append((nome, self.duracoes[nome]))
+            nome = anterior[nome]
+        return caminho[::-1]
+
+    def log_resumo(self, deps, elapsed):
+        """Registra o caminho crítico e o tempo economizado em relação à execução serial"""
+        caminho = self.caminho_critico(deps)
+        if caminho:
+            etapas = " -> ".join(f"{nome} ({duracao:.2f}s)" for nome, duracao in caminho)
+            self.log_message(f"Caminho crítico: {etapas} = {sum(d for _, d in caminho):.2f}s")
+        serial = sum(self.duracoes.values())
+        self.log_message(
+            f"Tempo total: {elapsed:.2f}s com {self.workers} workers | "
+            f"soma das etapas (serial): {serial:.2f}s | economia: {serial - elapsed:.2f}s"
+        )
 
     def run_suite(self):
-        """Executa todos os scripts na ordem definida"""
+        """Executa os scripts em paralelo, cada um assim que suas dependências terminam"""
         self.log_message("Iniciando suíte de testes...")
+        start_time = time.time()
+        deps = self.dependencias()
+        pendentes = list(self.scripts_order)
+        concluidas = set()
+        em_execucao = {}
         success = True
 
-        for script in self.scripts_order:
-            if not self.run_script(script):
-                self.log_message(f"Suíte interrompida devido a falha em {script}")
-                success = False
-                break
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                # Dispara todas as etapas cujas dependências já foram concluídas
+                if success:
+                    for script in [s for s in pendentes if deps[s] <= concluidas]:
+                        pendentes.remove(script)
+                        em_execucao[executor.submit(self.run_stage, script)] = script
+                if not em_execucao:
+                    break
+
+                prontos, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    script = em_execucao.pop(futuro)
+                    if futuro.result():
+                        concluidas.add(script)
+                    else:
+                        self.log_message(f"Suíte interrompida devido a falha em {script}")
+                        success = False
+
+        if pendentes:
+            self.log_message(f"Etapas não executadas: {', '.join(pendentes)}")
+            success = False
+
+        self.log_resumo(deps, time.time() - start_time)
+        self.log_tabela_metricas()
 
         if success:
             self.log_message("Suíte de testes concluída com SUCESSO")
@@ -74,5 +338,16 @@ class TestSuiteRunner:
         return success
 
 if __name__ == "__main__":
-    runner = TestSuiteRunner()
-    runner.run_suite()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Executa a suíte de scripts de geração de dados")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="etapas executadas ao mesmo tempo (padrão: número de CPUs; 1 = serial)")
+    parser.add_argument('--force', action='store_true',
+                        help="executa todas as etapas, ignorando o cache de etapas inalteradas")
+    parser.add_argument('--profile', action='store_true',
+                        help="executa cada script sob o cProfile e salva Logs/profiles/<etapa>.pstats (ignora o cache)")
+    parser.add_argument('--resume', action='store_true',
+                        help="continua a execução anterior a partir da primeira etapa não concluída (Logs/test_suite_checkpoint.json)")
+    args = parser.parse_args()
+
+    runner = TestSuiteRunner(workers=args.workers, force=args.force, profile=args.profile, resume=args.resume)
+    runner.run_suite()
@@ -0,0 +1,66 @@
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from sql_writer import build_values, RelatorioRejeitos
+
+# Geração de um INSERT em paralelo: o DataFrame é dividido em faixas contíguas de linhas,
+# cada processo formata uma faixa num arquivo próprio e os arquivos são concatenados na ordem.
+# O resultado é idêntico ao de write_values (tuplas separadas por ',\n' e ';' no final).
+
+def faixas(total, partes):
+    """Divide range(total) em até `partes` faixas contíguas (inicio, fim) de tamanhos parecidos"""
+    partes = max(1, min(partes, total))
+    limites = [total * i // partes for i in range(partes + 1)]
+    return list(zip(limites[:-1], limites[1:]))
+
+def _formatar_shard(formatar, fatia, inicio, caminho, tabela, devolver_literais):
+    """Executado no processo filho: formata a faixa e grava as tuplas no arquivo do shard"""
+    rejeitos = RelatorioRejeitos(tabela, None)
+    literais = formatar(fatia, inicio, rejeitos)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        f.write(",\n".join(build_values(literais)) if len(literais) else "")
+    return len(literais), rejeitos.partes, literais if devolver_literais else None
+
+def gerar_em_shards(f, df, formatar, workers, rejeitos=None, devolver_literais=False, terminar_vazio=True):
+    """Escreve em f as tuplas de df formatadas por `workers` processos, na ordem original
+
+    formatar(fatia, inicio, rejeitos) -> sql_frame roda no processo filho; `inicio` é a posição
+    da primeira linha da fatia em df, para os IDs continuarem sequenciais entre os shards.
+    Precisa ser uma função de módulo (picklable). Com devolver_literais, retorna a lista dos
+    sql_frames de cada shard (para a exportação .tsv e a carga no banco); senão, None.
+    terminar_vazio=False não escreve o ';' quando não há linhas (como write_values com blocos).
+    """
+    tabela = rejeitos.tabela if rejeitos is not None else None
+    destino = Path(getattr(f, 'name', '.')).parent
+    escritos = 0
+    frames = []
+
+    with tempfile.TemporaryDirectory(dir=destino if destino.is_dir() else None) as diretorio, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        partes = faixas(len(df), workers)
+        caminhos = [Path(diretorio) / f"shard_{i:03d}.sql" for i in range(len(partes))]
+        futuros = [
+            executor.submit(_formatar_shard, formatar, df.iloc[inicio:fim], inicio,
+                            caminho, tabela, devolver_literais)
+            for (inicio, fim), caminho in zip(partes, caminhos)
+        ]
+
+        # Junta na ordem das faixas, independente da ordem em que os processos terminam
+        for futuro, caminho in zip(futuros, caminhos):
+            linhas, partes_rejeitos, literais = futuro.result()
+            if rejeitos is not None:
+                rejeitos.partes.extend(partes_rejeitos)
+            if literais is not None:
+                frames.append(literais)
+            if not linhas:
+                continue
+            if escritos:
+                f.write(",\n")
+            with open(caminho, encoding='utf-8') as shard:
+                shutil.copyfileobj(shard, f)
+            escritos += linhas
+
+    if escritos or terminar_vazio:
+        f.write(";\n")
+    return frames if devolver_literais else None
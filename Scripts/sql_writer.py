@@ -0,0 +1,335 @@
+import re
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from compressed_io import escrita_atomica
+
+NULL = 'NULL'
+
+# Mesma gramática aceita por float(): sinal, dígitos com '_', expoente, inf/nan
+_DIGITOS = r'\d(?:_?\d)*'
+_NUMERO = (
+    rf'\s*[+-]?(?:(?:(?:{_DIGITOS})?\.{_DIGITOS}|{_DIGITOS}\.?)(?:e[+-]?{_DIGITOS})?'
+    r'|inf|infinity|nan)\s*'
+)
+
+# Tamanho dos pedaços usados ao juntar strings antes de escrever no arquivo
+TAMANHO_ESCRITA = 100_000
+
+FORMATO_TIMESTAMP = '%Y-%m-%d %H:%M:%S'
+# Fração de segundos e fuso ('.000000000', '-05:00') no fim do valor: a coluna TIMESTAMP não guarda nenhum dos dois
+_FRACAO_E_FUSO = r'(?:\.\d+)?(?:[+-]\d{2}:\d{2})?$'
+
+# Tipos formatados por valor distinto: textos e medidas se repetem muito ao longo das linhas
+TIPOS_POR_VALOR = ('string', 'float')
+
+# Posições dos dígitos e separadores em 'YYYY-MM-DD HH:MM:SS' e no fuso '±HH:MM' que pode seguir
+_DIGITOS_TIMESTAMP = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+_SEPARADORES_TIMESTAMP = {4: '-', 7: '-', 10: ' ', 13: ':', 16: ':'}
+_DIGITOS_FUSO = [20, 21, 23, 24]
+
+# ================= FORMATAÇÃO POR CÉLULA =================
+def _converter_timestamp(dt_str):
+    """strptime/strftime de uma célula já sem fuso; None se não for um timestamp válido"""
+    try:
+        return datetime.strptime(dt_str, FORMATO_TIMESTAMP).strftime(FORMATO_TIMESTAMP)
+    except ValueError:
+        return None
+
+def format_timestamp(value):
+    """Converte string de data para formato TIMESTAMP do MySQL, removendo timezone"""
+    try:
+        # Remove a fração de segundos e a parte do timezone (-05:00)
+        dt_str = re.sub(_FRACAO_E_FUSO, '', str(value)).strip()
+        return f"'{datetime.strptime(dt_str, FORMATO_TIMESTAMP).strftime(FORMATO_TIMESTAMP)}'"
+    except Exception as e:
+        print(f"Erro ao formatar timestamp {value}: {str(e)}")
+        return 'NULL'
+
+# ================= FORMATAÇÃO POR COLUNA =================
+def escape_string(serie):
+    """Envolve cada valor da coluna em aspas simples, escapando aspas internas"""
+    return "'" + serie.astype(str).str.replace("'", "''", regex=False) + "'"
+
+def is_numeric(serie):
+    """Máscara das células que float() aceitaria, sem tentar converter célula a célula"""
+    return serie.astype(str).str.fullmatch(_NUMERO, flags=re.IGNORECASE).fillna(False).astype(bool)
+
+def _combinar(indice, partes, padrao=NULL):
+    """Monta a coluna final a partir de pares (máscara, valores formatados), por posição"""
+    resultado = np.full(len(indice), padrao, dtype=object)
+    for mascara, valores in partes:
+        resultado[mascara] = valores.to_numpy(dtype=object)
+    return pd.Series(resultado, index=indice)
+
+def _timestamps_canonicos(texto):
+    """Máscara dos valores exatamente no formato 'YYYY-MM-DD HH:MM:SS' (com ou sem fuso '±HH:MM')
+    e o texto sem o fuso desses valores, conferidos caractere a caractere sem regex
+
+    Os segundos 60/61, que o pandas aceita e o strptime rejeita, ficam de fora.
+    """
+    tamanhos = texto.str.len().to_numpy()
+    candidatos = np.flatnonzero((tamanhos == 19) | (tamanhos == 25))
+    codigos = texto.iloc[candidatos].to_numpy().astype('<U25').view(np.uint32).reshape(-1, 25)
+
+    digitos = (codigos >= ord('0')) & (codigos <= ord('9'))
+    ok = digitos[:, _DIGITOS_TIMESTAMP].all(axis=1) & (codigos[:, 17] <= ord('5'))
+    for posicao, separador in _SEPARADORES_TIMESTAMP.items():
+        ok &= codigos[:, posicao] == ord(separador)
+    com_fuso = tamanhos[candidatos] == 25
+    ok &= ~com_fuso | (
+        ((codigos[:, 19] == ord('+')) | (codigos[:, 19] == ord('-')))
+        & digitos[:, _DIGITOS_FUSO].all(axis=1) & (codigos[:, 22] == ord(':'))
+    )
+
+    mascara = np.zeros(len(texto), dtype=bool)
+    mascara[candidatos[ok]] = True
+    return mascara, np.ascontiguousarray(codigos[ok, :19]).view('<U19').ravel()
+
+def parse_timestamps(texto):
+    """Versão vetorizada do strptime/strftime de format_timestamp para uma coluna de texto
+
+    Remove o fuso e converte de uma vez com pd.to_datetime no formato fixo os valores já no
+    formato padrão; os demais (poucos, como os com fração de segundos) perdem a fração e o fuso
+    e passam pelo strptime de _converter_timestamp célula a célula.
+    Retorna um array com 'YYYY-MM-DD HH:MM:SS' por célula, ou None onde o valor não é válido.
+    """
+    canonicos, sem_fuso = _timestamps_canonicos(texto)
+    datas = pd.to_datetime(sem_fuso, format=FORMATO_TIMESTAMP, errors='coerce').to_numpy()
+
+    # Só os valores válidos no intervalo do pandas; 'YYYY-MM-DDTHH:MM:SS' com o 'T' trocado pelo espaço
+    validas = ~np.isnat(datas)
+    iso = np.datetime_as_string(datas[validas], unit='s').astype('<U19')
+    iso.view(np.uint32).reshape(-1, 19)[:, 10] = ord(' ')
+
+    convertidos = np.full(len(texto), None, dtype=object)
+    convertidos[np.flatnonzero(canonicos)[validas]] = iso.astype(object)
+
+    # Frações de segundo, formatos incomuns, datas fora do intervalo do pandas ou inválidas
+    pendentes = ~canonicos
+    pendentes[np.flatnonzero(canonicos)[~validas]] = True
+    demais = np.flatnonzero(pendentes)
+    sem_fracao = texto.iloc[demais].str.replace(_FRACAO_E_FUSO, '', regex=True).str.strip()
+    convertidos[demais] = [_converter_timestamp(valor) for valor in sem_fracao]
+    return convertidos
+
+def format_sql_column(serie, field_type, rejeitos=None, null_literal=NULL):
+    """Versão vetorizada de format_sql_value: formata uma coluna inteira conforme o tipo
+
+    Tipos: 'string', 'number' (texto já numérico), 'float' (normalizado como str(float(x))),
+    'timestamp' e 'year'. Timestamps e floats inválidos viram null_literal, como os nulos; com
+    rejeitos (RelatorioRejeitos), são registrados lá com o índice da série como linha.
+    """
+    if field_type not in TIPOS_POR_VALOR:
+        return _formatar_coluna(serie, field_type, rejeitos, null_literal)
+
+    # Cada valor distinto é formatado uma única vez e o literal é espalhado pelas linhas
+    codigos, distintos = pd.factorize(serie)
+    relatorio = RelatorioRejeitos(None, None) if rejeitos is not None else None
+    literais = _formatar_coluna(pd.Series(distintos, dtype=object), field_type, relatorio, null_literal)
+    literais = np.append(literais.to_numpy(dtype=object), null_literal)[codigos]  # código -1 (nulo) -> último
+    if relatorio is not None and relatorio.partes:
+        # No relatório dos distintos, a "linha" é o código do valor
+        rejeitados = np.isin(codigos, np.concatenate([parte['linha'].to_numpy() for parte in relatorio.partes]))
+        rejeitos.adicionar(serie.name, serie[rejeitados].astype(str))
+    return pd.Series(literais, index=serie.index)
+
+def _formatar_coluna(serie, field_type, rejeitos, null_literal):
+    """Formatação célula a célula (vetorizada) de format_sql_column"""
+    texto = serie.astype(str)
+    nulos = serie.isna().to_numpy() | texto.str.upper().eq('NULL').to_numpy() | texto.eq('').to_numpy()
+    validos = texto[~nulos]
+
+    if field_type == 'string':
+        formatados = escape_string(validos)
+    elif field_type == 'float':
+        # Só a máscara da gramática do float(), sem exceções; nan e inf não existem em SQL
+        numericos = is_numeric(validos).to_numpy()
+        valores = validos[numericos].astype(float)
+        finitos = np.isfinite(valores.to_numpy())
+        aceitos = np.flatnonzero(numericos)[finitos]
+        if rejeitos is not None:
+            invalidos = np.ones(len(validos), dtype=bool)
+            invalidos[aceitos] = False
+            rejeitos.adicionar(serie.name, validos[invalidos])
+        mascara = np.flatnonzero(~nulos)[aceitos]
+        return _combinar(serie.index, [(mascara, valores[finitos].astype(str))], padrao=null_literal)
+    elif field_type == 'timestamp':
+        convertidos = parse_timestamps(validos)
+        invalidos = np.array([valor is None for valor in convertidos], dtype=bool)
+        if rejeitos is not None:
+            rejeitos.adicionar(serie.name, validos[invalidos])
+        convertidos[~invalidos] = "'" + convertidos[~invalidos] + "'"
+        convertidos[invalidos] = null_literal
+        formatados = pd.Series(convertidos, index=validos.index)
+    elif field_type == 'year':
+        # str(int(x)) para valores só com dígitos: basta remover zeros à esquerda
+        digitos = validos.str.isdigit().to_numpy()
+        validos = validos[digitos].str.lstrip('0').replace('', '0')
+        mascara = np.flatnonzero(~nulos)[digitos]
+        return _combinar(serie.index, [(mascara, validos)], padrao=null_literal)
+    else:  # number
+        formatados = validos
+
+    return _combinar(serie.index, [(~nulos, formatados)], padrao=null_literal)
+
+def format_sql_auto(serie, normalize_numbers=False, null_literal=NULL):
+    """Versão vetorizada do sql_val: 'NULL', número ou string conforme o conteúdo da célula"""
+    texto = serie.astype(str)
+    nulos = texto.eq(NULL).to_numpy()
+    numericos = is_numeric(texto).to_numpy() & ~nulos
+
+    strings = ~nulos & ~numericos
+
+    numeros = texto[numericos]
+    if normalize_numbers:
+        # Equivale a str(float(x))
+        numeros = numeros.astype(float).astype(str)
+
+    return _combinar(serie.index, [
+        (numericos, numeros),
+        (strings, escape_string(texto[strings]))
+    ], padrao=null_literal)
+
+def parse_literal(serie):
+    """Inverso dos formatadores: literal SQL -> valor Python (None, texto sem aspas ou número em texto)"""
+    texto = serie.astype(str)
+    strings = texto.str.startswith("'").to_numpy()
+    valores = texto.to_numpy(dtype=object)
+    valores[strings] = texto[strings].str.slice(1, -1).str.replace("''", "'", regex=False).to_numpy(dtype=object)
+    valores[texto.eq(NULL).to_numpy()] = None
+    return pd.Series(valores, index=serie.index)
+
+# ================= MONTAGEM DAS LINHAS =================
+def sql_frame(colunas):
+    """Junta colunas já formatadas ({coluna da tabela: literais}) num DataFrame, por posição"""
+    return pd.DataFrame({nome: coluna.to_numpy(dtype=object) for nome, coluna in colunas.items()})
+
+def build_values(colunas):
+    """Concatena colunas já formatadas (lista ou sql_frame) em tuplas '(a, b, ...)'"""
+    if isinstance(colunas, pd.DataFrame):
+        colunas = [colunas[nome] for nome in colunas.columns]
+    primeira, *demais = colunas
+    linhas = primeira.to_numpy(dtype=object)
+    for coluna in demais:
+        linhas = linhas + ', ' + coluna.to_numpy(dtype=object)
+    return ('(' + linhas + ')').tolist()
+
+def write_values(f, values, block_size=None):
+    """Escreve as tuplas de um INSERT separadas por vírgula e terminadas com ';'
+
+    Com block_size, escreve em blocos (como os scripts que usam blocos de 500)
+    e não escreve nada quando não há linhas.
+    """
+    if block_size is None:
+        f.write(",\n".join(values))
+        f.write(";\n")
+        return
+
+    for i in range(0, len(values), block_size):
+        block = values[i:i+block_size]
+        f.write(",\n".join(block))
+        f.write(";\n" if i+block_size >= len(values) else ",\n")
+
+def write_insert(f, cabecalho, literais, block_size=None):
+    """Escreve o cabeçalho do INSERT (terminado em 'VALUES\n') e as tuplas do sql_frame
+
+    Sem linhas (na carga incremental, um lote sem membros novos da dimensão) escreve só um
+    comentário: um INSERT ... VALUES sem tuplas não é SQL válido.
+    """
+    if not len(literais):
+        f.write("-- No rows to insert\n")
+        return
+    f.write(cabecalho)
+    write_values(f, build_values(literais), block_size)
+
+def write_statements(f, prefixo, values):
+    """Escreve um INSERT por linha ('<prefixo> VALUES (..);') para cada tupla"""
+    for i in range(0, len(values), TAMANHO_ESCRITA):
+        bloco = values[i:i+TAMANHO_ESCRITA]
+        f.write("".join(f"{prefixo} VALUES {v};\n" for v in bloco))
+
+def write_multirow(f, prefixo, values, linhas_por_insert=1000):
+    """Escreve um '<prefixo> VALUES' com várias tuplas a cada linhas_por_insert linhas"""
+    for i in range(0, len(values), linhas_por_insert):
+        f.write(f"{prefixo} VALUES\n")
+        f.write(",\n".join(values[i:i+linhas_por_insert]))
+        f.write(";\n")
+
+def write_events(f, prefixo, values, formato='multi', linhas_por_insert=1000):
+    """Escreve o mapeamento de eventos como um INSERT por linha ('linha') ou em blocos ('multi')"""
+    if formato == 'linha':
+        write_statements(f, prefixo, values)
+    else:
+        write_multirow(f, prefixo, values, linhas_por_insert)
+
+class StreamingValuesWriter:
+    """Escreve as tuplas de um INSERT à medida que chegam, em blocos
+
+    O arquivo final é idêntico ao de write_values(f, values, block_size), mas só
+    o bloco incompleto fica em memória entre uma chamada e outra.
+    """
+
+    def __init__(self, f, block_size=500):
+        self.f = f
+        self.block_size = block_size
+        self.pendentes = []
+        self.escritos = 0
+
+    def _escrever(self, block):
+        # Blocos seguintes ao primeiro continuam o mesmo INSERT
+        if self.escritos:
+            self.f.write(",\n")
+        self.f.write(",\n".join(block))
+        self.escritos += len(block)
+
+    def write(self, values):
+        self.pendentes.extend(values)
+        completos = len(self.pendentes) - len(self.pendentes) % self.block_size
+        for i in range(0, completos, self.block_size):
+            self._escrever(self.pendentes[i:i+self.block_size])
+        self.pendentes = self.pendentes[completos:]
+
+    def close(self):
+        if self.pendentes:
+            self._escrever(self.pendentes)
+            self.pendentes = []
+        if self.escritos:
+            self.f.write(";\n")
+
+# ================= RELATÓRIO DE REJEITADOS =================
+class RelatorioRejeitos:
+    """Acumula os valores rejeitados na formatação (ex.: timestamps ou números inválidos, gravados como NULL)
+
+    Em vez de uma linha no stdout por valor, salvar() grava um CSV (coluna, linha, valor)
+    e imprime só a contagem por coluna.
+    """
+
+    def __init__(self, tabela, caminho):
+        self.tabela = tabela
+        self.caminho = caminho
+        self.partes = []
+
+    def adicionar(self, coluna, valores):
+        """Registra os valores rejeitados de uma coluna; o índice da série é a linha"""
+        if len(valores):
+            self.partes.append(pd.DataFrame({'coluna': coluna, 'linha': valores.index, 'valor': valores.to_numpy()}))
+
+    def contagem(self):
+        if not self.partes:
+            return {}
+        return pd.concat(self.partes)['coluna'].value_counts(sort=False).to_dict()
+
+    def salvar(self):
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        if self.partes:
+            rejeitados = pd.concat(self.partes).sort_values('linha', kind='stable')
+        else:
+            rejeitados = pd.DataFrame(columns=['coluna', 'linha', 'valor'])
+        with escrita_atomica(self.caminho) as temporario:
+            rejeitados.to_csv(temporario, index=False, encoding='utf-8')
+
+        contagem = self.contagem()
+        if contagem:
+            detalhes = ", ".join(f"{coluna}: {n}" for coluna, n in contagem.items())
+            print(f"{self.tabela}: {sum(contagem.values())} valores inválidos gravados como NULL ({detalhes}) -> {self.caminho}")
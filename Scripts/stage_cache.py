@@ -0,0 +1,211 @@
+import hashlib
+import json
+import re
+import shutil
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from paths import PATHS
+from compressed_io import escrita_atomica
+
+TAMANHO_LEITURA = 1 << 20
+_IMPORT_RE = re.compile(r'^(?:from|import)\s+(\w+)', re.M)
+
+def hash_arquivo(caminho):
+    """SHA-256 do conteúdo do arquivo, lido em blocos"""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(TAMANHO_LEITURA), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+def assinatura(caminho, anterior=None):
+    """Hash do arquivo; reaproveita o hash anterior se tamanho e mtime não mudaram"""
+    stat = Path(caminho).stat()
+    if anterior and anterior['tamanho'] == stat.st_size and anterior['mtime_ns'] == stat.st_mtime_ns:
+        return anterior
+    return {'sha256': hash_arquivo(caminho), 'tamanho': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def coincide(caminho, anterior):
+    """O arquivo existe e tem o mesmo conteúdo registrado em anterior"""
+    caminho = Path(caminho)
+    return caminho.exists() and assinatura(caminho, anterior)['sha256'] == anterior['sha256']
+
+def gravar_json(caminho, dados):
+    """Grava o JSON num temporário, força para o disco e renomeia: o arquivo nunca fica pela metade"""
+    with escrita_atomica(caminho) as temporario, open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+
+def modulos_locais(script_path):
+    """O script e os módulos do próprio diretório que ele importa (recursivamente)"""
+    script_path = Path(script_path)
+    encontrados, fila = [], [script_path]
+    while fila:
+        atual = fila.pop()
+        if atual in encontrados or not atual.exists():
+            continue
+        encontrados.append(atual)
+        for nome in _IMPORT_RE.findall(atual.read_text(encoding='utf-8')):
+            fila.append(script_path.parent / f"{nome}.py")
+    return sorted(encontrados)
+
+class StageCache:
+    """Manifestos por etapa com hashes das entradas, saídas e do código do script
+
+    Uma etapa cujo código e entradas não mudaram desde a última execução bem-sucedida
+    é pulada; saídas apagadas ou alteradas desde então são restauradas da cópia em cache.
+    """
+
+    def __init__(self, diretorio=None):
+        self.diretorio = Path(diretorio or PATHS['cache_dir'])
+        self.objetos = self.diretorio / 'objetos'
+        self._lock = threading.Lock()  # Etapas paralelas registram ao mesmo tempo
+
+    def _caminho_manifesto(self, etapa):
+        return self.diretorio / f"{Path(etapa).stem}.json"
+
+    def _ler_manifesto(self, etapa):
+        try:
+            with open(self._caminho_manifesto(etapa), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _hashes_codigo(self, script_path):
+        return {modulo.name: hash_arquivo(modulo) for modulo in modulos_locais(script_path)}
+
+    def verificar(self, etapa, script_path, entradas, saidas):
+        """Retorna (reaproveitar, motivo). Em caso de acerto, restaura saídas que mudaram
+
+        entradas/saidas: {chave de PATHS: caminho}
+        """
+        manifesto = self._ler_manifesto(etapa)
+        if manifesto is None:
+            return False, "sem execução anterior registrada"
+        if manifesto['codigo'] != self._hashes_codigo(script_path):
+            return False, "código do script alterado"
+        for chave, caminho in entradas.items():
+            anterior = manifesto['entradas'].get(chave)
+            if anterior is None or not coincide(caminho, anterior):
+                return False, f"entrada alterada: {chave}"
+
+        restaurar = []
+        for chave, caminho in saidas.items():
+            anterior = manifesto['saidas'].get(chave)
+            if anterior is None:
+                return False, f"saída não registrada: {chave}"
+            if not coincide(caminho, anterior):
+                if not (self.objetos / anterior['sha256']).exists():
+                    return False, f"saída alterada e ausente do cache: {chave}"
+                restaurar.append((chave, caminho, anterior))
+
+        for chave, caminho, anterior in restaurar:
+            Path(caminho).parent.mkdir(parents=True, exist_ok=True)
+            with escrita_atomica(caminho) as temporario:
+                shutil.copy2(self.objetos / anterior['sha256'], temporario)
+
+        motivo = "entradas e código inalterados"
+        if restaurar:
+            motivo += f"; saídas restauradas: {', '.join(chave for chave, _, _ in restaurar)}"
+        return True, motivo
+
+    def registrar(self, etapa, script_path, entradas, saidas):
+        """Guarda o manifesto e uma cópia das saídas após uma execução bem-sucedida"""
+        if not all(Path(caminho).exists() for caminho in saidas.values()):
+            return  # Sem todas as saídas a etapa não é reaproveitável
+        with self._lock:
+            self._registrar(etapa, script_path, entradas, saidas)
+
+    def _registrar(self, etapa, script_path, entradas, saidas):
+        anterior = self._ler_manifesto(etapa) or {'entradas': {}, 'saidas': {}}
+        manifesto = {
+            'codigo': self._hashes_codigo(script_path),
+            'entradas': {
+                chave: assinatura(caminho, anterior['entradas'].get(chave))
+                for chave, caminho in entradas.items()
+            },
+            'saidas': {chave: assinatura(caminho) for chave, caminho in saidas.items()}
+        }
+
+        self.objetos.mkdir(parents=True, exist_ok=True)
+        for chave, caminho in saidas.items():
+            objeto = self.objetos / manifesto['saidas'][chave]['sha256']
+            if not objeto.exists():
+                with escrita_atomica(objeto) as temporario:
+                    shutil.copy2(caminho, temporario)
+
+        gravar_json(self._caminho_manifesto(etapa), manifesto)
+        self._limpar_objetos()
+
+    def _limpar_objetos(self):
+        """Remove cópias de saídas que nenhum manifesto referencia mais"""
+        referenciados = set()
+        for caminho in self.diretorio.glob('*.json'):
+            if caminho.stem.endswith('.tmp'):
+                continue  # Manifesto temporário de uma gravação interrompida
+            with open(caminho, encoding='utf-8') as f:
+                referenciados.update(s['sha256'] for s in json.load(f)['saidas'].values())
+        for objeto in self.objetos.iterdir():
+            if objeto.name not in referenciados:
+                objeto.unlink()
+
+class SuiteCheckpoint:
+    """Checkpoint durável da execução da suíte: status de cada etapa e hashes das saídas
+
+    Gravado a cada mudança de status (executando, ok, erro), num arquivo renomeado
+    atomicamente. Com --resume, as etapas concluídas cujas saídas ainda coincidem
+    com os hashes registrados não são executadas de novo.
+    """
+
+    def __init__(self, caminho=None, continuar=False):
+        self.caminho = Path(caminho or PATHS['suite_checkpoint'])
+        self._lock = threading.Lock()  # Etapas paralelas mudam de status ao mesmo tempo
+        self.dados = self._ler() if continuar else None
+        if self.dados is None:
+            self.dados = {'execucao': datetime.now().strftime('%Y-%m-%dT%H:%M:%S'), 'etapas': {}}
+            self.salvar()
+
+    def _ler(self):
+        try:
+            with open(self.caminho, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def concluida(self, etapa, saidas):
+        """Retorna (concluída, motivo): a etapa terminou bem e as saídas não mudaram desde então
+
+        saidas: {chave de PATHS: caminho}
+        """
+        registro = self.dados['etapas'].get(etapa)
+        if registro is None or registro['status'] != 'ok':
+            return False, f"status no checkpoint: {registro['status'] if registro else 'não iniciada'}"
+        for chave, caminho in saidas.items():
+            anterior = registro['saidas'].get(chave)
+            if anterior is None or not coincide(caminho, anterior):
+                return False, f"saída alterada desde o checkpoint: {chave}"
+        return True, f"concluída em {registro['concluida_em']}"
+
+    def marcar(self, etapa, status):
+        """Registra o status da etapa (executando ou erro) sem hashes de saída"""
+        with self._lock:
+            self.dados['etapas'][etapa] = {'status': status, 'concluida_em': None, 'saidas': {}}
+            self.salvar()
+
+    def concluir(self, etapa, saidas):
+        """Registra a etapa como concluída, com os hashes das saídas existentes"""
+        registro = {
+            'status': 'ok',
+            'concluida_em': datetime.now().strftime('%Y-%m-%dT%H:%M:%S'),
+            'saidas': {chave: assinatura(caminho) for chave, caminho in saidas.items() if Path(caminho).exists()}
+        }
+        with self._lock:
+            self.dados['etapas'][etapa] = registro
+            self.salvar()
+
+    def salvar(self):
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        gravar_json(self.caminho, self.dados)
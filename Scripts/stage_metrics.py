@@ -0,0 +1,118 @@
+import argparse
+import cProfile
+import json
+import runpy
+import sys
+import time
+from pathlib import Path
+from compressed_io import abrir, sufixo_sem_compressao
+
+TAMANHO_LEITURA = 1 << 24
+
+# Linhas que o script em execução carregou das suas entradas (None se ele não registrou leituras)
+_linhas_lidas = None
+
+# ================= RECURSOS DO PROCESSO =================
+def uso_de_recursos():
+    """CPU (s) e pico de RSS (MB) deste processo somados aos dos subprocessos já encerrados"""
+    try:
+        import resource
+    except ImportError:  # Windows: só o próprio processo, e o RSS se o psutil estiver instalado
+        pico = None
+        try:
+            import psutil
+            pico = psutil.Process().memory_info().peak_wset / 2**20
+        except (ImportError, AttributeError):
+            pass
+        return {'cpu_s': time.process_time(), 'pico_rss_mb': pico}
+
+    proprio = resource.getrusage(resource.RUSAGE_SELF)
+    filhos = resource.getrusage(resource.RUSAGE_CHILDREN)
+    unidade = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss: bytes no macOS, KB no Linux
+    return {
+        'cpu_s': proprio.ru_utime + proprio.ru_stime + filhos.ru_utime + filhos.ru_stime,
+        'pico_rss_mb': max(proprio.ru_maxrss, filhos.ru_maxrss) * unidade / 2**20
+    }
+
+# ================= LINHAS LIDAS =================
+def registrar_leitura(linhas):
+    """Soma linhas carregadas de uma entrada às métricas do script (chamado pelas funções de leitura)"""
+    global _linhas_lidas
+    _linhas_lidas = (_linhas_lidas or 0) + int(linhas)
+
+def linhas_lidas():
+    return _linhas_lidas
+
+def executar(script, caminho_metricas, caminho_pstats=None, argumentos=()):
+    """Executa o script como __main__ e grava CPU, memória e linhas lidas em caminho_metricas (JSON),
+    mesmo se ele falhar; com caminho_pstats, roda sob o cProfile e salva o .pstats"""
+    sys.argv = [str(script), *argumentos]
+    perfil = cProfile.Profile() if caminho_pstats else None
+    try:
+        if perfil:
+            perfil.enable()
+        runpy.run_path(str(script), run_name='__main__')
+    finally:
+        if perfil:
+            perfil.disable()
+            Path(caminho_pstats).parent.mkdir(parents=True, exist_ok=True)
+            perfil.dump_stats(caminho_pstats)
+        # Importado pelo nome: rodando como __main__, os scripts registram as leituras em outra cópia deste módulo
+        from stage_metrics import linhas_lidas
+        with open(caminho_metricas, 'w', encoding='utf-8') as f:
+            json.dump({**uso_de_recursos(), 'linhas_lidas': linhas_lidas()}, f)
+
+# ================= CONTAGEM DE LINHAS =================
+def _contar(caminho, padrao, inicio_conta=False):
+    """Ocorrências de padrao no arquivo, lido em blocos; inicio_conta trata o começo do arquivo
+    como precedido de '\\n' (para padrões do tipo '\\n(')"""
+    total, anterior = 0, b'\n' if inicio_conta else b''
+    with abrir(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(TAMANHO_LEITURA), b''):
+            janela = anterior + bloco
+            total += janela.count(padrao)
+            # Guarda o fim do bloco para não perder ocorrências que cruzam a fronteira
+            anterior = janela[-(len(padrao) - 1):] if len(padrao) > 1 else b''
+    return total
+
+def contar_linhas(caminho):
+    """Número de linhas de dados do arquivo conforme o formato; None se não souber contar
+
+    .csv: linhas menos o cabeçalho | .sql: tuplas de VALUES | .npy: tamanho do array
+    .parquet: metadados (requer pyarrow) | .txt e .tsv: linhas
+    Arquivos .gz e .zst são contados pelo conteúdo descomprimido.
+    """
+    caminho = Path(caminho)
+    if not caminho.is_file():
+        return None
+    sufixo = sufixo_sem_compressao(caminho)
+    if sufixo == '.npy':
+        import numpy as np
+        return int(np.load(caminho, mmap_mode='r').shape[0])
+    if sufixo == '.parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            return None
+        return pq.ParquetFile(caminho).metadata.num_rows
+    if sufixo == '.sql':
+        # Tuplas no início da linha (INSERT com várias linhas) e INSERTs de uma linha só
+        return _contar(caminho, b'\n(', inicio_conta=True) + _contar(caminho, b'VALUES (')
+    if sufixo in ('.csv', '.txt', '.tsv'):
+        linhas = _contar(caminho, b'\n')
+        return max(linhas - 1, 0) if sufixo == '.csv' else linhas
+    return None
+
+def somar_linhas(caminhos):
+    """Soma as linhas dos arquivos que sabe contar; None se não conseguir contar nenhum"""
+    contagens = [n for n in (contar_linhas(c) for c in caminhos) if n is not None]
+    return sum(contagens) if contagens else None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Executa um script da suíte medindo CPU, memória e (opcional) perfil")
+    parser.add_argument('--metricas', required=True, help="arquivo JSON com CPU e pico de RSS")
+    parser.add_argument('--profile', default=None, help="salva o perfil do cProfile neste .pstats")
+    parser.add_argument('script')
+    parser.add_argument('argumentos', nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+    executar(args.script, args.metricas, args.profile, args.argumentos)
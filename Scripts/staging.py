@@ -0,0 +1,305 @@
+import csv
+import os
+import numpy as np
+import pandas as pd
+from paths import PATHS, STAGING, LEITOR_CSV
+from stage_metrics import registrar_leitura
+
+# ================= LEITURA DAS ENTRADAS =================
+# Como cada script gerador lê o seu CSV de entrada. A camada de staging grava exatamente
+# o DataFrame resultante (tipos e índice incluídos), então ler do Parquet ou do CSV dá o mesmo resultado.
+LEITURAS = {
+    'weather_conditions_input': dict(skiprows=2, header=None, names=['Description']),
+    'day_periods_input': dict(skiprows=2, header=None, names=[
+        'Sunrise_Sunset', 'Civil_Twilight', 'Nautical_Twilight', 'Astronomical_Twilight'
+    ]),
+    'weather_input': dict(skiprows=2, header=None, names=[
+        "Weather_Timestamp", "Temperature", "Humidity", "Pressure",
+        "Visibility", "Wind_Direction", "Wind_Speed",
+        "Precipitation", "Weather_Condition_ID", "Day_Period_ID"
+    ]),
+    'locations_input': dict(skiprows=2, header=None, names=[
+        "Original_ID", "Street", "City", "County", "State",
+        "Zipcode", "Country", "Airport_Code"
+    ]),
+    'road_features_input': dict(skiprows=2, header=None, names=[
+        "Feature_ID", "Amenity", "Bump", "Crossing", "Give_Way",
+        "Junction", "No_Exit", "Railway", "Roundabout", "Station",
+        "Stop", "Traffic_Calming", "Traffic_Signal", "Turning_Loop"
+    ], dtype='str'),
+    'accidents_input': dict(dtype={
+        'Accident_ID*': 'str',
+        'Severity': 'Int64',
+        'Start_Time': 'str',
+        'End_Time': 'str',
+        'Distance(mi)': 'str',  # Mudamos para str para fazer a limpeza manual
+        'Description': 'str',
+        'Location_ID**': 'str',
+        'Feature_ID*': 'str',
+        'Weather_ID**': 'str',
+        'Year': 'Int64'
+    })
+}
+
+# Arquivos intermediários lidos pelos geradores (não passam pelo staging)
+LEITURAS_INTERMEDIARIAS = {
+    'airports_output': dict(dtype={
+        'Airport_Code': 'str',
+        'Timezone': 'str',
+        'Airport_Name': 'str'
+    }),
+    'airport_events': dict(),
+    # AIRPORTS.csv bruto, lido direto na carga incremental; vazios ficam '' como no csv.DictReader do pre_processamento
+    'airports_input': dict(dtype='str', keep_default_na=False)
+}
+
+BOOL_COLS_ROAD_FEATURES = ["Amenity", "Bump", "Crossing", "Give_Way", "Junction",
+                           "No_Exit", "Railway", "Roundabout", "Station", "Stop",
+                           "Traffic_Calming", "Traffic_Signal", "Turning_Loop"]
+
+def mascara_road_features(df):
+    """Empacota as colunas booleanas de ROAD_FEATURES num uint16 por evento
+
+    O bit i vale 1 quando a coluna BOOL_COLS_ROAD_FEATURES[i] é 'True' (em qualquer caixa);
+    qualquer outro texto ou nulo vale 0. Colunas já numéricas (0/1) também são aceitas.
+    Cada coluna é fatorada e só os seus poucos valores distintos são comparados com 'TRUE'.
+    """
+    mascara = np.zeros(len(df), dtype=np.uint16)
+    for bit, col in enumerate(BOOL_COLS_ROAD_FEATURES):
+        if pd.api.types.is_numeric_dtype(df[col]):
+            verdadeiro = df[col].fillna(0).to_numpy() != 0
+        else:
+            codigos, valores = pd.factorize(df[col])  # Nulos ficam com o código -1
+            eh_true = pd.Series(valores, dtype=object).astype(str).str.upper().eq('TRUE').to_numpy()
+            verdadeiro = np.append(eh_true, False)[codigos]
+        mascara |= verdadeiro.astype(np.uint16) << np.uint16(bit)
+    return mascara
+
+def compactar_road_features(df):
+    """Troca as 13 colunas booleanas de ROAD_FEATURES pela máscara uint16 ('Mascara')"""
+    return pd.DataFrame({'Mascara': mascara_road_features(df)}, index=df.index)
+
+# Conversões feitas uma única vez, logo após a leitura do CSV (e antes de gravar o staging)
+CONVERSOES = {
+    'road_features_input': compactar_road_features
+}
+
+COMPRESSAO = 'zstd'
+
+# ================= CSV =================
+def ler_csv(chave, chunksize=None, colunas=None, caminho=None, motor=None):
+    """Lê o CSV de PATHS[chave] (ou caminho) como o script gerador espera, já com as conversões da tabela
+
+    colunas: só essas colunas são lidas, na ordem pedida. chunksize: gerador de blocos de até
+    chunksize linhas. motor: 'c' ou 'pyarrow' (padrão: LEITOR_CSV de paths.py).
+    """
+    caminho = caminho or PATHS[chave]
+    opcoes = LEITURAS[chave] if chave in LEITURAS else LEITURAS_INTERMEDIARIAS[chave]
+    converter = CONVERSOES.get(chave, lambda df: df)
+    projetar = (lambda df: df[colunas]) if colunas is not None else (lambda df: df)
+
+    if (motor or LEITOR_CSV) == 'pyarrow':
+        if chunksize:
+            blocos = _ler_csv_arrow_em_chunks(caminho, opcoes, colunas, chunksize)
+            return _contados(converter(projetar(chunk)) for chunk in blocos)
+        return _contado(converter(projetar(_ler_csv_arrow(caminho, opcoes, colunas))))
+
+    if colunas is not None:
+        opcoes = {**opcoes, 'usecols': colunas}
+    if chunksize:
+        return _contados(converter(projetar(chunk)) for chunk in pd.read_csv(caminho, chunksize=chunksize, **opcoes))
+    return _contado(converter(projetar(pd.read_csv(caminho, **opcoes))))
+
+def _contado(df):
+    """Registra as linhas do DataFrame lido nas métricas da etapa (stage_metrics)"""
+    registrar_leitura(len(df))
+    return df
+
+def _contados(blocos):
+    """Repassa os blocos registrando as linhas de cada um à medida que são lidos"""
+    for bloco in blocos:
+        yield _contado(bloco)
+
+# ================= CSV COM PYARROW =================
+# O leitor do Arrow é configurado para entregar o mesmo DataFrame que o pd.read_csv: os mesmos textos
+# nulos, True/False só nessas grafias, datas mantidas como texto, colunas vazias como float NaN e, quando
+# há mais colunas que nomes, as primeiras como índice. Os textos ficam em strings Arrow com NaN como
+# nulo, que se comportam como as colunas object do leitor C.
+VALORES_NULOS = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                 '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+VERDADEIROS = ['True', 'TRUE', 'true']
+FALSOS = ['False', 'FALSE', 'false']
+TAMANHO_BLOCO_CSV = 1 << 24
+
+def _pyarrow_csv():
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+    except ImportError:
+        raise RuntimeError("LEITOR_CSV = 'pyarrow' requer o pacote pyarrow (pip install pyarrow)")
+    return pa, pacsv
+
+def _tipo_texto():
+    """String Arrow com NaN como nulo (pandas >= 2.3; 'pyarrow_numpy' nas versões 2.1 e 2.2)"""
+    try:
+        return pd.StringDtype('pyarrow', na_value=np.nan)
+    except TypeError:
+        return pd.StringDtype('pyarrow_numpy')
+
+def _numero_de_colunas(caminho, pular):
+    """Campos da primeira linha de dados (para saber quantas colunas sobram para o índice)"""
+    with open(caminho, newline='', encoding='utf-8') as f:
+        leitor = csv.reader(f)
+        for _ in range(pular):
+            next(leitor, None)
+        return len(next(leitor, []))
+
+def _opcoes_arrow(caminho, opcoes, colunas, texto=()):
+    """(ReadOptions, ParseOptions, ConvertOptions, colunas do índice, colunas Int64) equivalentes às opções do read_csv
+
+    texto: colunas lidas como string mesmo que o Arrow inferisse outro tipo (datas).
+    """
+    pa, pacsv = _pyarrow_csv()
+    pular = opcoes.get('skiprows', 0)
+    nomes, indice = opcoes.get('names'), []
+    if nomes is not None:
+        indice = [f"__indice_{i}" for i in range(_numero_de_colunas(caminho, pular) - len(nomes))]
+        nomes = indice + list(nomes)
+
+    dtype = opcoes.get('dtype') or {}
+    if not isinstance(dtype, dict):
+        dtype = dict.fromkeys(opcoes['names'], dtype)
+    # Int64 é lido como float64 e convertido depois: o read_csv aceita '2019.0' numa coluna Int64
+    tipos = {col: pa.string() if tipo == 'str' else pa.float64() for col, tipo in dtype.items()}
+    tipos.update({col: pa.string() for col in texto})
+    inteiros = [col for col, tipo in dtype.items() if tipo == 'Int64']
+
+    leitura = pacsv.ReadOptions(skip_rows=pular, column_names=nomes, block_size=TAMANHO_BLOCO_CSV)
+    conversao = pacsv.ConvertOptions(
+        column_types=tipos, null_values=VALORES_NULOS, true_values=VERDADEIROS, false_values=FALSOS,
+        strings_can_be_null=True, quoted_strings_can_be_null=True,
+        include_columns=indice + list(colunas) if colunas is not None else []
+    )
+    # Textos entre aspas podem ter quebras de linha, como no read_csv
+    return leitura, pacsv.ParseOptions(newlines_in_values=True), conversao, indice, inteiros
+
+def _datas(esquema):
+    """Colunas que o Arrow inferiu como data ou hora (o read_csv as mantém como texto)"""
+    pa, _ = _pyarrow_csv()
+    return [campo.name for campo in esquema if pa.types.is_temporal(campo.type)]
+
+def _tabela_para_pandas(tabela, indice, inteiros, inicio=0):
+    """DataFrame com os mesmos tipos e índice que o read_csv daria"""
+    pa, _ = _pyarrow_csv()
+    for i, campo in enumerate(tabela.schema):
+        if pa.types.is_null(campo.type):
+            tabela = tabela.set_column(i, campo.name, tabela.column(i).cast(pa.float64()))
+    tipo_texto = _tipo_texto()
+    df = tabela.to_pandas(types_mapper=lambda tipo: tipo_texto if tipo == pa.string() else None)
+    for col in df.columns[df.dtypes == object]:  # Booleanos com nulos
+        df[col] = df[col].where(df[col].notna(), float('nan'))
+    for col in inteiros:
+        if col in df:
+            df[col] = df[col].astype('Int64')
+    if indice:
+        df = df.set_index(indice)
+        df.index.names = [None] * len(indice)
+    else:
+        df.index = pd.RangeIndex(inicio, inicio + len(df))
+    return df
+
+def _ler_csv_arrow(caminho, opcoes, colunas=None):
+    """Lê o arquivo inteiro com o leitor multi-thread do Arrow"""
+    _, pacsv = _pyarrow_csv()
+    leitura, analise, conversao, indice, inteiros = _opcoes_arrow(caminho, opcoes, colunas)
+    tabela = pacsv.read_csv(caminho, read_options=leitura, parse_options=analise, convert_options=conversao)
+    datas = _datas(tabela.schema)
+    if datas:
+        leitura, analise, conversao, indice, inteiros = _opcoes_arrow(caminho, opcoes, colunas, texto=datas)
+        tabela = pacsv.read_csv(caminho, read_options=leitura, parse_options=analise, convert_options=conversao)
+    return _tabela_para_pandas(tabela, indice, inteiros)
+
+def _ler_csv_arrow_em_chunks(caminho, opcoes, colunas, chunksize):
+    """Lê o arquivo em fluxo, bloco a bloco, e entrega DataFrames de até chunksize linhas
+
+    Os tipos das colunas sem dtype declarado são inferidos pelo primeiro bloco do arquivo.
+    """
+    pa, pacsv = _pyarrow_csv()
+    leitura, analise, conversao, indice, inteiros = _opcoes_arrow(caminho, opcoes, colunas)
+    leitor = pacsv.open_csv(caminho, read_options=leitura, parse_options=analise, convert_options=conversao)
+    datas = _datas(leitor.schema)
+    if datas:
+        leitor.close()
+        leitura, analise, conversao, indice, inteiros = _opcoes_arrow(caminho, opcoes, colunas, texto=datas)
+        leitor = pacsv.open_csv(caminho, read_options=leitura, parse_options=analise, convert_options=conversao)
+
+    pendentes, linhas, inicio = [], 0, 0
+    for lote in leitor:
+        pendentes.append(lote)
+        linhas += lote.num_rows
+        while linhas >= chunksize:
+            tabela = pa.Table.from_batches(pendentes, schema=leitor.schema)
+            yield _tabela_para_pandas(tabela.slice(0, chunksize), indice, inteiros, inicio)
+            inicio += chunksize
+            resto = tabela.slice(chunksize)
+            pendentes, linhas = resto.to_batches(), resto.num_rows
+    if linhas:
+        yield _tabela_para_pandas(pa.Table.from_batches(pendentes, schema=leitor.schema), indice, inteiros, inicio)
+
+# ================= PARQUET =================
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("STAGING = True requer o pacote pyarrow (pip install pyarrow)")
+    return pa, pq
+
+def caminho_staging(chave):
+    """Arquivo Parquet de staging correspondente à entrada PATHS[chave] ('x_input' -> 'x_staging')"""
+    return PATHS[chave.replace('_input', '_staging')]
+
+def staging_atualizado(chave):
+    """O Parquet existe e é mais novo que o CSV de origem"""
+    destino = caminho_staging(chave)
+    return destino.exists() and destino.stat().st_mtime >= PATHS[chave].stat().st_mtime
+
+def gravar_staging(chave):
+    """Lê o CSV uma vez, aplica as conversões e grava o Parquet tipado e comprimido"""
+    pa, pq = _pyarrow()
+    destino = caminho_staging(chave)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+
+    df = ler_csv(chave)
+    temporario = destino.with_name(destino.name + '.tmp')
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=True), temporario, compression=COMPRESSAO)
+    os.replace(temporario, destino)
+    return f"{chave}: {len(df)} linhas -> {destino}"
+
+def _para_pandas(tabela):
+    """Converte para DataFrame com os nulos de texto como NaN, como o read_csv entrega"""
+    df = tabela.to_pandas()
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].where(df[col].notna(), float('nan'))
+    return df
+
+# ================= LEITURA PELOS GERADORES =================
+def usar_staging(chave):
+    return STAGING and staging_atualizado(chave)
+
+def ler_entrada(chave, colunas=None):
+    """DataFrame de entrada de um gerador: do Parquet de staging (só as colunas pedidas,
+    mapeado em memória) quando STAGING está ativo e atualizado, senão do CSV"""
+    if usar_staging(chave):
+        _, pq = _pyarrow()
+        tabela = pq.read_table(caminho_staging(chave), columns=colunas, memory_map=True, use_pandas_metadata=True)
+        return _contado(_para_pandas(tabela))
+    return ler_csv(chave, colunas=colunas)
+
+def ler_entrada_em_chunks(chave, chunksize):
+    """Como ler_entrada, mas em blocos de até chunksize linhas"""
+    if usar_staging(chave):
+        _, pq = _pyarrow()
+        arquivo = pq.ParquetFile(caminho_staging(chave), memory_map=True)
+        return _contados(_para_pandas(lote) for lote in arquivo.iter_batches(batch_size=chunksize))
+    return ler_csv(chave, chunksize=chunksize)
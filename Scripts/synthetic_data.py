@@ -0,0 +1,220 @@
+import argparse
+import csv
+import re
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Gerador de dados sintéticos no formato do dump US_ACCIDENTS: um arquivo para cada entrada lida
+# pelos scripts (AIRPORTS.csv, *_filtrado.csv com as duas linhas de cabeçalho e airports_database.csv),
+# todos com o mesmo número de linhas (a posição da linha é o evento). Mesma semente, mesmos arquivos.
+
+TAMANHO_BLOCO = 1_000_000   # Linhas geradas e gravadas por vez
+
+CONDICOES = ['Fair', 'Mostly Cloudy', 'Clear', 'Cloudy', 'Overcast', 'Partly Cloudy', 'Light Rain',
+             'Light Snow', 'Scattered Clouds', 'Fog', 'Rain', 'Haze', 'Snow', 'Fair / Windy',
+             'Light Drizzle', 'Heavy Rain', 'Cloudy / Windy', 'Thunder in the Vicinity', 'T-Storm', 'Wintry Mix']
+PESOS_CONDICOES = [47, 19, 17, 16, 16, 14, 8.5, 6.5, 3.5, 2, 2, 1.3, 0.7, 0.7, 0.6, 0.6, 0.4, 0.3, 0.3, 0.3]
+
+FUSOS = ['US/Eastern', 'US/Central', 'US/Pacific', 'US/Mountain']
+PESOS_FUSOS = [49, 23, 22, 6]
+
+ESTADOS = ['CA', 'FL', 'TX', 'SC', 'NY', 'NC', 'VA', 'PA', 'MN', 'OR', 'OH', 'GA', 'IL', 'AZ', 'MI']
+CIDADES = ['Miami', 'Houston', 'Los Angeles', 'Charlotte', 'Dallas', 'Orlando', 'Austin', 'Raleigh',
+           'Nashville', 'Baton Rouge', 'Atlanta', 'Sacramento', 'San Diego', 'Minneapolis', "Coeur d'Alene"]
+CONDADOS = ['Los Angeles', 'Miami-Dade', 'Orange', 'Harris', 'Dallas', 'Mecklenburg', 'Wake', 'San Diego']
+RUAS = ['Main St', 'I-95 N', 'I-5 S', 'Broadway', 'Highway 101', 'Market St', "O'Hare Dr", 'Route 66']
+DIRECOES_VENTO = ['CALM', 'Calm', 'N', 'S', 'E', 'W', 'NW', 'SW', 'SSW', 'WNW', 'Variable', 'VAR']
+DESCRICOES = ['Right lane blocked due to accident on I-70 Eastbound at Exit 41.',
+              'Accident on Main St at Broadway.', "Driver's lane closed, use caution.",
+              'Incident on I-95 N near Exit 12, with "heavy" traffic.', 'Slow traffic on Route 66.']
+
+ROAD_FEATURES = ["Amenity", "Bump", "Crossing", "Give_Way", "Junction", "No_Exit", "Railway",
+                 "Roundabout", "Station", "Stop", "Traffic_Calming", "Traffic_Signal", "Turning_Loop"]
+PROB_ROAD_FEATURES = [0.012, 0.0005, 0.11, 0.005, 0.07, 0.0025, 0.009, 0.0001, 0.026, 0.028, 0.001, 0.15, 0.0]
+
+INICIO = np.datetime64('2016-01-01T00:00:00')
+FIM = np.datetime64('2023-03-31T23:59:59')
+
+def ler_escala(texto):
+    """'10k' -> 10000, '1M' -> 1000000, '2.5m' -> 2500000; números simples também são aceitos"""
+    m = re.fullmatch(r'\s*([\d.]+)\s*([kKmM]?)\s*', str(texto))
+    if not m:
+        raise ValueError(f"Escala inválida: {texto}")
+    return int(float(m.group(1)) * {'': 1, 'k': 1_000, 'm': 1_000_000}[m.group(2).lower()])
+
+def _escolher(rng, valores, n, pesos=None):
+    p = None if pesos is None else np.asarray(pesos, dtype=float) / np.sum(pesos)
+    return np.asarray(valores, dtype=object)[rng.choice(len(valores), n, p=p)]
+
+def _numeros(rng, n, minimo, maximo, casas=1, prob_nulo=0.02):
+    """Números como texto, com alguns vazios (nulos no CSV)"""
+    valores = np.round(rng.uniform(minimo, maximo, n), casas).astype(str).astype(object)
+    valores[rng.random(n) < prob_nulo] = ''
+    return valores
+
+def _texto_timestamp(datas):
+    """datetime64[s] -> 'YYYY-MM-DD HH:MM:SS' (object); aceita arrays vazios, ao contrário do np.char.replace"""
+    return pd.Series(np.datetime_as_string(datas, unit='s'), dtype=object).str.replace('T', ' ').to_numpy(dtype=object)
+
+def _horarios(rng, n):
+    """Timestamps como no dump: a maioria 'YYYY-MM-DD HH:MM:SS', alguns com fuso ou nanossegundos"""
+    segundos = rng.integers(0, int((FIM - INICIO).astype(int)), n)
+    inicio = INICIO + segundos.astype('timedelta64[s]')
+    texto = _texto_timestamp(inicio)
+    sorteio = rng.random(n)
+    texto[sorteio < 0.05] = texto[sorteio < 0.05] + '.000000000'
+    texto[(sorteio >= 0.05) & (sorteio < 0.08)] = texto[(sorteio >= 0.05) & (sorteio < 0.08)] + '-05:00'
+    return inicio, texto
+
+def _codigos_aeroportos(rng, quantidade):
+    letras = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'))
+    sufixos = rng.choice(letras, (quantidade * 2, 3))
+    codigos = pd.unique(np.array(['K' + ''.join(s) for s in sufixos], dtype=object))
+    return codigos[:quantidade]
+
+# ================= TABELAS =================
+def _weather_conditions(rng, n):
+    return {'Weather_Condition_ID*': '', 'Description': _escolher(rng, CONDICOES, n, PESOS_CONDICOES)}
+
+def _day_periods(rng, n):
+    noite = rng.random(n) < 0.3
+    colunas = {'Day_Period_ID*': ''}
+    for i, nome in enumerate(['Sunrise_Sunset', 'Civil_Twilight', 'Nautical_Twilight', 'Astronomical_Twilight']):
+        # Os crepúsculos mais longos transformam parte das noites em dia
+        dia = ~noite | (rng.random(n) < 0.1 * i)
+        colunas[nome] = np.where(dia, 'Day', 'Night').astype(object)
+    return colunas
+
+def _weather(rng, n):
+    _, horarios = _horarios(rng, n)
+    return {
+        'Weather_ID*': '',
+        'Weather_Timestamp': horarios,
+        'Temperature(F)': _numeros(rng, n, -20, 110),
+        'Humidity(%)': _numeros(rng, n, 5, 100, casas=0),
+        'Pressure(in)': _numeros(rng, n, 28, 31, casas=2),
+        'Visibility(mi)': _numeros(rng, n, 0, 10),
+        'Wind_Direction': _escolher(rng, DIRECOES_VENTO, n),
+        'Wind_Speed(mph)': _numeros(rng, n, 0, 40),
+        'Precipitation(in)': _numeros(rng, n, 0, 0.5, casas=2, prob_nulo=0.3),
+        'Weather_Condition_ID**': '',
+        'Day_Period_ID**': ''
+    }
+
+def _locations(rng, n):
+    zip5 = rng.integers(1000, 99999, n).astype(str).astype(object)
+    zip5 = np.array([z.zfill(5) for z in zip5], dtype=object)
+    extensao = rng.random(n) < 0.3
+    zip5[extensao] = zip5[extensao] + '-' + rng.integers(1000, 9999, extensao.sum()).astype(str).astype(object)
+    numeros = rng.integers(1, 9999, n).astype(str).astype(object)
+    return {
+        'Location_ID*': '',
+        'Street': np.where(rng.random(n) < 0.5, numeros + ' ', '') + _escolher(rng, RUAS, n),
+        'City': _escolher(rng, CIDADES, n),
+        'County': _escolher(rng, CONDADOS, n),
+        'State': _escolher(rng, ESTADOS, n),
+        'Zipcode': zip5,
+        'Country': 'US',
+        'Airport_Code**': ''
+    }
+
+def _road_features(rng, n):
+    colunas = {'Feature_ID*': ''}
+    for nome, prob in zip(ROAD_FEATURES, PROB_ROAD_FEATURES):
+        colunas[nome] = np.where(rng.random(n) < prob, 'True', 'False').astype(object)
+    return colunas
+
+def _accidents(rng, n, primeiro):
+    inicio, horarios = _horarios(rng, n)
+    duracao = rng.integers(15 * 60, 6 * 3600, n).astype('timedelta64[s]')
+    fim = _texto_timestamp(inicio + duracao)
+    ano = inicio.astype('datetime64[Y]').astype(int) + 1970
+    return {
+        'Accident_ID*': 'A-' + np.arange(primeiro + 1, primeiro + n + 1).astype(str).astype(object),
+        'Severity': rng.choice([1, 2, 3, 4], n, p=[0.01, 0.8, 0.17, 0.02]),
+        'Start_Time': horarios,
+        'End_Time': fim,
+        'Distance(mi)': np.round(rng.exponential(0.6, n), 3),
+        'Description': _escolher(rng, DESCRICOES, n),
+        'Location_ID**': '',
+        'Feature_ID*': '',
+        'Weather_ID**': '',
+        'Year': ano
+    }
+
+# Arquivo, linha de título (só nos *_filtrado com duas linhas de cabeçalho) e gerador de cada tabela
+TABELAS = {
+    'WEATHER_CONDITIONS_filtrado.csv': ('WEATHER_CONDITIONS', _weather_conditions),
+    'DAY_PERIODS_filtrado.csv': ('DAY_PERIODS', _day_periods),
+    'WEATHER_filtrado.csv': ('WEATHER', _weather),
+    'LOCATIONS_filtrado.csv': ('LOCATIONS', _locations),
+    'ROAD_FEATURES_filtrado.csv': ('ROAD_FEATURES', _road_features),
+    'ACCIDENTS_filtrado.csv': (None, None),
+}
+
+# ================= GRAVAÇÃO =================
+def _gravar_blocos(caminho, n, gerar, titulo, seed, semente_tabela):
+    """Gera e grava a tabela em blocos; cada bloco tem a sua semente derivada de (seed, tabela, bloco)"""
+    with open(caminho, 'w', newline='', encoding='utf-8') as f:
+        for bloco, inicio in enumerate(range(0, n, TAMANHO_BLOCO) or [0]):
+            tamanho = min(TAMANHO_BLOCO, n - inicio)
+            rng = np.random.default_rng([seed, semente_tabela, bloco])
+            df = pd.DataFrame(gerar(rng, tamanho, inicio), index=range(tamanho))
+            if bloco == 0 and titulo:
+                # Primeira linha: nome da tabela e as colunas 'Unnamed: i', como no dump original
+                csv.writer(f).writerow([titulo] + [f"Unnamed: {i}" for i in range(1, len(df.columns))])
+            df.to_csv(f, index=False, header=(bloco == 0))
+
+def gerar_aeroportos(rng, n, caminho_aeroportos, caminho_database, quantidade_codigos=2000):
+    """AIRPORTS.csv (um código/fuso por evento) e o airports_database.csv do OurAirports
+
+    Cerca de 90% dos códigos estão no database pelo ident, 5% só pelo gps_code e 5% não têm nome.
+    """
+    codigos = _codigos_aeroportos(rng, quantidade_codigos)
+    fuso_do_codigo = _escolher(rng, FUSOS, len(codigos), PESOS_FUSOS)
+    # Poucos aeroportos concentram a maior parte dos eventos
+    pesos = rng.pareto(1.2, len(codigos)) + 1
+
+    with open(caminho_aeroportos, 'w', newline='', encoding='utf-8') as f:
+        f.write("Airport_Code,Timezone\n")
+        for inicio in range(0, n, TAMANHO_BLOCO):
+            indices = rng.choice(len(codigos), min(TAMANHO_BLOCO, n - inicio), p=pesos / pesos.sum())
+            pd.DataFrame({'Airport_Code': codigos[indices], 'Timezone': fuso_do_codigo[indices]}) \
+                .to_csv(f, index=False, header=False)
+
+    sorteio = rng.random(len(codigos))
+    por_ident, por_gps = sorteio < 0.9, (sorteio >= 0.9) & (sorteio < 0.95)
+    nomes = np.array([f"{codigo[1:]} Regional Airport" for codigo in codigos], dtype=object)
+    pd.DataFrame({
+        'id': np.arange(1, len(codigos) + 1),
+        'ident': np.where(por_ident, codigos, np.where(por_gps, 'US-' + codigos.astype(str), 'XX-' + codigos.astype(str))),
+        'type': _escolher(rng, ['small_airport', 'medium_airport', 'large_airport'], len(codigos), [6, 3, 1]),
+        'name': np.where(por_ident | por_gps, nomes, 'Closed Airfield'),
+        'iso_country': 'US',
+        'gps_code': np.where(por_ident | por_gps, codigos, ''),
+        'iata_code': [codigo[1:] for codigo in codigos]
+    }).to_csv(caminho_database, index=False)
+
+def gerar_entradas(diretorio, linhas, seed=42):
+    """Grava em <diretorio>/data/input todos os arquivos de entrada dos scripts, com `linhas` eventos"""
+    entrada = Path(diretorio) / 'data' / 'input'
+    entrada.mkdir(parents=True, exist_ok=True)
+
+    for semente_tabela, (nome, (titulo, gerar)) in enumerate(TABELAS.items()):
+        if gerar is None:
+            _gravar_blocos(entrada / nome, linhas, _accidents, None, seed, semente_tabela)
+        else:
+            _gravar_blocos(entrada / nome, linhas, lambda rng, n, _, g=gerar: g(rng, n), titulo, seed, semente_tabela)
+
+    gerar_aeroportos(np.random.default_rng([seed, len(TABELAS)]), linhas,
+                     entrada / 'AIRPORTS.csv', entrada / 'airports_database.csv')
+    return entrada
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera as entradas da suíte com dados sintéticos")
+    parser.add_argument('diretorio', help="raiz do projeto de destino (os arquivos vão para data/input)")
+    parser.add_argument('--linhas', type=ler_escala, default=ler_escala('10k'), help="ex.: 10k, 1M, 10M")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    print(f"Arquivos gerados em: {gerar_entradas(args.diretorio, args.linhas, args.seed)}")
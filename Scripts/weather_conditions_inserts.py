@@ -1,50 +1,63 @@
 import pandas as pd
-from paths import PATHS 
-
-# Lê o CSV pulando as 2 primeiras linhas de metadados
-df_raw = pd.read_csv(
-    PATHS['weather_conditions_input'], 
-    skiprows=2, 
-    header=None, 
-    names=['Description']
-)
-
-# Remove espaços e normaliza
-df_raw['Description'] = df_raw['Description'].astype(str).str.strip()
-
-# Remove duplicatas mantendo a primeira ocorrência
-unique_conditions = df_raw.drop_duplicates().reset_index(drop=True)
-
-# Cria os IDs para cada condição única
-unique_conditions.insert(0, 'id', range(1, len(unique_conditions) + 1))
-
-# =====================
-# 1. Gera os INSERTs da tabela weather_conditions (IDs únicos e descrições)
-# =====================
-with open(PATHS['weather_conditions_insert'], 'w', encoding='utf-8') as f:
-    f.write("INSERT INTO WEATHER_CONDITIONS (id, Description) VALUES\n")
-    
-    rows = []
-    for _, row in unique_conditions.iterrows():
-        desc = row['Description'].replace("'", "''")  # Escapar aspas simples
-        rows.append(f"({row['id']}, '{desc}')")
-    
-    f.write(",\n".join(rows))
-    f.write(";\n")
-
-# =====================
-# 2. Gera INSERTs para weather_conditions_events
-# =====================
-
-# Cria um dicionário para mapear descrição -> ID único
-desc_to_id = dict(zip(unique_conditions['Description'], unique_conditions['id']))
-
-with open(PATHS['weather_conditions_events'], 'w', encoding='utf-8') as f:
-    for idx, row in df_raw.reset_index().iterrows():  # Garante que o índice seja sequencial
-        event_id = idx + 1
-        weather_id = desc_to_id[row['Description']]  # Pega o ID correspondente à descrição
-        f.write(
-            f"INSERT INTO WEATHER_CONDITIONS_EVENTS (Event_ID, Weather_Condition_ID) VALUES ({event_id}, {weather_id});\n"
-        )
-
-print("Scripts gerados com sucesso!")
\ No newline at end of file
+from paths import PATHS, EVENTOS_SQL, LINHAS_POR_INSERT_EVENTOS
+from sql_writer import escape_string, sql_frame, build_values, write_insert, write_events
+from compressed_io import abrir
+from db_loader import carregar_se_configurado
+from bulk_export import exportar_se_configurado
+from load_envelope import envelopar_se_configurado
+from id_maps import salvar_mapa
+from dimension_builder import construir_dimensao
+from staging import ler_entrada
+
+def gerar_condicoes(df_raw, estado=None):
+    """Gera os INSERTs de WEATHER_CONDITIONS (e o .sql opcional de eventos) a partir da entrada
+
+    Retorna o ID da condição de cada evento, na ordem das linhas de df_raw. Com estado
+    (EstadoIncremental), só as condições novas são geradas e as conhecidas mantêm o ID.
+    """
+    # Remove espaços e normaliza
+    df_raw = df_raw.assign(Description=df_raw['Description'].astype(str).str.strip())
+
+    # Remove duplicatas mantendo a primeira ocorrência, já com o ID de cada condição única
+    # e o ID correspondente de cada evento
+    conhecidas = estado.chaves('WEATHER_CONDITIONS') if estado else None
+    unique_conditions, weather_ids = construir_dimensao(df_raw, ['Description'], conhecidas)
+
+    # =====================
+    # 1. Gera os INSERTs da tabela weather_conditions (IDs únicos e descrições)
+    # =====================
+    literais = sql_frame({
+        'id': unique_conditions['id'].astype(str),
+        'Description': escape_string(unique_conditions['Description'])  # Escapar aspas simples
+    })
+    with abrir(PATHS['weather_conditions_insert'], 'w') as f:
+        write_insert(f, "INSERT INTO WEATHER_CONDITIONS (id, Description) VALUES\n", literais)
+
+    envelopar_se_configurado('WEATHER_CONDITIONS', PATHS['weather_conditions_insert'])
+    exportar_se_configurado('WEATHER_CONDITIONS', literais)
+    carregar_se_configurado('WEATHER_CONDITIONS', literais, substituir=estado is None)
+
+    # =====================
+    # 2. Versão SQL opcional do mapeamento weather_conditions_events
+    # =====================
+    if EVENTOS_SQL:
+        # Os eventos são numerados como as linhas de WEATHER (continuando as já carregadas)
+        primeiro_evento = estado.proximo_id('WEATHER') if estado else 1
+        event_ids = pd.Series(range(primeiro_evento, primeiro_evento + len(df_raw)))
+        with abrir(PATHS['weather_conditions_events'], 'w') as f:
+            write_events(
+                f, "INSERT INTO WEATHER_CONDITIONS_EVENTS (Event_ID, Weather_Condition_ID)",
+                build_values([event_ids.astype(str), pd.Series(weather_ids).astype(str)]),
+                EVENTOS_SQL, LINHAS_POR_INSERT_EVENTOS
+            )
+
+    return weather_ids
+
+if __name__ == "__main__":
+    # Lê a entrada (CSV pulando as 2 primeiras linhas de metadados, ou o Parquet de staging)
+    weather_ids = gerar_condicoes(ler_entrada('weather_conditions_input'))
+
+    # Mapa binário evento -> condição (posição no CSV -> ID), lido pelo weather_inserts.py
+    salvar_mapa('weather_conditions_event_ids', weather_ids)
+
+    print("Scripts gerados com sucesso!")
@@ -1,89 +1,131 @@
-import pandas as pd
-from paths import PATHS
+import argparse
+from paths import PATHS, DATABASE, BULK_EXPORT
+from sql_writer import NULL, format_sql_column, sql_frame, build_values, write_values, RelatorioRejeitos
+from compressed_io import abrir
+from db_loader import carregar_se_configurado
+from bulk_export import exportar_se_configurado
+from load_envelope import envelopar_se_configurado
+from id_maps import salvar_mapa, carregar_mapa
+from staging import ler_entrada
+from shards import gerar_em_shards
 
 # Configuração de caminhos usando PATHS do config
-input_path = PATHS['weather_input']
 output_path = PATHS['weather_insert']
-weather_events_path = PATHS['weather_conditions_events']
-period_events_path = PATHS['day_periods_events']
-
-# Carrega o CSV da tabela WEATHER, ignorando as duas primeiras linhas
-try:
-    df = pd.read_csv(input_path, skiprows=2, header=None, names=[
-        "Weather_Timestamp", "Temperature", "Humidity", "Pressure",
-        "Visibility", "Wind_Direction", "Wind_Speed",
-        "Precipitation", "Weather_Condition_ID", "Day_Period_ID"
-    ])
-    
-    # Limpa espaços em branco e trata dados faltantes
-    df = df.fillna("NULL")
-    df = df.apply(lambda x: x.astype(str).str.strip())
 
-    # Lê os arquivos EVENTS para obter os IDs corretos baseados na posição
+def carregar_clima():
+    """Carrega a tabela WEATHER (CSV ignorando as duas primeiras linhas, ou o Parquet de staging)
+    e os mapas evento -> condição e evento -> período gravados pelos scripts anteriores"""
+    df = ler_entrada('weather_input')
+
+    # Lê os mapas de eventos para obter os IDs corretos baseados na posição
     try:
-        with open(weather_events_path, "r", encoding="utf-8") as f:
-            weather_event_ids = [
-                int(line.split("VALUES")[1].split(",")[1].strip().rstrip(");"))
-                for line in f.readlines() if line.startswith("INSERT")
-            ]
-
-        with open(period_events_path, "r", encoding="utf-8") as f:
-            period_event_ids = [
-                int(line.split("VALUES")[1].split(",")[1].strip().rstrip(");"))
-                for line in f.readlines() if line.startswith("INSERT")
-            ]
+        weather_event_ids = carregar_mapa('weather_conditions_event_ids')
+        period_event_ids = carregar_mapa('day_periods_event_ids')
     except Exception as e:
         print(f"Erro ao ler arquivos de eventos: {e}")
         exit()
+    return df, weather_event_ids, period_event_ids
+
+def preparar_clima(df, weather_event_ids, period_event_ids, primeiro_id=1):
+    """Limpa os textos e atribui os IDs (próprio, a partir de primeiro_id, e estrangeiros,
+    pela posição de cada evento)"""
+    # Limpa espaços em branco e trata dados faltantes
+    df = df.fillna("NULL")
+    df = df.apply(lambda x: x.astype(str).str.strip())
 
     # Verifica se o número de IDs corresponde ao número de linhas
     if len(weather_event_ids) != len(df) or len(period_event_ids) != len(df):
-        print(f"Erro: Número de IDs não corresponde ao número de linhas no CSV")
-        print(f"Weather IDs: {len(weather_event_ids)}, Period IDs: {len(period_event_ids)}, CSV Rows: {len(df)}")
-        exit()
+        raise ValueError(f"Número de IDs não corresponde ao número de linhas no CSV "
+                         f"(Weather IDs: {len(weather_event_ids)}, Period IDs: {len(period_event_ids)}, "
+                         f"CSV Rows: {len(df)})")
 
     # Atribui os IDs estrangeiros para cada linha
     df["Weather_Condition_ID"] = weather_event_ids
     df["Day_Period_ID"] = period_event_ids
-    df.insert(0, "Weather_ID", range(1, len(df) + 1))
+    df.insert(0, "Weather_ID", range(primeiro_id, primeiro_id + len(df)))
+    return df
+
+# Colunas da tabela WEATHER e o tipo usado na formatação (conforme o create-table.sql)
+TIPOS = {
+    'Weather_ID': 'number',
+    'Weather_Timestamp': 'timestamp',
+    'Temperature': 'float',
+    'Humidity': 'float',
+    'Pressure': 'float',
+    'Visibility': 'float',
+    'Wind_Direction': 'string',
+    'Wind_Speed': 'float',
+    'Precipitation': 'float',
+    'Weather_Condition_ID': 'number',
+    'Day_Period_ID': 'number'
+}
+
+# Precipitação ausente é gravada como 0.0 (a coluna é NOT NULL)
+NULOS = {'Precipitation': '0.0'}
 
-    # Gera o script de INSERTs em um único comando
-    with open(output_path, "w", encoding="utf-8") as f:
+def formatar_literais(df, rejeitos=None):
+    """Formata coluna a coluna os literais SQL da tabela WEATHER, pelo tipo declarado em TIPOS
+
+    Timestamps e números inválidos vão para rejeitos, identificados pelo id do clima.
+    """
+    df = df.set_axis(df['Weather_ID'].to_numpy())
+    return sql_frame({
+        'id' if col == 'Weather_ID' else col: format_sql_column(df[col], tipo, rejeitos, NULOS.get(col, NULL))
+        for col, tipo in TIPOS.items()
+    })
+
+def formatar_fatia(fatia, inicio, rejeitos):
+    """Formata uma faixa de linhas num processo filho (modo --workers); os IDs já vêm atribuídos"""
+    return formatar_literais(fatia, rejeitos)
+
+def gerar_clima(df, weather_event_ids, period_event_ids, workers=None, estado=None):
+    """Gera o script de INSERTs em um único comando e retorna o ID do clima de cada evento
+
+    Com workers, a formatação é dividida em faixas de linhas entre processos
+    (gerar_em_shards); o arquivo gerado é o mesmo. Com estado (EstadoIncremental), os IDs
+    seguem os das linhas já carregadas.
+    """
+    primeiro_id = estado.reservar('WEATHER', len(df)) if estado else 1
+    df = preparar_clima(df, weather_event_ids, period_event_ids, primeiro_id)
+    rejeitos = RelatorioRejeitos('WEATHER', PATHS['weather_rejeitos'])
+
+    with abrir(output_path, "w") as f:
         f.write("-- INSERT statements for WEATHER table\n")
         f.write("-- Generated automatically from WEATHER_filtrado.csv\n\n")
-        
+
         f.write("INSERT INTO WEATHER (id, Weather_Timestamp, Temperature, Humidity, Pressure, ")
         f.write("Visibility, Wind_Direction, Wind_Speed, Precipitation, Weather_Condition_ID, Day_Period_ID) VALUES\n")
-        
-        # Função para converter valores para formato SQL
-        def sql_val(x, isPrecipitation=False):
-            if x == "NULL":
-                if isPrecipitation:
-                    return float(0.0)
-                return "NULL"
-            try:
-                # Tenta converter para float (para números com decimais)
-                float_val = float(x)
-                return str(float_val)
-            except ValueError:
-                # Se não for número, trata como string
-                return f"'{x.replace("'", "''")}'"
-        
-        # Gera todos os valores em um único bloco
-        values = []
-        for _, row in df.iterrows():
-            values.append(
-                f"({row['Weather_ID']}, {sql_val(row['Weather_Timestamp'])}, {sql_val(row['Temperature'])}, "
-                f"{sql_val(row['Humidity'])}, {sql_val(row['Pressure'])}, {sql_val(row['Visibility'])}, "
-                f"{sql_val(row['Wind_Direction'])}, {sql_val(row['Wind_Speed'])}, {sql_val(row['Precipitation'], isPrecipitation=True)}, "
-                f"{row['Weather_Condition_ID']}, {row['Day_Period_ID']})"
-            )
-        
-        f.write(",\n".join(values))
-        f.write(";\n")
+
+        if workers:
+            frames = gerar_em_shards(f, df, formatar_fatia, workers, rejeitos,
+                                     devolver_literais=bool(BULK_EXPORT or DATABASE['url']))
+        else:
+            # Gera todos os valores em um único bloco
+            literais = formatar_literais(df, rejeitos)
+            write_values(f, build_values(literais))
+            frames = [literais]
 
     print(f"Arquivo {output_path} gerado com sucesso.")
+    envelopar_se_configurado('WEATHER', output_path)
+    rejeitos.salvar()
+    for i, literais in enumerate(frames or []):
+        exportar_se_configurado('WEATHER', literais, anexar=(i > 0))
+        carregar_se_configurado('WEATHER', literais, substituir=(i == 0 and estado is None))
     print(f"Total de registros inseridos: {len(df)}")
+    return df['Weather_ID'].to_numpy()
+
+def gerar_sql(workers=None):
+    """Execução pela linha de comando: lê a entrada e os mapas do disco e salva o mapa weather_ids"""
+    weather_ids = gerar_clima(*carregar_clima(), workers=workers)
+    salvar_mapa('weather_ids', weather_ids)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera os INSERTs da tabela WEATHER")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="formata o arquivo em N processos, cada um com uma faixa de linhas")
+    args = parser.parse_args()
 
-except Exception as e:
-    print(f"Erro no processamento: {e}")
\ No newline at end of file
+    try:
+        gerar_sql(args.workers)
+    except Exception as e:
+        print(f"Erro no processamento: {e}")